@@ -1,12 +1,22 @@
 """Entry point for running the app with `python -m background_remover`."""
 
+import multiprocessing
 import sys
 
-from background_remover.app import run_app
+from background_remover.cli import COMMANDS
+from background_remover.cli import main as cli_main
 
 
 def main():
-    """Main entry point."""
+    """Main entry point: run a headless command if one is given, else the GUI."""
+    # Lets frozen builds start the processes that isolate files
+    multiprocessing.freeze_support()
+    if len(sys.argv) > 1 and sys.argv[1] in ("-h", "--help", *COMMANDS):
+        sys.exit(cli_main(sys.argv[1:]))
+
+    # Import here so headless commands don't load Qt widgets
+    from background_remover.app import run_app
+
     sys.exit(run_app())
 
 
@@ -0,0 +1,166 @@
+"""Animated PNG writer that encodes one frame at a time.
+
+Pillow's APNG encoder holds every frame in memory until the whole animation
+has been compared and written, which for a long full-resolution spin can
+take gigabytes. ``APNGWriter`` instead encodes each frame as it arrives with
+Pillow's regular PNG encoder and copies the compressed image data into the
+animation, so only the frame being written is kept.
+"""
+
+import io
+import os
+import struct
+import zlib
+from typing import BinaryIO, List, Optional, Tuple, Union
+
+from PIL import Image
+
+SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# Frame delays are written in milliseconds, as 16-bit numerators
+_DELAY_DENOMINATOR = 1000
+_MAX_DELAY = 0xFFFF
+
+# fcTL dispose and blend operations: leave the canvas, replace the region
+_DISPOSE_NONE = 0
+_BLEND_SOURCE = 0
+
+
+def png_chunk(kind: bytes, data: bytes) -> bytes:
+    """Encode one PNG chunk: length, type, data and CRC."""
+    body = kind + data
+    return struct.pack(">I", len(data)) + body + struct.pack(">I", zlib.crc32(body))
+
+
+def _encode(image: Image.Image) -> Tuple[bytes, List[bytes]]:
+    """Encode an image as PNG and return its IHDR data and IDAT payloads."""
+    encoded = io.BytesIO()
+    image.save(encoded, "PNG")
+    data = encoded.getbuffer()
+    header = b""
+    payloads = []
+    position = len(SIGNATURE)
+    while position < len(data):
+        (length,) = struct.unpack(">I", data[position : position + 4])
+        kind = bytes(data[position + 4 : position + 8])
+        body = bytes(data[position + 8 : position + 8 + length])
+        if kind == b"IHDR":
+            header = body
+        elif kind == b"IDAT":
+            payloads.append(body)
+        position += length + 12
+    return header, payloads
+
+
+class APNGWriter:
+    """
+    Write an animated PNG frame by frame.
+
+    Every frame must have the size and mode of the first. Use as a context
+    manager; when it exits with an error the partial file it created is
+    removed.
+    """
+
+    def __init__(
+        self,
+        destination: Union[str, BinaryIO],
+        frame_count: int,
+        loop: int = 0,
+        chunks: bytes = b"",
+    ):
+        """
+        Initialize the writer.
+
+        Args:
+            destination: Path or writable binary stream.
+            frame_count: Number of frames that will be added.
+            loop: Times the animation plays; 0 loops forever.
+            chunks: Encoded ancillary chunks written before the image data.
+        """
+        self._destination = destination
+        self._frame_count = frame_count
+        self._loop = loop
+        self._chunks = chunks
+        self._stream: Optional[BinaryIO] = None
+        self._header = b""
+        self._written = 0
+        self._sequence = 0
+
+    def __enter__(self) -> "APNGWriter":
+        if hasattr(self._destination, "write"):
+            self._stream = self._destination
+        else:
+            self._stream = open(self._destination, "wb")
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        failed = exc_type is not None
+        try:
+            if not failed:
+                self.close()
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            if self._stream is not self._destination:
+                self._stream.close()
+                if failed:
+                    os.unlink(self._destination)
+
+    def add(self, image: Image.Image, duration: int) -> None:
+        """
+        Append a frame.
+
+        Args:
+            image: The frame; it replaces the previous frame entirely.
+            duration: Milliseconds the frame is shown.
+        """
+        header, payloads = _encode(image)
+        if not self._written:
+            self._header = header
+            self._stream.write(SIGNATURE + png_chunk(b"IHDR", header))
+            self._stream.write(
+                png_chunk(b"acTL", struct.pack(">II", self._frame_count, self._loop))
+            )
+            self._stream.write(self._chunks)
+        elif header != self._header:
+            raise ValueError("Every APNG frame must match the first frame's size")
+
+        self._stream.write(
+            png_chunk(
+                b"fcTL",
+                struct.pack(
+                    ">IIIIIHHBB",
+                    self._next_sequence(),
+                    image.width,
+                    image.height,
+                    0,
+                    0,
+                    min(round(duration), _MAX_DELAY),
+                    _DELAY_DENOMINATOR,
+                    _DISPOSE_NONE,
+                    _BLEND_SOURCE,
+                ),
+            )
+        )
+        for payload in payloads:
+            if not self._written:
+                # The first frame doubles as the default image
+                self._stream.write(png_chunk(b"IDAT", payload))
+            else:
+                sequence = struct.pack(">I", self._next_sequence())
+                self._stream.write(png_chunk(b"fdAT", sequence + payload))
+        self._written += 1
+
+    def close(self) -> None:
+        """Finish the file; every announced frame must have been added."""
+        if self._written != self._frame_count:
+            raise ValueError(
+                f"Expected {self._frame_count} frames, got {self._written}"
+            )
+        self._stream.write(png_chunk(b"IEND", b""))
+
+    def _next_sequence(self) -> int:
+        sequence = self._sequence
+        self._sequence += 1
+        return sequence
@@ -2,8 +2,9 @@
 
 import sys
 
-from PySide6.QtWidgets import QApplication
+from PySide6.QtWidgets import QApplication, QMessageBox
 
+from background_remover import metrics
 from background_remover.splash_screen import SplashScreen
 
 
@@ -13,6 +14,9 @@ def run_app() -> int:
     app.setApplicationName("Background Remover")
     app.setApplicationVersion("1.1.0")
 
+    # Optional Prometheus endpoint, enabled with BGREMOVER_METRICS_PORT
+    metrics.start_from_environment()
+
     # Show splash screen and load model in background
     splash = SplashScreen()
     splash.center_on_screen()
@@ -25,11 +29,16 @@ def run_app() -> int:
     def on_startup_complete(processor):
         nonlocal main_window
         # Import here to avoid slow import before splash shows
+        from background_remover import tuning
         from background_remover.main_window import MainWindow
 
         main_window = MainWindow(processor)
         main_window.show()
         splash.close()
+        if tuning.needs_retune():
+            QMessageBox.information(
+                main_window, "Performance Tuning", tuning.RETUNE_HINT
+            )
 
     splash.startup_complete.connect(on_startup_complete)
     splash.start_loading()
@@ -0,0 +1,382 @@
+"""Asyncio facade over ImageProcessor for embedding in async services.
+
+Decoding, inference and encoding are blocking, so each runs in an executor
+while the event loop stays free. Every coroutine shares one ImageProcessor,
+and so one loaded model; a semaphore bounds how many images are in flight so
+a burst of requests can't decode thousands of images into memory at once.
+
+A cancelled or timed-out image stops at the next stage boundary. A stage
+already running in a thread can't be interrupted; it finishes in the
+background and its result is discarded; an output path stays reserved
+until that stage has finished writing to it.
+"""
+
+import asyncio
+import io
+import os
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import (
+    AsyncIterator,
+    Awaitable,
+    BinaryIO,
+    Callable,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    TypeVar,
+    Union,
+)
+
+import numpy as np
+from PIL import Image
+
+from background_remover import metrics
+from background_remover.image_processor import ImageProcessor
+from background_remover.preflight import animation_frames
+
+T = TypeVar("T")
+
+Source = Union[bytes, Path]
+
+
+@dataclass
+class AsyncResult:
+    """
+    Outcome of one image in a batch.
+
+    Attributes:
+        index: Position of the input in the batch.
+        source: The input, as given.
+        output: Path the result was saved at, or the PNG bytes when no
+            output folder was given; None if processing failed.
+        error: Why processing failed, if it did.
+    """
+
+    index: int
+    source: Source
+    output: Optional[Union[Path, bytes]] = None
+    error: Optional[BaseException] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class AsyncImageProcessor:
+    """Non-blocking background removal for asyncio applications."""
+
+    def __init__(
+        self,
+        processor: Optional[ImageProcessor] = None,
+        max_concurrency: Optional[int] = None,
+        timeout: Optional[float] = None,
+        io_executor: Optional[Executor] = None,
+        inference_executor: Optional[Executor] = None,
+    ):
+        """
+        Initialize the facade.
+
+        Args:
+            processor: Processor shared by every coroutine; defaults to one
+                with a single session, so one model is loaded.
+            max_concurrency: Most images decoded or in progress at once;
+                defaults to twice the processor's session count.
+            timeout: Default seconds allowed per image; None waits forever.
+            io_executor: Runs decoding and encoding; defaults to a thread
+                pool sized for the CPU count.
+            inference_executor: Runs inference; defaults to one thread per
+                session the processor may use.
+        """
+        self.processor = processor or ImageProcessor(max_sessions=1)
+        self.max_concurrency = max_concurrency or 2 * self.processor.max_sessions
+        self.timeout = timeout
+        # Executors created here are shut down by close()
+        self._owned: List[Executor] = []
+        self._io = io_executor or self._own(
+            ThreadPoolExecutor(
+                max_workers=min(32, (os.cpu_count() or 1) + 4),
+                thread_name_prefix="bgremover-io",
+            )
+        )
+        self._inference = inference_executor or self._own(
+            ThreadPoolExecutor(
+                max_workers=self.processor.max_sessions,
+                thread_name_prefix="bgremover-inference",
+            )
+        )
+        # asyncio primitives belong to the loop they were first used on
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _own(self, executor: Executor) -> Executor:
+        self._owned.append(executor)
+        return executor
+
+    async def __aenter__(self) -> "AsyncImageProcessor":
+        await self.warm_up()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Shut down the executors this facade created."""
+        for executor in self._owned:
+            executor.shutdown(wait=False)
+        self._owned.clear()
+
+    async def warm_up(self) -> None:
+        """Load the model ahead of the first request."""
+        await self._run(self._inference, lambda: self.processor.session)
+
+    async def process(self, data: bytes, timeout: Optional[float] = None) -> bytes:
+        """
+        Remove the background from an encoded image held in memory.
+
+        Args:
+            data: Encoded image bytes in any supported format.
+            timeout: Seconds allowed; defaults to the facade's timeout.
+
+        Returns:
+            The result encoded as PNG with transparency.
+
+        Raises:
+            asyncio.TimeoutError: If the image took longer than the timeout.
+            RuntimeError: If the data can't be decoded or processing fails.
+        """
+        output = io.BytesIO()
+        await self._bounded(
+            lambda: self._pipeline(self._open_bytes, data, output), timeout
+        )
+        return output.getvalue()
+
+    async def process_file(
+        self, input_path: Path, output_path: Path, timeout: Optional[float] = None
+    ) -> Path:
+        """
+        Remove the background from an image file and save it as PNG.
+
+        Args:
+            input_path: Path to the input image file.
+            output_path: Where to save the result; the suffix becomes .png.
+            timeout: Seconds allowed; defaults to the facade's timeout.
+
+        Returns:
+            The path the result was saved at.
+
+        Raises:
+            asyncio.TimeoutError: If the image took longer than the timeout.
+            FileNotFoundError: If the input file doesn't exist.
+            ValueError: If the input format is not supported.
+            RuntimeError: If processing fails.
+        """
+        output_path = output_path.with_suffix(".png")
+        stages: List[Future] = []
+        try:
+            await self._bounded(
+                lambda: self._pipeline(
+                    self.processor.open_image, input_path, str(output_path), stages
+                ),
+                timeout,
+            )
+        finally:
+            self._release_when_done(output_path, stages)
+        return output_path
+
+    async def process_array(
+        self, array: np.ndarray, timeout: Optional[float] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Run ImageProcessor.process_array without blocking the loop."""
+        return await self._bounded(
+            lambda: self._run(self._inference, self.processor.process_array, array),
+            timeout,
+        )
+
+    async def process_many(
+        self,
+        sources: Iterable[Source],
+        output_folder: Optional[Path] = None,
+        timeout: Optional[float] = None,
+    ) -> AsyncIterator[AsyncResult]:
+        """
+        Process a batch, yielding each result as soon as it is ready.
+
+        Inputs are consumed lazily, so only a bounded number of images is
+        scheduled at a time even for very long or unbounded iterables.
+        Failures and timeouts are reported in the results rather than
+        raised. Closing the iterator early with ``aclose()`` cancels the
+        images still in progress.
+
+        Args:
+            sources: Encoded images as bytes, or paths to image files.
+            output_folder: Folder paths are saved to; when None, results are
+                returned as PNG bytes.
+            timeout: Seconds allowed per image; defaults to the facade's.
+
+        Yields:
+            One result per input, in completion order.
+        """
+        pending: Set["asyncio.Task[AsyncResult]"] = set()
+        inputs = enumerate(sources)
+        exhausted = False
+        try:
+            while True:
+                # Keep just enough work queued to saturate the semaphore
+                while not exhausted and len(pending) < 2 * self.max_concurrency:
+                    item = next(inputs, None)
+                    if item is None:
+                        exhausted = True
+                        break
+                    pending.add(
+                        asyncio.ensure_future(
+                            self._batch_item(*item, output_folder, timeout)
+                        )
+                    )
+                if not pending:
+                    return
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    yield task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+    async def _batch_item(
+        self,
+        index: int,
+        source: Source,
+        output_folder: Optional[Path],
+        timeout: Optional[float],
+    ) -> AsyncResult:
+        result = AsyncResult(index, source)
+        try:
+            if isinstance(source, bytes):
+                result.output = await self.process(source, timeout)
+            elif output_folder is None:
+                result.output = await self.process(
+                    await self._run(self._io, Path(source).read_bytes), timeout
+                )
+            else:
+                output_path = self.processor.generate_output_path(
+                    Path(source), output_folder
+                )
+                result.output = await self.process_file(
+                    Path(source), output_path, timeout
+                )
+        except Exception as e:
+            result.error = e
+        return result
+
+    async def _bounded(
+        self, start: Callable[[], Awaitable[T]], timeout: Optional[float]
+    ) -> T:
+        """Start a job once a concurrency slot is free and wait up to the timeout."""
+        async with self._slots():
+            return await asyncio.wait_for(start(), timeout or self.timeout)
+
+    def _slots(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._loop = loop
+        return self._semaphore
+
+    async def _pipeline(
+        self,
+        open_image: Callable[[T], Image.Image],
+        source: T,
+        destination: Union[str, BinaryIO],
+        stages: Optional[List[Future]] = None,
+    ) -> None:
+        """
+        Decode, infer and encode one image, each stage in its executor.
+
+        The futures of the stages started are appended to stages, if given.
+        """
+        rgba = await self._run(
+            self._io, self._decode, open_image, source, stages=stages
+        )
+        if rgba is None:
+            # Animations need inference per frame; handle them in one go
+            await self._run(
+                self._inference,
+                self._process_frames,
+                open_image,
+                source,
+                destination,
+                stages=stages,
+            )
+            return
+
+        nbytes = rgba.nbytes
+        metrics.IN_FLIGHT_BYTES.inc(nbytes)
+        try:
+            rgba, _ = await self._run(
+                self._inference,
+                self.processor.process_array,
+                rgba,
+                True,
+                stages=stages,
+            )
+            await self._run(
+                self._io, self.processor.encode_png, rgba, destination, stages=stages
+            )
+        finally:
+            metrics.IN_FLIGHT_BYTES.dec(nbytes)
+
+    def _decode(
+        self, open_image: Callable[[T], Image.Image], source: T
+    ) -> Optional[np.ndarray]:
+        """Decode a single-frame image, or return None if it has several."""
+        with open_image(source) as img:
+            if animation_frames(img) > 1:
+                return None
+            return self.processor.decode(img)
+
+    def _process_frames(
+        self,
+        open_image: Callable[[T], Image.Image],
+        source: T,
+        destination: Union[str, BinaryIO],
+    ) -> None:
+        self.processor.process_opened(open_image(source), destination)
+
+    @staticmethod
+    def _open_bytes(data: bytes) -> Image.Image:
+        try:
+            return Image.open(io.BytesIO(data))
+        except Exception as e:
+            raise RuntimeError(f"Failed to open image: {e}") from e
+
+    def _release_when_done(self, output_path: Path, stages: List[Future]) -> None:
+        """Release an output path once no stage can still write to it."""
+        running = [stage for stage in stages if not stage.done()]
+        if not running:
+            self.processor.release_output_path(output_path)
+            return
+        # A timed-out stage keeps running in its thread; hold the path until
+        # it finishes so another image can't be given the same file
+        running[-1].add_done_callback(
+            lambda _: self.processor.release_output_path(output_path)
+        )
+
+    @staticmethod
+    async def _run(
+        executor: Executor,
+        function: Callable[..., T],
+        *args,
+        stages: Optional[List[Future]] = None,
+    ) -> T:
+        future = executor.submit(function, *args)
+        if stages is not None:
+            stages.append(future)
+        # Cancelling the awaiting side cancels the stage if it hasn't started
+        return await asyncio.wrap_future(future)
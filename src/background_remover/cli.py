@@ -0,0 +1,708 @@
+"""Command-line interface for headless processing."""
+
+import argparse
+import base64
+import json
+import struct
+import sys
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, BinaryIO, List, Optional
+
+if TYPE_CHECKING:
+    import numpy as np
+
+    from background_remover.export import ExportVariant
+    from background_remover.image_processor import ImageProcessor
+    from background_remover.trim import Trim
+    from background_remover.tuning import TuningProfile
+
+# Subcommands that switch the app into headless mode
+COMMANDS = {
+    "batch",
+    "stream",
+    "queue",
+    "tune",
+    "quantize",
+    "soak",
+    "memory",
+    "benchmark",
+}
+
+# Length-prefixed frames carry a 4-byte big-endian payload size
+_LENGTH_HEADER = struct.Struct(">I")
+
+
+def _read_exact(stream: BinaryIO, size: int) -> Optional[bytes]:
+    """Read exactly ``size`` bytes, or return None at a clean end of stream."""
+    chunks = []
+    remaining = size
+    while remaining:
+        chunk = stream.read(remaining)
+        if not chunk:
+            if remaining == size:
+                return None
+            raise EOFError("Stream ended in the middle of a frame")
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b"".join(chunks)
+
+
+def _write_frame(destination: BinaryIO, payload: bytes) -> None:
+    """Write one length-prefixed frame and flush it."""
+    destination.write(_LENGTH_HEADER.pack(len(payload)))
+    destination.write(payload)
+    destination.flush()
+
+
+def stream_length_prefixed(
+    processor: "ImageProcessor", source: BinaryIO, destination: BinaryIO
+) -> int:
+    """
+    Process length-prefixed images until the input ends.
+
+    Each input frame is a 4-byte big-endian length followed by the encoded
+    image. Each output frame uses the same layout with the PNG result; a
+    zero-length frame marks an image that failed, with details on stderr. A
+    truncated input frame fails that image and ends the stream.
+
+    Returns:
+        Number of images that failed.
+    """
+    failed = 0
+    index = 0
+    while True:
+        try:
+            header = _read_exact(source, _LENGTH_HEADER.size)
+            if header is None:
+                return failed
+            (size,) = _LENGTH_HEADER.unpack(header)
+            data = _read_exact(source, size) if size else b""
+            if data is None:
+                raise EOFError("Stream ended in the middle of a frame")
+        except EOFError as e:
+            print(f"Image {index} failed: {e}", file=sys.stderr)
+            _write_frame(destination, b"")
+            return failed + 1
+
+        try:
+            result = processor.process_bytes(data)
+        except Exception as e:
+            print(f"Image {index} failed: {e}", file=sys.stderr)
+            result = b""
+            failed += 1
+
+        _write_frame(destination, result)
+        index += 1
+
+
+def stream_ndjson(
+    processor: "ImageProcessor", source: BinaryIO, destination: BinaryIO
+) -> int:
+    """
+    Process newline-delimited JSON requests until the input ends.
+
+    Each input line is an object with base64 ``data`` and an optional ``id``.
+    Each output line echoes the ``id`` with either base64 PNG ``data`` or an
+    ``error`` message.
+
+    Returns:
+        Number of images that failed.
+    """
+    failed = 0
+    for index, line in enumerate(source):
+        if not line.strip():
+            continue
+
+        response = {}
+        try:
+            request = json.loads(line)
+            response["id"] = request.get("id", index)
+            result = processor.process_bytes(base64.b64decode(request["data"]))
+            response["data"] = base64.b64encode(result).decode("ascii")
+        except Exception as e:
+            response.setdefault("id", index)
+            response["error"] = str(e)
+            failed += 1
+
+        destination.write(json.dumps(response).encode("utf-8") + b"\n")
+        destination.flush()
+    return failed
+
+
+def _load_profile() -> Optional["TuningProfile"]:
+    """Return this machine's tuning profile, warning on stderr if it's stale."""
+    from background_remover import tuning
+
+    return tuning.startup_profile(lambda hint: print(hint, file=sys.stderr))
+
+
+def _run_stream(args: argparse.Namespace) -> int:
+    """Run the stdin/stdout streaming filter."""
+    # Import here so the GUI entry point doesn't pay for loading rembg early
+    from background_remover.image_processor import ImageProcessor
+
+    # Images arrive one at a time, so only the thread count applies
+    profile = _load_profile()
+    processor = ImageProcessor(
+        intra_op_threads=profile.threads if profile else None,
+        precision=args.precision,
+        trim=_trim_from_args(args),
+        shared_weights=args.shared_weights,
+        backend=args.backend,
+    )
+    # Load the model once up front so every image reuses the warm session
+    _ = processor.session
+
+    if args.framing == "ndjson":
+        failed = stream_ndjson(processor, sys.stdin.buffer, sys.stdout.buffer)
+    else:
+        failed = stream_length_prefixed(
+            processor, sys.stdin.buffer, sys.stdout.buffer
+        )
+    return 1 if failed else 0
+
+
+def collect_inputs(paths: List[Path]) -> List[Path]:
+    """Expand folders into the supported images they contain, in sorted order."""
+    from background_remover.image_processor import ImageProcessor
+
+    files = []
+    for path in paths:
+        if path.is_dir():
+            files.extend(
+                p
+                for p in sorted(path.rglob("*"))
+                if p.is_file() and ImageProcessor.is_supported_format(p)
+            )
+        else:
+            files.append(path)
+    return files
+
+
+def _run_batch(args: argparse.Namespace) -> int:
+    """Process files with the same worker the GUI uses, reporting to stderr."""
+    from background_remover import eta
+    from background_remover.image_processor import ImageProcessor
+    from background_remover.isolation import FileLimits
+    from background_remover.preflight import preflight
+    from background_remover.worker import ProcessingWorker
+
+    try:
+        variants = _variants_from_args(args)
+    except (OSError, ValueError) as e:
+        print(f"Invalid export spec: {e}", file=sys.stderr)
+        return 2
+
+    limits = FileLimits(args.timeout, args.memory_limit)
+    try:
+        limits.check_supported()
+    except RuntimeError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+
+    accepted, rejected = preflight(collect_inputs(args.inputs))
+    for path, reason in rejected:
+        print(f"[rejected] {path.name}: {reason}", file=sys.stderr)
+    files = [info.path for info in accepted]
+    args.output.mkdir(parents=True, exist_ok=True)
+    profile = _load_profile()
+    processor = ImageProcessor(
+        intra_op_threads=profile.threads if profile else None,
+        precision=args.precision,
+        trim=_trim_from_args(args),
+        max_sessions=profile.workers if profile else None,
+        shared_weights=args.shared_weights,
+        backend=args.backend,
+    )
+    worker = ProcessingWorker(
+        files,
+        args.output,
+        processor,
+        variants=variants,
+        workers=profile.workers if profile else 1,
+        file_info={info.path: info for info in accepted},
+        limits=limits,
+    )
+
+    started = time.monotonic()
+    latest: List[float] = []
+
+    def estimate(seconds: Optional[float]):
+        if seconds is None:
+            return
+        if not latest:
+            print(f"Estimated time: {eta.describe(seconds)}", file=sys.stderr)
+        latest[:] = [seconds]
+
+    def report(filename: str, success: bool, message: str):
+        mark = "ok" if success else "FAILED"
+        left = ""
+        if latest and latest[0] > 0:
+            left = f" ({eta.format_duration(latest[0])} left)"
+        print(f"[{mark}] {filename}: {message}{left}", file=sys.stderr)
+
+    summary = {}
+
+    def finish(successful: int, failed: int):
+        summary.update(successful=successful, failed=failed)
+        elapsed = eta.format_duration(time.monotonic() - started)
+        print(
+            f"Completed: {successful} successful, {failed} failed in {elapsed}",
+            file=sys.stderr,
+        )
+
+    worker.eta_updated.connect(estimate)
+    worker.file_completed.connect(report)
+    worker.all_completed.connect(finish)
+    # Run on this thread; signals are delivered directly without an event loop
+    worker.run()
+    return 1 if summary.get("failed") or rejected else 0
+
+
+def _run_queue(args: argparse.Namespace) -> int:
+    """Run a shared-folder queue worker until the queue is drained."""
+    from background_remover.image_processor import ImageProcessor
+    from background_remover.shared_queue import SharedQueueWorker, SharedWorkQueue
+
+    profile = _load_profile()
+    processor = ImageProcessor(
+        intra_op_threads=profile.threads if profile else None,
+        precision=args.precision,
+        trim=_trim_from_args(args),
+        shared_weights=args.shared_weights,
+        backend=args.backend,
+    )
+    queue = SharedWorkQueue(args.input, args.output, lease_ttl=args.lease_ttl)
+    worker = SharedQueueWorker(queue, processor)
+    stats = worker.run(follow=args.follow, poll_interval=args.poll_interval)
+    print(
+        f"{worker.worker_id}: {stats.processed} processed, {stats.failed} failed, "
+        f"{stats.stolen} taken over from expired leases",
+        file=sys.stderr,
+    )
+    return 1 if stats.failed else 0
+
+
+def _run_tune(args: argparse.Namespace) -> int:
+    """Benchmark worker/thread layouts and save the fastest for this machine."""
+    from background_remover import tuning
+
+    def report(workers: int, threads: int, rate: float):
+        print(
+            f"{workers} worker(s) x {threads} thread(s): {rate:.2f} images/s",
+            file=sys.stderr,
+        )
+
+    profile = tuning.autotune(images=args.images, report=report)
+    print(
+        f"Saved {profile.workers} worker(s) x {profile.threads} thread(s) "
+        f"({profile.images_per_second:.2f} images/s) to {tuning.config_dir()}",
+        file=sys.stderr,
+    )
+    return 0
+
+
+def _run_soak(args: argparse.Namespace) -> int:
+    """Check for memory leaks by processing many synthetic images offline."""
+    from background_remover import soak
+
+    def progress(sample: "soak.MemorySample"):
+        print(
+            f"{sample.images} images: RSS {sample.rss / 1e6:.1f} MB, "
+            f"Python heap {sample.traced / 1e6:.1f} MB",
+            file=sys.stderr,
+        )
+
+    report = soak.run_soak(
+        images=args.images,
+        batch_size=args.batch_size,
+        max_growth_mb=args.max_growth_mb,
+        progress=progress,
+    )
+    if args.report:
+        report.write(args.report)
+    print(report.summary(), file=sys.stderr)
+    return 0 if report.passed else 1
+
+
+def _run_memory(args: argparse.Namespace) -> int:
+    """Compare worker memory with private and shared model weights."""
+    from background_remover import shared_weights
+
+    totals = {}
+    for shared in (False, True):
+        mode = "shared" if shared else "private"
+        usages = shared_weights.measure_workers(
+            args.workers, shared, args.model, args.precision
+        )
+        for index, usage in enumerate(usages, 1):
+            pss = f"{usage.pss / 1e6:.1f} MB" if usage.pss is not None else "n/a"
+            print(
+                f"{mode} worker {index}: RSS {usage.rss / 1e6:.1f} MB, PSS {pss}",
+                file=sys.stderr,
+            )
+        if all(usage.pss is not None for usage in usages):
+            totals[mode] = sum(usage.pss for usage in usages)
+
+    if len(totals) == 2:
+        print(
+            f"Total PSS of {args.workers} worker(s): "
+            f"{totals['private'] / 1e6:.1f} MB private, "
+            f"{totals['shared'] / 1e6:.1f} MB shared",
+            file=sys.stderr,
+        )
+    return 0
+
+
+def _run_benchmark(args: argparse.Namespace) -> int:
+    """Compare the per-image overhead of the inference backends."""
+    from background_remover import direct_inference, tuning
+
+    timings = tuning.benchmark_backends(
+        args.model, images=args.images, size=(args.width, args.height)
+    )
+    for timing in timings.values():
+        print(
+            f"{timing.backend}: {timing.seconds * 1000:.1f} ms/image, "
+            f"{timing.overhead_seconds * 1000:.1f} ms outside the model",
+            file=sys.stderr,
+        )
+    direct = timings[direct_inference.BACKEND_ONNXRUNTIME]
+    saved = timings[direct_inference.BACKEND_REMBG].seconds - direct.seconds
+    print(
+        f"Model alone: {direct.model_seconds * 1000:.1f} ms/image; the direct "
+        f"backend saves {saved * 1000:.1f} ms/image",
+        file=sys.stderr,
+    )
+    return 0
+
+
+def _load_samples(paths: List[Path]) -> List["np.ndarray"]:
+    """Decode sample images for calibration and accuracy checks."""
+    import numpy as np
+    from PIL import Image
+
+    samples = []
+    for path in collect_inputs(paths):
+        with Image.open(path) as img:
+            samples.append(np.array(img.convert("RGB")))
+    return samples
+
+
+def _run_quantize(args: argparse.Namespace) -> int:
+    """Create an INT8 model and report its accuracy and speed versus FP32."""
+    from background_remover import quantization, tuning
+    from background_remover.image_processor import ImageProcessor
+
+    samples = _load_samples(args.samples)
+    if not samples:
+        if args.precision == quantization.INT8_STATIC:
+            print("Static quantization needs --samples images", file=sys.stderr)
+            return 2
+        samples = tuning.synthetic_images(4)
+
+    path = quantization.quantize_model(args.model, args.precision, samples)
+    print(f"Saved {args.precision} model to {path}", file=sys.stderr)
+
+    report = quantization.accuracy_report(
+        ImageProcessor(args.model),
+        ImageProcessor(args.model, precision=args.precision),
+        samples,
+    )
+    print(
+        f"Mask IoU vs FP32 over {len(report.ious)} image(s): "
+        f"mean {report.mean_iou:.4f}, min {report.min_iou:.4f}; "
+        f"{report.speedup:.2f}x faster",
+        file=sys.stderr,
+    )
+    return 0
+
+
+def _trim_from_args(args: argparse.Namespace) -> Optional["Trim"]:
+    """Return the trim settings requested on the command line, if any."""
+    from background_remover.trim import Trim
+
+    if not args.trim:
+        return None
+    return Trim(threshold=args.trim_threshold, padding=args.trim_padding)
+
+
+def _variants_from_args(
+    args: argparse.Namespace,
+) -> Optional[List["ExportVariant"]]:
+    """Return the export variants requested on the command line, if any."""
+    from background_remover.export import DEFAULT_EXPORT_SPEC, load_export_spec
+
+    if args.variants_spec is not None:
+        return load_export_spec(args.variants_spec)
+    if args.variants:
+        return DEFAULT_EXPORT_SPEC
+    return None
+
+
+def _processor_options() -> argparse.ArgumentParser:
+    """Options shared by commands that run inference."""
+    from background_remover import direct_inference, quantization
+
+    options = argparse.ArgumentParser(add_help=False)
+    options.add_argument(
+        "--precision",
+        choices=quantization.PRECISIONS,
+        default=quantization.FP32,
+        help="Model precision; INT8 models must be created with 'quantize' first.",
+    )
+    options.add_argument(
+        "--trim",
+        action="store_true",
+        help="Crop results to the subject, recording the offset in the PNG.",
+    )
+    options.add_argument(
+        "--trim-threshold",
+        type=int,
+        default=1,
+        help="Minimum alpha (1-255) that counts as subject when trimming.",
+    )
+    options.add_argument(
+        "--trim-padding",
+        type=int,
+        default=0,
+        help="Transparent margin in pixels kept around the subject when trimming.",
+    )
+    options.add_argument(
+        "--shared-weights",
+        action="store_true",
+        help="Memory-map model weights so concurrent workers share one copy.",
+    )
+    options.add_argument(
+        "--backend",
+        choices=direct_inference.BACKENDS,
+        default=direct_inference.BACKEND_ONNXRUNTIME,
+        help="Run the model directly (default) or through rembg's processing.",
+    )
+    return options
+
+
+def _common_options() -> argparse.ArgumentParser:
+    """Options shared by every headless command."""
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument(
+        "--metrics-port",
+        type=int,
+        help="Serve Prometheus metrics on this local port while running.",
+    )
+    common.add_argument(
+        "--metrics-file",
+        type=Path,
+        help="Write Prometheus metrics to this file when the run ends.",
+    )
+    return common
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Create the argument parser for the headless commands."""
+    from background_remover import quantization
+
+    parser = argparse.ArgumentParser(
+        prog="background-remover",
+        description="Remove image backgrounds without the GUI.",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    common = _common_options()
+    processing = _processor_options()
+
+    batch = commands.add_parser(
+        "batch",
+        parents=[common, processing],
+        help="Process files or folders of images into an output folder.",
+    )
+    batch.add_argument(
+        "inputs", type=Path, nargs="+", help="Image files or folders to process."
+    )
+    batch.add_argument(
+        "-o", "--output", type=Path, required=True, help="Folder for results."
+    )
+    batch.add_argument(
+        "--timeout",
+        type=float,
+        help="Seconds a file may take before it is killed and marked failed.",
+    )
+    batch.add_argument(
+        "--memory-limit",
+        type=float,
+        metavar="MB",
+        help="Extra memory a single file may use before it is killed.",
+    )
+    batch.add_argument(
+        "--variants",
+        action="store_true",
+        help=(
+            "Render several outputs per image from one inference: cutout, "
+            "mask, white JPEG and web WebP."
+        ),
+    )
+    batch.add_argument(
+        "--variants-spec",
+        type=Path,
+        metavar="PATH",
+        help="JSON file listing the variants to render instead of the default set.",
+    )
+    batch.set_defaults(handler=_run_batch)
+
+    stream = commands.add_parser(
+        "stream",
+        parents=[common, processing],
+        help="Read images from stdin and write PNG results to stdout.",
+    )
+    stream.add_argument(
+        "--framing",
+        choices=("length", "ndjson"),
+        default="length",
+        help="Message framing: 4-byte length prefix or NDJSON with base64.",
+    )
+    stream.set_defaults(handler=_run_stream)
+
+    queue = commands.add_parser(
+        "queue",
+        parents=[common, processing],
+        help="Work on a folder shared with other workers, e.g. over a NAS.",
+    )
+    queue.add_argument("input", type=Path, help="Folder of images to process.")
+    queue.add_argument("output", type=Path, help="Folder for results.")
+    queue.add_argument(
+        "--lease-ttl",
+        type=float,
+        default=120.0,
+        help="Seconds without a heartbeat before another worker takes a file over.",
+    )
+    queue.add_argument(
+        "--poll-interval",
+        type=float,
+        default=5.0,
+        help="Seconds between rescans while other workers hold the remaining files.",
+    )
+    queue.add_argument(
+        "--follow",
+        action="store_true",
+        help="Keep waiting for new files instead of exiting when drained.",
+    )
+    queue.set_defaults(handler=_run_queue)
+
+    tune = commands.add_parser(
+        "tune",
+        parents=[common],
+        help="Find the fastest worker/thread layout for this machine.",
+    )
+    tune.add_argument(
+        "--images",
+        type=int,
+        default=8,
+        help="Synthetic images benchmarked per layout.",
+    )
+    tune.set_defaults(handler=_run_tune)
+
+    quantize = commands.add_parser(
+        "quantize",
+        parents=[common],
+        help="Create an INT8 model for faster CPU inference and check its accuracy.",
+    )
+    quantize.add_argument(
+        "--model", default="u2net", help="Model to quantize (default: u2net)."
+    )
+    quantize.add_argument(
+        "--precision",
+        choices=(quantization.INT8_DYNAMIC, quantization.INT8_STATIC),
+        default=quantization.INT8_STATIC,
+        help="Dynamic needs no samples; static is faster but needs --samples.",
+    )
+    quantize.add_argument(
+        "--samples",
+        type=Path,
+        nargs="*",
+        default=[],
+        help="Images or folders used for calibration and the accuracy check.",
+    )
+    quantize.set_defaults(handler=_run_quantize)
+
+    soak = commands.add_parser(
+        "soak",
+        parents=[common],
+        help="Process many synthetic images offline and check memory stays flat.",
+    )
+    soak.add_argument(
+        "--images", type=int, default=2000, help="Number of images to process."
+    )
+    soak.add_argument(
+        "--batch-size",
+        type=int,
+        default=50,
+        help="Images per worker batch and between memory samples.",
+    )
+    soak.add_argument(
+        "--max-growth-mb",
+        type=float,
+        default=50.0,
+        help="Steady-state memory growth above which the run fails.",
+    )
+    soak.add_argument(
+        "--report", type=Path, help="Write memory over time to this CSV file."
+    )
+    soak.set_defaults(handler=_run_soak)
+
+    memory = commands.add_parser(
+        "memory",
+        parents=[common],
+        help="Measure worker memory with private versus shared model weights.",
+    )
+    memory.add_argument(
+        "--workers", type=int, default=4, help="Worker processes to start."
+    )
+    memory.add_argument(
+        "--model", default="u2net", help="Model to load (default: u2net)."
+    )
+    memory.add_argument(
+        "--precision",
+        choices=quantization.PRECISIONS,
+        default=quantization.FP32,
+        help="Model precision; INT8 models must be created with 'quantize' first.",
+    )
+    memory.set_defaults(handler=_run_memory)
+
+    benchmark = commands.add_parser(
+        "benchmark",
+        parents=[common],
+        help="Measure the per-image overhead of the direct and rembg backends.",
+    )
+    benchmark.add_argument(
+        "--model", default="u2net", help="Model to run (default: u2net)."
+    )
+    benchmark.add_argument(
+        "--images", type=int, default=8, help="Synthetic images per backend."
+    )
+    benchmark.add_argument(
+        "--width", type=int, default=1920, help="Width of the synthetic images."
+    )
+    benchmark.add_argument(
+        "--height", type=int, default=1080, help="Height of the synthetic images."
+    )
+    benchmark.set_defaults(handler=_run_benchmark)
+
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run a headless command and return the process exit code."""
+    from background_remover import metrics
+
+    args = build_parser().parse_args(argv)
+    if args.metrics_port is not None:
+        metrics.REGISTRY.serve(args.metrics_port)
+    else:
+        metrics.start_from_environment()
+
+    try:
+        return args.handler(args)
+    finally:
+        metrics_file = args.metrics_file or metrics.file_from_environment()
+        if metrics_file:
+            metrics.REGISTRY.write(metrics_file)
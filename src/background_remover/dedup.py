@@ -0,0 +1,109 @@
+"""Detection of byte-identical input files within a batch."""
+
+import hashlib
+import os
+import shutil
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+# Bytes hashed from each end of a file for the cheap fingerprint
+PARTIAL_HASH_BYTES = 64 * 1024
+
+# Read size used when hashing whole files
+_CHUNK_SIZE = 1024 * 1024
+
+
+def partial_fingerprint(path: Path) -> Tuple[int, str]:
+    """
+    Compute a cheap fingerprint from the file size and its head and tail bytes.
+
+    Args:
+        path: File to fingerprint.
+
+    Returns:
+        Tuple of (size in bytes, hex digest of the first and last chunks).
+    """
+    size = path.stat().st_size
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        digest.update(f.read(PARTIAL_HASH_BYTES))
+        if size > 2 * PARTIAL_HASH_BYTES:
+            f.seek(-PARTIAL_HASH_BYTES, os.SEEK_END)
+            digest.update(f.read(PARTIAL_HASH_BYTES))
+        else:
+            digest.update(f.read())
+    return size, digest.hexdigest()
+
+
+def full_fingerprint(path: Path) -> str:
+    """Compute a hex digest over the entire file contents."""
+    digest = hashlib.blake2b(digest_size=32)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _split_by(paths: List[Path], key) -> List[List[Path]]:
+    """Split paths into buckets by key, keeping unreadable files on their own."""
+    buckets: Dict[object, List[Path]] = defaultdict(list)
+    singles: List[List[Path]] = []
+    for path in paths:
+        try:
+            buckets[key(path)].append(path)
+        except OSError:
+            # Let the processor report the real error for this file
+            singles.append([path])
+    return list(buckets.values()) + singles
+
+
+def group_duplicates(files: List[Path]) -> List[List[Path]]:
+    """
+    Group files with identical contents.
+
+    Files are first bucketed by size, then by a partial hash, and only files
+    that still collide are hashed in full.
+
+    Args:
+        files: Input file paths.
+
+    Returns:
+        Groups of identical files. Groups are ordered by the position of
+        their first member in ``files`` and members keep their input order.
+    """
+    order = {path: i for i, path in enumerate(files)}
+
+    groups: List[List[Path]] = []
+    for by_size in _split_by(files, lambda p: p.stat().st_size):
+        if len(by_size) == 1:
+            groups.append(by_size)
+            continue
+        for by_partial in _split_by(by_size, partial_fingerprint):
+            if len(by_partial) == 1:
+                groups.append(by_partial)
+                continue
+            groups.extend(_split_by(by_partial, full_fingerprint))
+
+    for group in groups:
+        group.sort(key=order.__getitem__)
+    groups.sort(key=lambda group: order[group[0]])
+    return groups
+
+
+def link_or_copy(source: Path, destination: Path) -> str:
+    """
+    Place a copy of ``source`` at ``destination``.
+
+    A hard link is used when the filesystem allows it, otherwise the file is
+    copied.
+
+    Returns:
+        "link" or "copy" depending on how the file was placed.
+    """
+    try:
+        os.link(source, destination)
+        return "link"
+    except OSError:
+        shutil.copy2(str(source), str(destination))
+        return "copy"
@@ -0,0 +1,217 @@
+"""Masks computed by driving ONNX Runtime directly instead of through rembg.
+
+rembg's sessions take a Pillow image, copy it to a full-size RGB image,
+resize it with Lanczos at full resolution, normalize it in float64, fetch
+every model output and return the mask as a new Pillow image. DirectSession
+runs the same model on the processor's RGBA buffer instead:
+
+* a zero-copy view of the buffer is box-reduced in C to a few times the
+  model input and then resized with Lanczos,
+* normalization and mask scaling are vectorized NumPy operations on input
+  and mask buffers that are reused for every image,
+* only the mask output is computed into a preallocated buffer.
+
+Resampling stays in Pillow, whose C resampler is faster than any NumPy
+equivalent at full resolution. Masks differ from rembg's by about one grey
+level on average; images up to REDUCING_GAP times the model input get
+rembg's masks to within rounding.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, Tuple
+
+import numpy as np
+from PIL import Image
+
+# Inference backends of ImageProcessor
+BACKEND_ONNXRUNTIME = "onnxruntime"
+BACKEND_REMBG = "rembg"
+BACKENDS = (BACKEND_ONNXRUNTIME, BACKEND_REMBG)
+
+# Images are box-reduced by a whole factor to no less than this many times
+# the model input before the Lanczos resize
+REDUCING_GAP = 3.0
+
+
+@dataclass(frozen=True)
+class ModelSpec:
+    """
+    Pre- and post-processing a rembg model expects.
+
+    Attributes:
+        size: Model input (width, height).
+        mean: Per-channel mean subtracted after scaling pixels to 0-1.
+        std: Per-channel standard deviation divided by afterwards.
+        sigmoid: Apply a sigmoid to the raw output before min-max scaling.
+    """
+
+    size: Tuple[int, int]
+    mean: Tuple[float, float, float]
+    std: Tuple[float, float, float]
+    sigmoid: bool = False
+
+
+_IMAGENET_MEAN = (0.485, 0.456, 0.406)
+_IMAGENET_STD = (0.229, 0.224, 0.225)
+_UNIT_STD = (1.0, 1.0, 1.0)
+_U2NET = ModelSpec((320, 320), _IMAGENET_MEAN, _IMAGENET_STD)
+_BIREFNET = ModelSpec((1024, 1024), _IMAGENET_MEAN, _IMAGENET_STD, sigmoid=True)
+
+# Models whose rembg sessions are reproduced here; others always use rembg
+MODEL_SPECS: Dict[str, ModelSpec] = {
+    "u2net": _U2NET,
+    "u2netp": _U2NET,
+    "u2net_human_seg": _U2NET,
+    "silueta": _U2NET,
+    "isnet-general-use": ModelSpec((1024, 1024), (0.5, 0.5, 0.5), _UNIT_STD),
+    "isnet-anime": ModelSpec((1024, 1024), _IMAGENET_MEAN, _UNIT_STD),
+    "bria-rmbg": ModelSpec((1024, 1024), _IMAGENET_MEAN, _IMAGENET_STD),
+    **{
+        f"birefnet-{variant}": _BIREFNET
+        for variant in (
+            "general",
+            "general-lite",
+            "portrait",
+            "dis",
+            "hrsod",
+            "cod",
+            "massive",
+        )
+    },
+}
+
+
+class DirectSession:
+    """
+    A rembg session with a faster mask path that bypasses rembg.
+
+    Buffers are reused between calls, so an instance must only be used by
+    one thread at a time, as the processor's session pool ensures. rembg's
+    own ``predict`` stays available.
+    """
+
+    def __init__(self, session, spec: ModelSpec):
+        """
+        Wrap a loaded rembg session.
+
+        Args:
+            session: rembg session of a model described by ``spec``.
+            spec: The model's pre- and post-processing.
+        """
+        self.rembg_session = session
+        self._spec = spec
+        inner = session.inner_session
+        width, height = spec.size
+        model_input = inner.get_inputs()[0]
+        model_output = inner.get_outputs()[0]
+
+        self._input = np.empty((1, 3, height, width), dtype=np.float32)
+        # (x / peak - mean) / std becomes x * (1 / (std * peak)) - mean / std
+        std = np.array(spec.std, dtype=np.float32).reshape(3, 1, 1)
+        self._inverse_std = 1 / std
+        self._offset = np.array(spec.mean, dtype=np.float32).reshape(3, 1, 1) / std
+        self._scale = np.empty((3, 1, 1), dtype=np.float32)
+        # Sized from the first output, which needn't match the input size
+        self._mask = np.empty((0, 0), dtype=np.uint8)
+
+        self._inner = inner
+        self._output_name = model_output.name
+        self._feeds = {model_input.name: self._input}
+        self._binding = None
+        shape = model_output.shape
+        if model_output.type == "tensor(float)" and all(
+            isinstance(dim, int) for dim in shape
+        ):
+            # Run into a preallocated output and skip the model's other outputs
+            self._output = np.empty(shape, dtype=np.float32)
+            self._binding = inner.io_binding()
+            self._binding.bind_cpu_input(model_input.name, self._input)
+            self._binding.bind_output(
+                model_output.name,
+                "cpu",
+                0,
+                np.float32,
+                list(shape),
+                self._output.ctypes.data,
+            )
+
+    @property
+    def inner_session(self):
+        return self.rembg_session.inner_session
+
+    def predict(self, img: Image.Image, *args, **kwargs):
+        """Compute masks through rembg, for callers expecting a rembg session."""
+        return self.rembg_session.predict(img, *args, **kwargs)
+
+    def predict_mask(self, rgba: np.ndarray) -> np.ndarray:
+        """
+        Compute the mask of an image.
+
+        Args:
+            rgba: C-contiguous (H, W, 4) uint8 image; alpha is ignored.
+
+        Returns:
+            The (H, W) uint8 mask.
+        """
+        self.prepare(rgba)
+        self._scale_mask(self.run_model())
+        height, width = rgba.shape[:2]
+        mask = Image.fromarray(self._mask).resize(
+            (width, height), Image.Resampling.LANCZOS
+        )
+        return np.asarray(mask)
+
+    def prepare(self, rgba: np.ndarray) -> None:
+        """Resize and normalize an image into the model's input buffer."""
+        height, width = rgba.shape[:2]
+        # RGBX reads the buffer in place and skips alpha, like convert("RGB")
+        view = Image.frombuffer("RGBX", (width, height), rgba, "raw", "RGBX", 0, 1)
+        small = np.asarray(
+            view.resize(
+                self._spec.size, Image.Resampling.LANCZOS, reducing_gap=REDUCING_GAP
+            )
+        )
+        rgb = small[:, :, :3].transpose(2, 0, 1)
+        # rembg scales by the brightest value rather than by 255
+        np.divide(self._inverse_std, max(int(rgb.max()), 1), out=self._scale)
+        np.multiply(rgb, self._scale, out=self._input[0])
+        self._input[0] -= self._offset
+
+    def run_model(self) -> np.ndarray:
+        """Run the model on the input buffer and return its raw mask output."""
+        if self._binding is None:
+            return self._inner.run([self._output_name], self._feeds)[0]
+        self._inner.run_with_iobinding(self._binding)
+        return self._output
+
+    def _scale_mask(self, output: np.ndarray) -> None:
+        """Scale a raw output to 0-255 into the mask buffer, in place."""
+        prediction = output[0, 0]
+        if self._spec.sigmoid:
+            np.negative(prediction, out=prediction)
+            np.exp(prediction, out=prediction)
+            prediction += 1
+            np.reciprocal(prediction, out=prediction)
+        low, high = prediction.min(), prediction.max()
+        if high > low:
+            prediction -= low
+            prediction *= 255 / (high - low)
+        else:
+            prediction.fill(0)
+        if self._mask.shape != prediction.shape:
+            self._mask = np.empty(prediction.shape, dtype=np.uint8)
+        # Truncates like rembg's astype("uint8")
+        np.copyto(self._mask, prediction, casting="unsafe")
+
+
+def wrap_session(session, model_name: str):
+    """
+    Return a DirectSession for a rembg session if its model is supported.
+
+    Sessions that aren't rembg sessions, such as test stand-ins, and models
+    without a known spec are returned unchanged and keep using rembg.
+    """
+    spec = MODEL_SPECS.get(model_name)
+    if spec is None or not hasattr(session, "inner_session"):
+        return session
+    return DirectSession(session, spec)
@@ -0,0 +1,233 @@
+"""Time-remaining estimates for batches of mixed-size images.
+
+Each processing stage is modelled as a fixed cost per file plus a cost per
+megapixel, fitted per model from recent files and saved next to the tuning
+profile so the first estimate of a batch is already informed. During a
+batch the stage costs are scaled by the wall-clock time the batch actually
+takes per second of stage work, which absorbs parallelism and contention.
+"""
+
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+from background_remover.tuning import config_dir
+
+COSTS_FILENAME = "eta.json"
+
+# Weight an older file keeps each time a newer one is learned from
+COST_DECAY = 0.95
+
+# Same, for the live wall-clock to stage-time ratio of the running batch
+LIVE_DECAY = 0.9
+
+
+class StageCost:
+    """Seconds per file of one stage, fitted as fixed + per-megapixel cost."""
+
+    def __init__(self, sums: Optional[List[float]] = None):
+        # Decayed weight, Σx, Σx², Σy and Σxy of (megapixels, seconds)
+        self.sums = list(sums) if sums else [0.0] * 5
+
+    def observe(self, megapixels: float, seconds: float) -> None:
+        """Learn from one file, fading older ones out."""
+        x, y = megapixels, seconds
+        self.sums = [
+            total * COST_DECAY + value
+            for total, value in zip(self.sums, (1.0, x, x * x, y, x * y))
+        ]
+
+    def coefficients(self) -> Optional[List[float]]:
+        """Return [fixed seconds, seconds per megapixel], or None if unknown."""
+        n, sx, sxx, sy, sxy = self.sums
+        if n <= 0:
+            return None
+        determinant = n * sxx - sx * sx
+        if determinant > 1e-9 * n * sxx:
+            per_mp = (n * sxy - sx * sy) / determinant
+            fixed = (sy - per_mp * sx) / n
+            if per_mp >= 0 and fixed >= 0:
+                return [fixed, per_mp]
+        # Too little size variety for a line: attribute all cost to pixels,
+        # which is exact for the sizes seen so far
+        if sx > 0:
+            return [0.0, sy / sx]
+        return [sy / n, 0.0]
+
+    def predict(self, megapixels: float) -> Optional[float]:
+        """Return the expected seconds for a file of the given size."""
+        coefficients = self.coefficients()
+        if coefficients is None:
+            return None
+        fixed, per_mp = coefficients
+        return fixed + per_mp * megapixels
+
+
+class CostModel:
+    """Learned stage costs for every model, keyed by model and precision."""
+
+    def __init__(self, costs: Optional[Dict[str, Dict[str, StageCost]]] = None):
+        self._costs = costs or {}
+        self._lock = threading.Lock()
+
+    def observe(self, model: str, stage: str, megapixels: float, seconds: float):
+        """Learn a stage's cost from one file."""
+        with self._lock:
+            stages = self._costs.setdefault(model, {})
+            stages.setdefault(stage, StageCost()).observe(megapixels, seconds)
+
+    def predict(self, model: str, megapixels: float) -> Optional[float]:
+        """Return the expected stage seconds of one file, or None if unknown."""
+        with self._lock:
+            predictions = [
+                cost.predict(megapixels)
+                for cost in self._costs.get(model, {}).values()
+            ]
+        known = [p for p in predictions if p is not None]
+        return sum(known) if known else None
+
+    @classmethod
+    def load(cls, path: Optional[Path] = None) -> "CostModel":
+        """Read saved costs, starting fresh if there are none or they're invalid."""
+        path = path or config_dir() / COSTS_FILENAME
+        try:
+            data = json.loads(path.read_text("utf-8"))
+            return cls(
+                {
+                    model: {
+                        stage: StageCost([float(v) for v in sums])
+                        for stage, sums in stages.items()
+                        if len(sums) == 5
+                    }
+                    for model, stages in data["models"].items()
+                }
+            )
+        except (OSError, ValueError, TypeError, KeyError, AttributeError):
+            return cls()
+
+    def save(self, path: Optional[Path] = None) -> Path:
+        """Write the costs to the per-machine settings folder."""
+        path = path or config_dir() / COSTS_FILENAME
+        with self._lock:
+            data = {
+                "models": {
+                    model: {stage: cost.sums for stage, cost in stages.items()}
+                    for model, stages in self._costs.items()
+                }
+            }
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(data, indent=2), encoding="utf-8")
+        return path
+
+
+class EtaEstimator:
+    """Tracks one batch and predicts when it will finish."""
+
+    def __init__(
+        self,
+        model: str,
+        sizes: Dict[Path, float],
+        costs: CostModel,
+        parallelism: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Initialize the estimator.
+
+        Args:
+            model: Key the costs are learned under, e.g. "u2net-fp32".
+            sizes: Megapixels of every file still to be processed.
+            costs: Learned stage costs, updated as files finish.
+            parallelism: Files processed at once, used until the batch's
+                own throughput is known.
+            clock: Monotonic time source in seconds.
+        """
+        self._model = model
+        self._remaining = dict(sizes)
+        self._costs = costs
+        self._parallelism = max(1, parallelism)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._last = clock()
+        # Decayed wall-clock seconds, stage seconds and megapixels
+        self._wall = 0.0
+        self._work = 0.0
+        self._megapixels = 0.0
+
+    def file_done(self, path: Path, stage_seconds: Dict[str, float]) -> None:
+        """
+        Record a processed file and learn from its stage timings.
+
+        Args:
+            path: The file.
+            stage_seconds: Seconds spent in each stage on this file.
+        """
+        with self._lock:
+            megapixels = self._remaining.pop(path, 0.0)
+            now = self._clock()
+            self._wall = self._wall * LIVE_DECAY + (now - self._last)
+            self._work = self._work * LIVE_DECAY + sum(stage_seconds.values())
+            self._megapixels = self._megapixels * LIVE_DECAY + megapixels
+            self._last = now
+        for stage, seconds in stage_seconds.items():
+            self._costs.observe(self._model, stage, megapixels, seconds)
+
+    def add(self, sizes: Dict[Path, float]) -> None:
+        """Include more files, e.g. ones queued while the batch runs."""
+        with self._lock:
+            self._remaining.update(sizes)
+
+    def skip(self, path: Path) -> None:
+        """Drop a file that needs no estimate, e.g. one that failed."""
+        with self._lock:
+            self._remaining.pop(path, None)
+
+    def remaining_seconds(self) -> Optional[float]:
+        """Return the expected seconds until the batch ends, or None if unknown."""
+        with self._lock:
+            sizes = list(self._remaining.values())
+            wall, work = self._wall, self._work
+        if not sizes:
+            return 0.0
+        work_left = self._predict(sizes)
+        if work_left is None:
+            return None
+        ratio = wall / work if work > 0 else 1 / self._parallelism
+        return work_left * ratio
+
+    def throughput(self) -> float:
+        """Return recent megapixels processed per second."""
+        with self._lock:
+            return self._megapixels / self._wall if self._wall > 0 else 0.0
+
+    def _predict(self, sizes: Iterable[float]) -> Optional[float]:
+        total = 0.0
+        for megapixels in sizes:
+            seconds = self._costs.predict(self._model, megapixels)
+            if seconds is None:
+                return None
+            total += seconds
+        return total
+
+
+def format_duration(seconds: float) -> str:
+    """Format seconds as a short duration such as "1h 05m" or "4m 10s"."""
+    seconds = int(round(seconds))
+    if seconds >= 3600:
+        return f"{seconds // 3600}h {seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m {seconds % 60:02d}s"
+    return f"{seconds}s"
+
+
+def describe(seconds: Optional[float], now: Optional[float] = None) -> str:
+    """Describe time remaining with the wall-clock time it ends at."""
+    if seconds is None:
+        return "Estimating time remaining..."
+    finish = time.localtime((time.time() if now is None else now) + seconds)
+    return (
+        f"About {format_duration(seconds)} remaining "
+        f"(done around {time.strftime('%H:%M', finish)})"
+    )
@@ -0,0 +1,179 @@
+"""Output variants rendered from a single background-removal mask."""
+
+import json
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from background_remover.trim import content_bbox, save_png, write_sidecar
+
+# Variant kinds and what they contain
+CUTOUT = "cutout"  # RGBA image with a transparent background
+MASK = "mask"  # Grayscale foreground mask
+FLATTEN = "flatten"  # Cutout composited onto a solid background color
+
+_EXTENSIONS = {"PNG": ".png", "JPEG": ".jpg", "WEBP": ".webp"}
+
+# Image.info key carrying a rendered variant's crop box, original size and
+# scale
+_CROP_INFO = "bgremover.crop"
+
+
+@dataclass(frozen=True)
+class ExportVariant:
+    """
+    Description of one output derived from an image and its mask.
+
+    Attributes:
+        name: Tag appended to the output file stem, e.g. ``photo_web.webp``.
+        kind: One of CUTOUT, MASK or FLATTEN.
+        format: Pillow format name (PNG, JPEG or WEBP).
+        background: RGB color used by FLATTEN variants.
+        max_size: Optional limit for the longest edge in pixels.
+        trim: Crop to the bounding box of the subject before resizing.
+        trim_threshold: Minimum mask value that counts as subject when trimming.
+        trim_padding: Margin in pixels kept around the subject when trimming.
+        quality: Encoder quality for lossy formats.
+    """
+
+    name: str
+    kind: str = CUTOUT
+    format: str = "PNG"
+    background: Tuple[int, int, int] = (255, 255, 255)
+    max_size: Optional[int] = None
+    trim: bool = False
+    trim_threshold: int = 1
+    trim_padding: int = 0
+    quality: int = 90
+
+    def __post_init__(self):
+        if self.kind not in (CUTOUT, MASK, FLATTEN):
+            raise ValueError(f"Unknown variant kind: {self.kind}")
+        if self.format not in _EXTENSIONS:
+            raise ValueError(f"Unsupported export format: {self.format}")
+        if self.format == "JPEG" and self.kind == CUTOUT:
+            raise ValueError("JPEG cannot store transparency; use kind='flatten'")
+        if not 1 <= self.trim_threshold <= 255:
+            raise ValueError("Trim threshold must be between 1 and 255")
+
+    @property
+    def extension(self) -> str:
+        """File extension for this variant's format."""
+        return _EXTENSIONS[self.format]
+
+    def render(
+        self,
+        cutout: Image.Image,
+        mask: Image.Image,
+        source: Optional[Image.Image] = None,
+    ) -> Image.Image:
+        """
+        Build the output image from a shared cutout and mask.
+
+        Args:
+            cutout: RGBA image with the background removed.
+            mask: "L" foreground mask matching the cutout size.
+            source: RGB image the cutout was made from; required by FLATTEN
+                variants, since the cutout's colors are already scaled by
+                the mask.
+
+        Returns:
+            A new image ready to be saved; the inputs are not modified. A
+            trimmed image carries its crop in ``info`` for save().
+        """
+        if self.kind == MASK:
+            result = mask.copy()
+        elif self.kind == FLATTEN:
+            if source is None:
+                raise ValueError("Flattened variants need the source image")
+            # Pasting the cutout itself would apply the mask a second time
+            # and darken semi-transparent edges
+            result = Image.new("RGB", cutout.size, self.background)
+            result.paste(source, mask=mask)
+        else:
+            result = cutout.copy()
+
+        box = None
+        if self.trim:
+            box = content_bbox(
+                np.asarray(mask), self.trim_threshold, self.trim_padding
+            )
+            if box:
+                result = result.crop(box)
+
+        scale = 1.0
+        if self.max_size:
+            width = result.width
+            result.thumbnail(
+                (self.max_size, self.max_size), Image.Resampling.LANCZOS
+            )
+            scale = result.width / width
+        if box:
+            # Resizing keeps the source box; the scale maps it to output pixels
+            result.info[_CROP_INFO] = (box, cutout.size, scale)
+        return result
+
+    def save(self, image: Image.Image, output_path: Path) -> None:
+        """
+        Encode an image rendered by this variant.
+
+        Trimmed PNGs record their crop in the file; other formats get a
+        sidecar next to it.
+        """
+        options = {}
+        if self.format in ("JPEG", "WEBP"):
+            options["quality"] = self.quality
+
+        crop = image.info.get(_CROP_INFO)
+        # Use string path for Windows compatibility
+        if self.format == "PNG":
+            save_png(image, str(output_path), *(crop or ()), **options)
+            return
+        if crop:
+            write_sidecar(output_path, *crop)
+        image.save(str(output_path), self.format, **options)
+
+
+# Derivatives commonly needed for catalog product photos
+DEFAULT_EXPORT_SPEC: List[ExportVariant] = [
+    ExportVariant("cutout"),
+    ExportVariant("mask", kind=MASK),
+    ExportVariant("white", kind=FLATTEN, format="JPEG"),
+    ExportVariant("web", format="WEBP", trim=True, max_size=1024),
+]
+
+
+def load_export_spec(path: Path) -> List[ExportVariant]:
+    """
+    Read an export spec from a JSON file.
+
+    The file holds a list of objects whose keys are ExportVariant fields, e.g.
+    ``[{"name": "web", "format": "WEBP", "trim": true, "max_size": 1024}]``.
+
+    Raises:
+        OSError: If the file can't be read.
+        ValueError: If the file isn't a list of valid, uniquely named variants.
+    """
+    with open(path, encoding="utf-8") as f:
+        items = json.load(f)
+    if not isinstance(items, list) or not items:
+        raise ValueError("An export spec must be a non-empty list of variants")
+
+    variants = []
+    for item in items:
+        if not isinstance(item, dict):
+            raise ValueError(f"Invalid export variant: {item!r}")
+        if "background" in item:
+            item = {**item, "background": tuple(item["background"])}
+        try:
+            variants.append(ExportVariant(**item))
+        except TypeError as e:
+            raise ValueError(f"Invalid export variant {item!r}: {e}") from e
+
+    names = [variant.name for variant in variants]
+    if len(set(names)) != len(names):
+        raise ValueError("Export variant names must be unique")
+    return variants
@@ -1,42 +1,231 @@
 """Image processing wrapper for rembg."""
 
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from threading import Lock
+from typing import (
+    BinaryIO,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
 
-from PIL import Image
-from rembg import new_session, remove
+import numpy as np
+import onnxruntime as ort
+from PIL import Image, ImageOps, ImageSequence
+from rembg import new_session
+
+from background_remover import direct_inference, metrics, quantization, shared_weights
+from background_remover.apng import APNGWriter
+from background_remover.export import FLATTEN, ExportVariant
+from background_remover.preflight import SUPPORTED_EXTENSIONS, animation_frames
+from background_remover.session_pool import SessionPool
+from background_remover.trim import Box, Trim, metadata_chunks, save_png, union
 
 
 class ImageProcessor:
-    """Handles background removal using rembg."""
+    """Handles background removal with rembg models."""
+
+    SUPPORTED_FORMATS = SUPPORTED_EXTENSIONS
+
+    # Mean absolute difference (0-255) between downscaled grayscale frames
+    # below which the previous frame's mask is reused instead of re-inferring
+    FRAME_REUSE_THRESHOLD = 2.0
 
-    SUPPORTED_FORMATS = {".png", ".jpg", ".jpeg", ".webp", ".bmp", ".gif", ".tiff"}
+    # Size frames are reduced to before comparing them
+    FRAME_SIGNATURE_SIZE = (64, 64)
 
-    def __init__(self):
-        """Initialize the processor with a reusable rembg session."""
-        self._session = None
+    # Frame duration in milliseconds used when the source doesn't provide one
+    DEFAULT_FRAME_DURATION = 100
+
+    # Upper bound on pooled sessions when none is given; each one holds a
+    # copy of the model, so they are only created when threads contend
+    DEFAULT_MAX_SESSIONS = min(4, os.cpu_count() or 1)
+
+    def __init__(
+        self,
+        model_name: str = "u2net",
+        intra_op_threads: Optional[int] = None,
+        precision: str = quantization.FP32,
+        trim: Optional[Trim] = None,
+        max_sessions: Optional[int] = None,
+        session_factory: Optional[Callable[[], object]] = None,
+        shared_weights: bool = False,
+        backend: str = direct_inference.BACKEND_ONNXRUNTIME,
+    ):
+        """
+        Initialize the processor with a pool of reusable rembg sessions.
+
+        The processor is safe to share between threads: each inference
+        borrows a session from the pool, and sessions are created on demand
+        up to ``max_sessions``.
+
+        Args:
+            model_name: rembg model to load.
+            intra_op_threads: ONNX Runtime threads per inference; None keeps
+                the runtime default.
+            precision: FP32 or a quantized INT8 variant created beforehand
+                with ``quantization.quantize_model``.
+            trim: Crop PNG outputs to their content, recording the crop in
+                the file's metadata; None keeps the full canvas.
+            max_sessions: Most sessions run concurrently; defaults to
+                DEFAULT_MAX_SESSIONS.
+            session_factory: Creates sessions instead of loading the rembg
+                model; anything with a rembg-style ``predict`` works.
+            shared_weights: Memory-map the model weights so every session
+                and process on the machine shares one read-only copy; see
+                ``shared_weights.prepare_shared_model``.
+            backend: "onnxruntime" computes masks by running the model
+                directly with NumPy pre- and post-processing; "rembg" uses
+                rembg's own. Models and sessions the direct path doesn't
+                support always use rembg.
+
+        Raises:
+            ValueError: If the precision or backend is unknown.
+        """
+        if precision not in quantization.PRECISIONS:
+            raise ValueError(f"Unsupported precision: {precision}")
+        if backend not in direct_inference.BACKENDS:
+            raise ValueError(f"Unsupported backend: {backend}")
+        self.model_name = model_name
+        self.intra_op_threads = intra_op_threads
+        self.precision = precision
+        self.trim = trim
+        self.session_factory = session_factory
+        self.shared_weights = shared_weights
+        self.backend = backend
+        self._session_factory = session_factory or self._create_session
+        self._pool = SessionPool(
+            self._new_session,
+            max_sessions or self.DEFAULT_MAX_SESSIONS,
+            label=model_name,
+        )
+        self._output_lock = Lock()
+        self._reserved_outputs: Set[Path] = set()
 
     @property
     def session(self):
-        """Lazy-load the rembg session for batch efficiency."""
-        if self._session is None:
-            try:
-                self._session = new_session("u2net")
-            except Exception as e:
-                raise RuntimeError(
-                    f"Failed to initialize rembg session: {e}. "
-                    "Ensure you have internet connection for first-time model download."
-                ) from e
-        return self._session
+        """
+        Return a pooled session, loading the model first if needed.
+
+        Useful for loading the model ahead of time; inference borrows
+        sessions from the pool itself so concurrent callers never share one.
+        """
+        with self._pool.acquire() as session:
+            return session
+
+    @property
+    def max_sessions(self) -> int:
+        """Return the most sessions that run inference at once."""
+        return self._pool.max_size
+
+    def close(self) -> None:
+        """Free the loaded sessions; the model is loaded again if needed."""
+        self._pool.clear()
+
+    def session_pool_size(self) -> int:
+        """Return how many sessions the pool has created."""
+        return self._pool.size()
+
+    def _new_session(self):
+        """Create a session for the pool."""
+        try:
+            session = self._session_factory()
+        except Exception as e:
+            raise RuntimeError(
+                f"Failed to initialize rembg session: {e}. "
+                "Ensure you have internet connection for first-time model download."
+            ) from e
+        if self.backend == direct_inference.BACKEND_ONNXRUNTIME:
+            session = direct_inference.wrap_session(session, self.model_name)
+        return session
+
+    def _create_session(self):
+        """Create a rembg session honouring the thread count and precision."""
+        if (
+            self.intra_op_threads is None
+            and self.precision == quantization.FP32
+            and not self.shared_weights
+        ):
+            return new_session(self.model_name)
+
+        sess_opts = ort.SessionOptions()
+        if self.intra_op_threads is not None:
+            sess_opts.intra_op_num_threads = self.intra_op_threads
+            sess_opts.inter_op_num_threads = 1
+
+        session_class = quantization.session_class_for(self.model_name)
+        if self.shared_weights:
+            weights = shared_weights.load_shared_weights(
+                self.model_name, self.precision
+            )
+            weights.apply(sess_opts)
+            return quantization.session_class_for_file(
+                session_class, weights.graph_path
+            )(self.model_name, sess_opts)
+        if self.precision != quantization.FP32:
+            model_path = quantization.quantized_model_path(
+                self.model_name, self.precision
+            )
+            if not model_path.exists():
+                raise FileNotFoundError(
+                    f"No {self.precision} model at {model_path}; create it with "
+                    f"'background-remover quantize --precision {self.precision}'"
+                )
+            session_class = quantization.session_class_for_file(
+                session_class, model_path
+            )
+        return session_class(self.model_name, sess_opts)
 
     @classmethod
     def is_supported_format(cls, path: Path) -> bool:
         """Check if a file has a supported image format."""
         return path.suffix.lower() in cls.SUPPORTED_FORMATS
 
+    def process_array(
+        self, array: np.ndarray, inplace: bool = False
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Remove the background from a decoded image held in a NumPy array.
+
+        The cutout is built in a single RGBA buffer: the model sees a view of
+        it and the mask is applied in place, so no further full-resolution
+        copies are made.
+
+        Args:
+            array: uint8 image of shape (H, W), (H, W, 3) or (H, W, 4).
+            inplace: Reuse ``array`` as the output buffer when it is already a
+                C-contiguous RGBA array instead of copying it first.
+
+        Returns:
+            Tuple of the (H, W, 4) RGBA cutout and the (H, W) uint8 mask.
+
+        Raises:
+            ValueError: If the array shape or dtype is not supported.
+        """
+        rgba = self.to_rgba_buffer(array, inplace)
+        metrics.IMAGE_MEGAPIXELS.observe(rgba.shape[0] * rgba.shape[1] / 1e6)
+
+        with metrics.STAGE_SECONDS.time(stage="inference"):
+            mask = self._compute_mask(rgba)
+        with metrics.STAGE_SECONDS.time(stage="alpha"):
+            self._apply_alpha(rgba, mask)
+        return rgba, mask
+
     def process_image(self, input_path: Path, output_path: Path) -> None:
         """
         Remove background from an image and save as PNG with transparency.
 
+        Multi-frame inputs (animated GIF/WebP, multi-page TIFF) are saved as an
+        animated PNG with every frame processed.
+
         Args:
             input_path: Path to the input image file.
             output_path: Path where the output PNG will be saved.
@@ -46,59 +235,483 @@ class ImageProcessor:
             ValueError: If input format is not supported.
             Exception: If processing fails.
         """
+        # Ensure output has .png extension
+        output_path = output_path.with_suffix(".png")
+
+        try:
+            img = self.open_image(input_path)
+
+            # Use string path for Windows compatibility
+            self.process_opened(img, str(output_path))
+        finally:
+            self.release_output_path(output_path)
+
+    def process_bytes(self, data: bytes) -> bytes:
+        """
+        Remove background from an encoded image held in memory.
+
+        Args:
+            data: Encoded image bytes in any supported format.
+
+        Returns:
+            The result encoded as PNG with transparency.
+
+        Raises:
+            RuntimeError: If the data can't be decoded or processing fails.
+        """
+        output = io.BytesIO()
+        self.process_stream(io.BytesIO(data), output)
+        return output.getvalue()
+
+    def process_stream(self, source: BinaryIO, destination: BinaryIO) -> None:
+        """
+        Remove background from an image read from a binary file object.
+
+        Args:
+            source: Readable binary stream containing an encoded image.
+            destination: Writable binary stream the PNG result is written to.
+
+        Raises:
+            RuntimeError: If the data can't be decoded or processing fails.
+        """
+        try:
+            img = Image.open(source)
+        except Exception as e:
+            raise RuntimeError(f"Failed to open image: {e}") from e
+
+        self.process_opened(img, destination)
+
+    def process_opened(
+        self, img: Image.Image, destination: Union[str, BinaryIO]
+    ) -> None:
+        """
+        Process an opened Pillow image and save the PNG to a path or stream.
+
+        Multi-frame images are processed frame by frame. The image is closed
+        once it has been decoded.
+
+        Args:
+            img: Image returned by open_image() or Image.open().
+            destination: Output path, or a writable binary stream.
+
+        Raises:
+            Exception: If processing fails.
+        """
+        with img:
+            if animation_frames(img) > 1:
+                self._process_frames(img, destination)
+                return
+
+            rgba = self.decode(img)
+
+        nbytes = rgba.nbytes
+        metrics.IN_FLIGHT_BYTES.inc(nbytes)
+        try:
+            rgba, _ = self.process_array(rgba, inplace=True)
+            self.encode_png(rgba, destination)
+        finally:
+            metrics.IN_FLIGHT_BYTES.dec(nbytes)
+
+    def encode_png(
+        self, rgba: np.ndarray, destination: Union[str, BinaryIO]
+    ) -> None:
+        """
+        Save a cutout as PNG, trimming it to its content if configured.
+
+        Args:
+            rgba: (H, W, 4) uint8 cutout, as returned by process_array().
+            destination: Output path, or a writable binary stream.
+        """
+        with metrics.STAGE_SECONDS.time(stage="encode"):
+            box = self.trim.bbox(rgba[..., 3]) if self.trim else None
+            height, width = rgba.shape[:2]
+            if box:
+                # Crop a view so only the content gets copied and encoded
+                rgba = rgba[box[1] : box[3], box[0] : box[2]]
+            save_png(Image.fromarray(rgba), destination, box, (width, height))
+
+    def open_image(self, input_path: Path) -> Image.Image:
+        """
+        Validate an input path and open it lazily with Pillow.
+
+        Args:
+            input_path: Path to the input image file.
+
+        Returns:
+            The opened image; pixels are decoded on first access.
+
+        Raises:
+            FileNotFoundError: If input file doesn't exist.
+            ValueError: If input format is not supported.
+            RuntimeError: If Pillow can't open the file.
+        """
         if not input_path.exists():
             raise FileNotFoundError(f"Input file not found: {input_path}")
 
         if not self.is_supported_format(input_path):
             raise ValueError(f"Unsupported format: {input_path.suffix}")
 
-        # Ensure output has .png extension
-        output_path = output_path.with_suffix(".png")
-
-        # Load input image
         try:
-            img = Image.open(input_path)
+            return Image.open(input_path)
         except Exception as e:
             raise RuntimeError(
                 f"Failed to open image '{input_path.name}': {e}"
             ) from e
 
-        with img:
-            # Convert to RGBA if needed
-            if img.mode != "RGBA":
-                img = img.convert("RGBA")
-
-            # Remove background using rembg
-            result = remove(img, session=self.session)
-
-            # Validate result
-            if result is None:
-                raise RuntimeError(
-                    "Background removal failed - rembg returned None. "
-                    "This may indicate the model failed to load."
+    def decode(self, img: Image.Image) -> np.ndarray:
+        """
+        Decode a single-frame image into an upright RGBA buffer.
+
+        Args:
+            img: Opened Pillow image; only its current frame is decoded.
+
+        Returns:
+            Writable (H, W, 4) uint8 array with EXIF orientation applied.
+        """
+        with metrics.STAGE_SECONDS.time(stage="decode"):
+            # Apply EXIF orientation so the mask lines up with the saved pixels
+            return self._image_to_array(ImageOps.exif_transpose(img))
+
+    @staticmethod
+    def to_rgba_buffer(array: np.ndarray, inplace: bool) -> np.ndarray:
+        """
+        Return a C-contiguous (H, W, 4) uint8 buffer holding the image.
+
+        Args:
+            array: Grayscale (H, W), RGB (H, W, 3) or RGBA (H, W, 4) uint8 image.
+            inplace: Return the array itself when it is already a writable
+                C-contiguous RGBA buffer, instead of a copy.
+
+        Returns:
+            The RGBA buffer; opaque alpha is added to grayscale and RGB input.
+
+        Raises:
+            ValueError: If the dtype or shape isn't supported.
+        """
+        if array.dtype != np.uint8:
+            raise ValueError(f"Expected a uint8 array, got {array.dtype}")
+
+        if array.ndim == 3 and array.shape[2] == 4:
+            if inplace and array.flags.c_contiguous and array.flags.writeable:
+                return array
+            return np.array(array, order="C")
+
+        if array.ndim == 2:
+            rgb = array[:, :, np.newaxis]
+        elif array.ndim == 3 and array.shape[2] == 3:
+            rgb = array
+        else:
+            raise ValueError(f"Unsupported array shape: {array.shape}")
+
+        rgba = np.empty(array.shape[:2] + (4,), dtype=np.uint8)
+        rgba[:, :, :3] = rgb
+        rgba[:, :, 3] = 255
+        return rgba
+
+    def export_variants(
+        self,
+        input_path: Path,
+        output_folder: Path,
+        variants: List[ExportVariant],
+        output_paths: Optional[Dict[str, Path]] = None,
+    ) -> Dict[str, Path]:
+        """
+        Render several outputs for one image from a single inference.
+
+        The input is decoded once and the mask computed once; the variants are
+        then rendered and encoded in parallel. Multi-frame inputs use their
+        first frame.
+
+        Args:
+            input_path: Path to the input image file.
+            output_folder: Folder where outputs will be saved.
+            variants: Outputs to produce.
+            output_paths: Where to save each variant, as reserved by the
+                caller with variant_output_paths(); when None, paths are
+                reserved and released here.
+
+        Returns:
+            Mapping of variant name to the path it was saved at.
+
+        Raises:
+            FileNotFoundError: If input file doesn't exist.
+            ValueError: If input format is not supported.
+            Exception: If processing fails.
+        """
+        with self.open_image(input_path) as img:
+            rgba = self.decode(img)
+
+        reserved = output_paths is None
+        if reserved:
+            output_paths = self.variant_output_paths(
+                input_path, output_folder, variants
+            )
+        metrics.IN_FLIGHT_BYTES.inc(rgba.nbytes)
+        try:
+            self._render_variants(variants, rgba, output_paths)
+        finally:
+            metrics.IN_FLIGHT_BYTES.dec(rgba.nbytes)
+            if reserved:
+                for output_path in output_paths.values():
+                    self.release_output_path(output_path)
+        return output_paths
+
+    def variant_output_paths(
+        self, input_path: Path, output_folder: Path, variants: List[ExportVariant]
+    ) -> Dict[str, Path]:
+        """
+        Reserve an output path for every variant of an image.
+
+        Each path stays reserved until release_output_path() is called.
+        """
+        return {
+            variant.name: self.generate_output_path(
+                input_path, output_folder, variant.name, variant.extension
+            )
+            for variant in variants
+        }
+
+    def _render_variants(
+        self,
+        variants: List[ExportVariant],
+        rgba: np.ndarray,
+        output_paths: Dict[str, Path],
+    ) -> None:
+        """Run inference on a decoded buffer and encode every variant."""
+        source = None
+        if any(variant.kind == FLATTEN for variant in variants):
+            # The mask is applied in place; keep the colors flattening needs
+            source = Image.fromarray(np.ascontiguousarray(rgba[:, :, :3]))
+        rgba, mask_array = self.process_array(rgba, inplace=True)
+        cutout = Image.fromarray(rgba)
+        mask = Image.fromarray(mask_array)
+
+        def render(variant: ExportVariant) -> None:
+            image = variant.render(cutout, mask, source)
+            variant.save(image, output_paths[variant.name])
+
+        # Pillow releases the GIL while encoding, so variants encode in parallel
+        with metrics.STAGE_SECONDS.time(stage="encode"):
+            with ThreadPoolExecutor(max_workers=max(1, len(variants))) as pool:
+                for future in [pool.submit(render, v) for v in variants]:
+                    future.result()
+
+    @staticmethod
+    def _image_to_array(img: Image.Image) -> np.ndarray:
+        """Decode a Pillow image into a writable RGBA array."""
+        if img.mode != "RGBA":
+            img = img.convert("RGBA")
+        return np.array(img)
+
+    def _compute_mask(self, rgba: np.ndarray) -> np.ndarray:
+        """Run inference on an RGBA buffer and return the (H, W) uint8 mask."""
+        with self._pool.acquire() as session:
+            if isinstance(session, direct_inference.DirectSession):
+                return session.predict_mask(rgba)
+            height, width = rgba.shape[:2]
+            # frombuffer wraps the array without copying it
+            img = Image.frombuffer("RGBA", (width, height), rgba, "raw", "RGBA", 0, 1)
+            masks = session.predict(img)
+
+        # Validate result
+        if not masks or masks[0] is None:
+            raise RuntimeError(
+                "Background removal failed - rembg returned no mask. "
+                "This may indicate the model failed to load."
+            )
+        return np.asarray(masks[0].convert("L"))
+
+    @staticmethod
+    def _apply_alpha(rgba: np.ndarray, mask: np.ndarray) -> None:
+        """
+        Scale every channel of an RGBA buffer by ``mask / 255`` in place.
+
+        Matches compositing the image over a transparent background with the
+        mask, using one (H, W) uint16 scratch plane instead of whole-image
+        temporaries.
+        """
+        scratch = np.empty(mask.shape, dtype=np.uint16)
+        for channel in range(4):
+            np.multiply(rgba[:, :, channel], mask, out=scratch, dtype=np.uint16)
+            scratch += 127
+            scratch //= 255
+            rgba[:, :, channel] = scratch
+
+    def _frame_signature(self, frame: Image.Image) -> np.ndarray:
+        """Reduce a frame to a small grayscale array for change detection."""
+        small = frame.convert("L").resize(
+            self.FRAME_SIGNATURE_SIZE, Image.Resampling.BILINEAR
+        )
+        return np.asarray(small, dtype=np.float32)
+
+    def _frames_match(self, reference: np.ndarray, signature: np.ndarray) -> bool:
+        """Check whether two frame signatures are close enough to share a mask."""
+        difference = np.abs(reference - signature).mean()
+        return bool(difference < self.FRAME_REUSE_THRESHOLD)
+
+    def _process_frames(
+        self, img: Image.Image, destination: Union[str, BinaryIO]
+    ) -> None:
+        """
+        Remove the background from every frame and save an animated PNG.
+
+        Frames are decoded, masked and written one at a time, so memory use
+        doesn't grow with the length of the animation. When trimming, every
+        frame is cropped to the union of the frames' content so they stay
+        aligned; a first pass finds that box and keeps each mask cut to its
+        own frame's content, which the second pass applies again without
+        running inference.
+        """
+        if not self.trim:
+            frames = (
+                (rgba, duration) for rgba, _, duration in self._masked_frames(img)
+            )
+            self._write_frames(img, destination, frames)
+            return
+
+        box: Optional[Box] = None
+        pieces: List[Optional[Tuple[Box, np.ndarray]]] = []
+        previous: Optional[np.ndarray] = None
+        for rgba, mask, _ in self._masked_frames(img):
+            content = self.trim.bbox(rgba[..., 3])
+            box = union(box, content)
+            if content is None:
+                pieces.append(None)
+            elif mask is previous and pieces[-1] and pieces[-1][0] == content:
+                # A reused mask over unchanged content keeps sharing its piece
+                pieces.append(pieces[-1])
+            else:
+                left, top, right, bottom = content
+                pieces.append((content, mask[top:bottom, left:right].copy()))
+            previous = mask
+
+        height, width = rgba.shape[:2]
+        chunks = metadata_chunks(box, (width, height)) if box else b""
+        frames = self._cropped_frames(img, box or (0, 0, width, height), pieces)
+        self._write_frames(img, destination, frames, chunks)
+
+    @staticmethod
+    def _write_frames(
+        img: Image.Image,
+        destination: Union[str, BinaryIO],
+        frames: Iterator[Tuple[np.ndarray, int]],
+        chunks: bytes = b"",
+    ) -> None:
+        """Encode RGBA frames and their durations into an animated PNG."""
+        with APNGWriter(
+            destination,
+            animation_frames(img),
+            loop=img.info.get("loop", 0),
+            chunks=chunks,
+        ) as writer:
+            for rgba, duration in frames:
+                with metrics.STAGE_SECONDS.time(stage="encode"):
+                    writer.add(Image.fromarray(rgba), duration)
+
+    def _cropped_frames(
+        self,
+        img: Image.Image,
+        box: Box,
+        pieces: List[Optional[Tuple[Box, np.ndarray]]],
+    ) -> Iterator[Tuple[np.ndarray, int]]:
+        """
+        Decode each frame cropped to a box and apply its piece of mask.
+
+        Pixels outside a frame's own content are cleared; the trim threshold
+        already ruled them out as content.
+
+        Yields:
+            The cropped RGBA buffer with the mask applied and the frame's
+            duration in milliseconds.
+        """
+        left, top, right, bottom = box
+        for frame, piece in zip(ImageSequence.Iterator(img), pieces):
+            duration = frame.info.get("duration") or self.DEFAULT_FRAME_DURATION
+            with metrics.STAGE_SECONDS.time(stage="decode"):
+                upright = ImageOps.exif_transpose(frame)
+                rgba = self._image_to_array(upright.crop(box))
+            mask = np.zeros((bottom - top, right - left), dtype=np.uint8)
+            if piece is not None:
+                (x0, y0, x1, y1), values = piece
+                mask[y0 - top : y1 - top, x0 - left : x1 - left] = values
+            self._apply_alpha(rgba, mask)
+            yield rgba, duration
+
+    def _masked_frames(
+        self, img: Image.Image
+    ) -> Iterator[Tuple[np.ndarray, np.ndarray, int]]:
+        """
+        Decode each frame upright and apply its mask.
+
+        Frames that are unchanged or nearly unchanged from the last frame that
+        went through inference reuse its mask.
+
+        Yields:
+            The frame's RGBA buffer with the mask applied, the mask, and the
+            frame's duration in milliseconds.
+        """
+        size: Optional[Tuple[int, int]] = None
+        mask: Optional[np.ndarray] = None
+        reference: Optional[np.ndarray] = None
+
+        for frame in ImageSequence.Iterator(img):
+            duration = frame.info.get("duration") or self.DEFAULT_FRAME_DURATION
+            with metrics.STAGE_SECONDS.time(stage="decode"):
+                # Apply EXIF orientation like the single-image path does
+                upright = ImageOps.exif_transpose(frame)
+                rgba = self._image_to_array(upright)
+            if size is None:
+                size = upright.size
+            elif upright.size != size:
+                raise ValueError(
+                    "Multi-frame images with differing frame sizes are not supported"
                 )
 
-            # Save with transparency (use string path for Windows compatibility)
-            result.save(str(output_path), "PNG")
+            signature = self._frame_signature(upright)
+            if mask is None or not self._frames_match(reference, signature):
+                with metrics.STAGE_SECONDS.time(stage="inference"):
+                    mask = self._compute_mask(rgba)
+                reference = signature
+
+            self._apply_alpha(rgba, mask)
+            yield rgba, mask, duration
 
-    def generate_output_path(self, input_path: Path, output_folder: Path) -> Path:
+    def generate_output_path(
+        self,
+        input_path: Path,
+        output_folder: Path,
+        variant: str = "",
+        extension: str = ".png",
+    ) -> Path:
         """
         Generate output path for a processed image.
 
         Args:
             input_path: Original input file path.
             output_folder: Folder where output should be saved.
+            variant: Optional export variant name appended to the stem.
+            extension: Output file extension.
 
         Returns:
-            Path for the output file (always .png).
+            Path for the output file (.png unless another extension is given).
+            The name stays reserved until release_output_path() is called,
+            so concurrent callers never receive the same path.
         """
-        stem = input_path.stem
-        output_path = output_folder / f"{stem}.png"
+        stem = f"{input_path.stem}_{variant}" if variant else input_path.stem
+        output_path = output_folder / f"{stem}{extension}"
 
-        # Handle filename conflicts
-        counter = 1
-        while output_path.exists():
-            output_path = output_folder / f"{stem}_{counter}.png"
-            counter += 1
+        with self._output_lock:
+            # Handle filename conflicts
+            counter = 1
+            while output_path.exists() or output_path in self._reserved_outputs:
+                output_path = output_folder / f"{stem}_{counter}{extension}"
+                counter += 1
+
+            self._reserved_outputs.add(output_path)
 
         return output_path
+
+    def release_output_path(self, output_path: Path) -> None:
+        """Drop the reservation made by generate_output_path once written."""
+        with self._output_lock:
+            self._reserved_outputs.discard(output_path)
@@ -0,0 +1,421 @@
+"""Killable subprocesses that enforce per-file time and memory limits.
+
+A malformed or enormous image can hang decoding or inference indefinitely,
+and a thread stuck inside native code can't be interrupted. Files are
+therefore handed to long-lived child processes that each load the model
+once; a child that runs past a limit, or whose batch is cancelled, is
+killed and replaced, and the file is marked as failed.
+"""
+
+import multiprocessing
+import os
+import time
+from contextlib import nullcontext
+from dataclasses import dataclass
+from pathlib import Path
+from threading import Lock
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from background_remover import direct_inference, metrics, profiling, quantization
+from background_remover.export import ExportVariant
+from background_remover.image_processor import ImageProcessor
+from background_remover.trim import Trim, sidecar_path
+
+# Environment variables turning on per-file limits in the GUI
+TIMEOUT_ENV = "BGREMOVER_FILE_TIMEOUT"
+MEMORY_ENV = "BGREMOVER_FILE_MEMORY_MB"
+
+# How often a waiting thread checks the clock, memory use and cancellation
+POLL_INTERVAL = 0.1
+
+# Time an idle child gets to exit cleanly before it is killed
+_SHUTDOWN_TIMEOUT = 5.0
+
+# Request asking a child to write its profiling reports
+_DUMP_PROFILE = "dump_profile"
+
+# Name of the profiling reports children write
+PROFILE_NAME = "isolated"
+
+# Image a child processes once at startup, so ONNX Runtime's first-run
+# allocations aren't charged to the first file
+_WARM_UP_SHAPE = (320, 320, 3)
+
+
+class FileLimitError(RuntimeError):
+    """A file ran past its time or memory limit and its process was killed."""
+
+
+class ProcessingCancelledError(RuntimeError):
+    """A file was abandoned mid-way because the batch was cancelled."""
+
+
+class _TaskError(RuntimeError):
+    """Processing raised an error inside a child that is still usable."""
+
+
+@dataclass(frozen=True)
+class FileLimits:
+    """
+    Limits applied to each file.
+
+    Attributes:
+        timeout: Seconds a file may take, excluding model loading.
+        memory_mb: Megabytes a file may use on top of the footprint of the
+            process handling it just before the file started.
+    """
+
+    timeout: Optional[float] = None
+    memory_mb: Optional[float] = None
+
+    def __post_init__(self):
+        for name in ("timeout", "memory_mb"):
+            value = getattr(self, name)
+            if value is not None and value <= 0:
+                raise ValueError(f"{name} must be positive, got {value}")
+
+    @property
+    def enabled(self) -> bool:
+        return self.timeout is not None or self.memory_mb is not None
+
+    @classmethod
+    def from_environment(
+        cls, default_timeout: Optional[float] = None
+    ) -> "FileLimits":
+        """
+        Read limits from BGREMOVER_FILE_TIMEOUT and BGREMOVER_FILE_MEMORY_MB.
+
+        A value of 0 turns that limit off; unset variables use the defaults.
+        """
+        timeout = float(os.environ.get(TIMEOUT_ENV, default_timeout or 0))
+        memory_mb = float(os.environ.get(MEMORY_ENV, 0))
+        return cls(timeout or None, memory_mb or None)
+
+    def check_supported(self) -> None:
+        """
+        Make sure every configured limit can be enforced on this system.
+
+        Raises:
+            RuntimeError: If a memory limit is set but process memory can't
+                be measured, e.g. on macOS or Windows without psutil.
+        """
+        if self.memory_mb is not None and not memory_measurable():
+            raise RuntimeError(
+                "Per-file memory limits need psutil on this system; "
+                "install it or remove the memory limit"
+            )
+
+
+@dataclass(frozen=True)
+class ProcessorSpec:
+    """Picklable recipe for building an ImageProcessor in another process."""
+
+    model_name: str = "u2net"
+    intra_op_threads: Optional[int] = None
+    precision: str = quantization.FP32
+    trim: Optional[Trim] = None
+    session_factory: Optional[Callable[[], object]] = None
+    shared_weights: bool = False
+    backend: str = direct_inference.BACKEND_ONNXRUNTIME
+
+    @classmethod
+    def from_processor(cls, processor: ImageProcessor) -> "ProcessorSpec":
+        """Describe a processor so a child process can rebuild it."""
+        return cls(
+            processor.model_name,
+            processor.intra_op_threads,
+            processor.precision,
+            processor.trim,
+            processor.session_factory,
+            processor.shared_weights,
+            processor.backend,
+        )
+
+    def create(self) -> ImageProcessor:
+        return ImageProcessor(
+            self.model_name,
+            self.intra_op_threads,
+            self.precision,
+            self.trim,
+            max_sessions=1,
+            session_factory=self.session_factory,
+            shared_weights=self.shared_weights,
+            backend=self.backend,
+        )
+
+
+def process_rss(pid: int) -> Optional[int]:
+    """Return the resident set size of a process in bytes, if measurable."""
+    try:
+        with open(f"/proc/{pid}/statm", encoding="ascii") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+
+        return psutil.Process(pid).memory_info().rss
+    except Exception:
+        return None
+
+
+def memory_measurable() -> bool:
+    """Return whether process_rss works on this system."""
+    return process_rss(os.getpid()) is not None
+
+
+def _serve(conn, spec: ProcessorSpec) -> None:
+    """Child process: load the model, then serve requests until told to stop."""
+    try:
+        processor = spec.create()
+        processor.process_array(np.zeros(_WARM_UP_SHAPE, dtype=np.uint8))
+    except Exception as e:
+        conn.send(("error", str(e)))
+        return
+    conn.send(("ready", None))
+
+    # BGREMOVER_PROFILE is inherited, so each child profiles its own files
+    profiler = profiling.from_environment()
+    if profiler:
+        profiler.start()
+
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            return
+        if request is None:
+            return
+        method, args = request
+        if method == _DUMP_PROFILE:
+            outputs = profiler.dump(PROFILE_NAME) if profiler else {}
+            conn.send(("ok", (outputs, {})))
+            continue
+        try:
+            with metrics.STAGE_SECONDS.capture() as stages:
+                with profiler.thread() if profiler else nullcontext():
+                    result = getattr(processor, method)(*args)
+        except Exception as e:
+            conn.send(("error", str(e)))
+            continue
+        conn.send(("ok", (result, {key[0]: value for key, value in stages.items()})))
+
+
+class _IsolatedProcess:
+    """One child process holding its own loaded model."""
+
+    def __init__(self, spec: ProcessorSpec):
+        # Forking would copy Qt and ONNX Runtime threads' locks mid-use
+        context = multiprocessing.get_context("spawn")
+        self._conn, child_conn = context.Pipe()
+        self._process = context.Process(
+            target=_serve, args=(child_conn, spec), daemon=True
+        )
+        self._process.start()
+        child_conn.close()
+        self._baseline: Optional[int] = None
+        self._ready = False
+
+    def call(
+        self,
+        method: str,
+        args: Tuple,
+        limits: FileLimits,
+        cancelled: Callable[[], bool],
+    ) -> Tuple[object, Dict[str, float]]:
+        """
+        Run a processor method in the child.
+
+        Returns:
+            The method's result and the seconds spent per stage.
+
+        Raises:
+            _TaskError: If the method raised; the child stays usable.
+            FileLimitError: If a limit was hit; the child is killed.
+            ProcessingCancelledError: If cancelled; the child is killed.
+            RuntimeError: If the child failed to start or crashed.
+        """
+        try:
+            if not self._ready:
+                # Loading the model doesn't count against the file's limits
+                self._receive(FileLimits(), cancelled)
+                self._ready = True
+            # Memory kept by earlier files, e.g. a grown arena, isn't charged
+            # to this one
+            self._baseline = process_rss(self._process.pid)
+            self._conn.send((method, args))
+            return self._receive(limits, cancelled)
+        except _TaskError as e:
+            if self._ready:
+                raise
+            self.kill()
+            raise RuntimeError(str(e)) from None
+        except BaseException:
+            self.kill()
+            raise
+
+    def _receive(self, limits: FileLimits, cancelled: Callable[[], bool]):
+        start = time.monotonic()
+        while not self._conn.poll(POLL_INTERVAL):
+            if cancelled():
+                raise ProcessingCancelledError("Cancelled")
+            if limits.timeout and time.monotonic() - start > limits.timeout:
+                raise FileLimitError(f"Timed out after {limits.timeout:g}s")
+            if limits.memory_mb and self._baseline is not None:
+                rss = process_rss(self._process.pid)
+                used = rss - self._baseline if rss is not None else 0
+                if used > limits.memory_mb * 2**20:
+                    raise FileLimitError(
+                        f"Exceeded memory limit of {limits.memory_mb:g} MB"
+                    )
+        try:
+            status, payload = self._conn.recv()
+        except EOFError:
+            self._process.join(_SHUTDOWN_TIMEOUT)
+            raise RuntimeError(
+                f"Processing crashed (exit code {self._process.exitcode})"
+            ) from None
+        if status == "error":
+            raise _TaskError(payload)
+        return payload
+
+    def kill(self) -> None:
+        self._process.kill()
+        self._process.join()
+        self._conn.close()
+
+    def close(self) -> None:
+        """Ask the child to exit, killing it if it doesn't."""
+        try:
+            self._conn.send(None)
+        except OSError:
+            pass
+        self._process.join(_SHUTDOWN_TIMEOUT)
+        if self._process.is_alive():
+            self.kill()
+        else:
+            self._conn.close()
+
+
+class IsolatedRunner:
+    """
+    Processes files in child processes that are killed when a file misbehaves.
+
+    Each concurrent caller gets a child of its own, created on first use and
+    reused afterwards; a killed child is replaced on the next call. Stage
+    timings measured in the children are added to this process's metrics.
+    """
+
+    def __init__(self, spec: ProcessorSpec, limits: FileLimits):
+        """
+        Initialize the runner.
+
+        Args:
+            spec: Processor each child builds.
+            limits: Limits applied to every file.
+        """
+        self._spec = spec
+        self._limits = limits
+        self._lock = Lock()
+        self._idle: List[_IsolatedProcess] = []
+
+    def process_image(
+        self,
+        input_path: Path,
+        output_path: Path,
+        cancelled: Callable[[], bool] = lambda: False,
+    ) -> None:
+        """
+        Run ImageProcessor.process_image in a child process.
+
+        Raises:
+            FileLimitError: If the file ran past a limit.
+            ProcessingCancelledError: If ``cancelled`` returned True mid-file.
+            RuntimeError: If processing failed.
+        """
+        try:
+            self._call("process_image", (input_path, output_path), cancelled)
+        except (FileLimitError, ProcessingCancelledError):
+            # Don't leave a half-written result behind
+            output_path.with_suffix(".png").unlink(missing_ok=True)
+            raise
+
+    def export_variants(
+        self,
+        input_path: Path,
+        output_folder: Path,
+        variants: Sequence[ExportVariant],
+        output_paths: Dict[str, Path],
+        cancelled: Callable[[], bool] = lambda: False,
+    ) -> Dict[str, Path]:
+        """
+        Run ImageProcessor.export_variants in a child; see process_image().
+
+        Args:
+            output_paths: Where to save each variant, reserved by the caller
+                so partial outputs can be removed if the child is killed.
+        """
+        try:
+            return self._call(
+                "export_variants",
+                (input_path, output_folder, list(variants), output_paths),
+                cancelled,
+            )
+        except (FileLimitError, ProcessingCancelledError):
+            for output_path in output_paths.values():
+                output_path.unlink(missing_ok=True)
+                sidecar_path(output_path).unlink(missing_ok=True)
+            raise
+
+    def _call(self, method: str, args: Tuple, cancelled: Callable[[], bool]):
+        with self._lock:
+            child = self._idle.pop() if self._idle else None
+        if child is None:
+            child = _IsolatedProcess(self._spec)
+
+        try:
+            result, stages = child.call(method, args, self._limits, cancelled)
+        except _TaskError as e:
+            self._release(child)
+            raise RuntimeError(str(e)) from None
+        self._release(child)
+
+        for stage, seconds in stages.items():
+            metrics.STAGE_SECONDS.observe(seconds, stage=stage)
+        return result
+
+    def dump_profiles(self) -> List[Dict[str, Path]]:
+        """
+        Have every idle child write the profile of the files it processed.
+
+        Profiles of children killed for misbehaving are lost.
+
+        Returns:
+            Each child's mapping of report kind to output path.
+        """
+        with self._lock:
+            children, self._idle = self._idle, []
+        reports = []
+        for child in children:
+            try:
+                outputs, _ = child.call(
+                    _DUMP_PROFILE, (), FileLimits(), lambda: False
+                )
+            except Exception:
+                continue
+            reports.append(outputs)
+            self._release(child)
+        return reports
+
+    def _release(self, child: _IsolatedProcess) -> None:
+        with self._lock:
+            self._idle.append(child)
+
+    def close(self) -> None:
+        """Shut down every idle child process."""
+        with self._lock:
+            children, self._idle = self._idle, []
+        for child in children:
+            child.close()
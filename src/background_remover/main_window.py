@@ -1,9 +1,11 @@
 """Main application window."""
 
+from dataclasses import replace
 from pathlib import Path
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
-from PySide6.QtCore import Slot
+from PySide6.QtCore import QThread, Slot
+from PySide6.QtGui import QImage
 from PySide6.QtWidgets import (
     QFileDialog,
     QHBoxLayout,
@@ -15,10 +17,14 @@ from PySide6.QtWidgets import (
     QWidget,
 )
 
+from background_remover import tuning
 from background_remover.drop_zone import DropZone
 from background_remover.image_processor import ImageProcessor
+from background_remover.isolation import FileLimits
+from background_remover.preview import PreviewWorker
 from background_remover.ui.file_list_widget import FileListWidget
-from background_remover.ui.progress_dialog import ProgressDialog
+from background_remover.ui.preview_pane import PreviewPane
+from background_remover.ui.queue_panel import QueuePanel
 from background_remover.worker import ProcessingWorker
 
 
@@ -35,8 +41,11 @@ class MainWindow(QMainWindow):
         super().__init__()
         self._output_folder: Optional[Path] = None
         self._worker: Optional[ProcessingWorker] = None
-        self._progress_dialog: Optional[ProgressDialog] = None
         self._processor = processor  # Pre-loaded processor from splash screen
+        self._preview_worker: Optional[PreviewWorker] = None
+        self._preview_request = 0
+        profile = tuning.load_profile()
+        self._workers = profile.workers if profile else 1
 
         self._setup_ui()
         self._setup_menu()
@@ -45,7 +54,7 @@ class MainWindow(QMainWindow):
     def _setup_ui(self):
         """Set up the main window UI."""
         self.setWindowTitle("Background Remover")
-        self.setMinimumSize(600, 500)
+        self.setMinimumSize(900, 500)
 
         central_widget = QWidget()
         self.setCentralWidget(central_widget)
@@ -63,10 +72,26 @@ class MainWindow(QMainWindow):
         add_btn.clicked.connect(self._browse_files)
         layout.addWidget(add_btn)
 
-        # File list
+        # File list with a preview of the selected file beside it
+        files_layout = QHBoxLayout()
         self._file_list = FileListWidget()
         self._file_list.files_changed.connect(self._update_process_button)
-        layout.addWidget(self._file_list, stretch=1)
+        self._file_list.current_file_changed.connect(self._on_current_file_changed)
+        self._file_list.files_rejected.connect(self._on_files_rejected)
+        self._file_list.files_removed.connect(self._on_files_removed)
+        self._file_list.files_added.connect(self._on_files_added)
+        files_layout.addWidget(self._file_list, stretch=1)
+        self._preview_pane = PreviewPane()
+        files_layout.addWidget(self._preview_pane, stretch=1)
+        layout.addLayout(files_layout, stretch=1)
+
+        # Queue progress, shown once processing starts
+        self._queue_panel = QueuePanel()
+        self._queue_panel.prioritize_requested.connect(self._prioritize_selected)
+        self._queue_panel.cancel_selected_requested.connect(self._cancel_selected)
+        self._queue_panel.cancel_all_requested.connect(self._cancel_processing)
+        self._queue_panel.hide()
+        layout.addWidget(self._queue_panel)
 
         # Output folder selector
         output_layout = QHBoxLayout()
@@ -124,8 +149,83 @@ class MainWindow(QMainWindow):
     @Slot(list)
     def _on_files_dropped(self, files: List[Path]):
         """Handle files dropped onto the drop zone."""
+        self._add_files(files)
+
+    def _add_files(self, files: List[Path]):
+        """List files once they pass preflight; see _on_files_added()."""
         self._file_list.add_files(files)
 
+    @Slot(list)
+    def _on_files_added(self, files: List[Path]):
+        """Queue listed files straight away if processing has started."""
+        if self._worker:
+            self._enqueue(files)
+
+    def _enqueue(self, files: List[Path]):
+        """Append files to the running queue."""
+        info = {path: self._file_list.file_info(path) for path in files}
+        for path in self._worker.add_files(files, info):
+            self._file_list.update_file_status(path.name, "Queued")
+
+    @Slot(list)
+    def _on_files_removed(self, files: List[Path]):
+        """Stop processing files taken out of the list."""
+        if self._worker:
+            self._worker.cancel_files(files)
+
+    @Slot(list)
+    def _on_files_rejected(self, rejected: List[Tuple[Path, str]]):
+        """Tell the user which files were skipped and why."""
+        shown = rejected[:10]
+        lines = [f"{path.name}: {reason}" for path, reason in shown]
+        if len(rejected) > len(shown):
+            lines.append(f"...and {len(rejected) - len(shown)} more")
+        QMessageBox.warning(
+            self,
+            "Files Skipped",
+            f"{len(rejected)} file(s) aren't valid images and were not added:\n\n"
+            + "\n".join(lines),
+        )
+
+    @Slot(object)
+    def _on_current_file_changed(self, path: Optional[Path]):
+        """Preview the newly selected file, cancelling any stale preview."""
+        self._queue_panel.set_selection_count(len(self._file_list.selected_files()))
+        if path is None:
+            if self._preview_worker:
+                self._preview_request = self._preview_worker.request(None)
+            self._preview_pane.clear()
+            return
+
+        if self._preview_worker is None:
+            self._preview_worker = PreviewWorker(parent=self)
+            self._preview_worker.preview_ready.connect(self._on_preview_ready)
+            self._preview_worker.preview_failed.connect(self._on_preview_failed)
+            # Keep previews from competing with a running batch for the CPU
+            self._preview_worker.start(QThread.Priority.LowestPriority)
+
+        self._preview_pane.show_loading(path.name)
+        self._preview_request = self._preview_worker.request(path)
+
+    @Slot(int, str, QImage)
+    def _on_preview_ready(self, request_id: int, stage: str, image: QImage):
+        """Show a preview if it belongs to the current selection."""
+        if request_id == self._preview_request:
+            self._preview_pane.show_image(image, stage)
+
+    @Slot(int, str)
+    def _on_preview_failed(self, request_id: int, message: str):
+        """Report a preview failure for the current selection."""
+        if request_id == self._preview_request:
+            self._preview_pane.show_error(message)
+
+    def _stop_preview(self):
+        """Stop the preview thread, waiting for its current stage to end."""
+        if self._preview_worker:
+            self._preview_worker.stop()
+            self._preview_worker.wait()
+            self._preview_worker = None
+
     def _browse_files(self):
         """Open file browser to select images."""
         formats = " ".join(
@@ -138,7 +238,7 @@ class MainWindow(QMainWindow):
             f"Images ({formats});;All Files (*)",
         )
         if files:
-            self._file_list.add_files([Path(f) for f in files])
+            self._add_files([Path(f) for f in files])
 
     def _select_output_folder(self):
         """Open folder browser to select output location."""
@@ -147,85 +247,132 @@ class MainWindow(QMainWindow):
             self._output_folder = Path(folder)
             self._output_label.setText(str(self._output_folder))
             self._output_label.setStyleSheet("color: #000000;")
+            if self._worker:
+                self._worker.set_output_folder(self._output_folder)
             self._update_process_button()
 
     def _update_process_button(self):
         """Enable/disable process button based on state."""
+        if self._worker:
+            # Once started, the queue picks up new files by itself
+            self._process_btn.setText("Processing Added Files Automatically")
+            self._process_btn.setEnabled(False)
+            return
         can_process = (
-            self._file_list.file_count() > 0
-            and self._output_folder is not None
-            and self._worker is None
+            self._file_list.file_count() > 0 and self._output_folder is not None
         )
+        self._process_btn.setText("Remove Backgrounds")
         self._process_btn.setEnabled(can_process)
 
     def _start_processing(self):
-        """Start background removal processing."""
+        """Start the processing queue with every listed file."""
         files = self._file_list.get_files()
         if not files or not self._output_folder:
             return
 
-        # Create and show progress dialog
-        self._progress_dialog = ProgressDialog(len(files), self)
-        self._progress_dialog.cancel_requested.connect(self._cancel_processing)
-
-        # Create worker thread (use pre-loaded processor if available)
-        self._worker = ProcessingWorker(files, self._output_folder, self._processor)
-        self._worker.progress_updated.connect(self._progress_dialog.update_progress)
+        limits = FileLimits.from_environment()
+        try:
+            limits.check_supported()
+        except RuntimeError as e:
+            QMessageBox.warning(
+                self,
+                "Memory Limit Ignored",
+                f"{e}.\n\nFiles will be processed without a memory limit.",
+            )
+            limits = replace(limits, memory_mb=None)
+
+        # One worker keeps the model warm for the rest of the session
+        self._worker = ProcessingWorker(
+            files,
+            self._output_folder,
+            self._processor,
+            workers=self._workers,
+            file_info={info.path: info for info in self._file_list.get_file_infos()},
+            # Isolation is opt-in: each worker process loads its own model
+            # for the rest of the session instead of sharing the preloaded one
+            limits=limits,
+            persistent=True,
+        )
+        self._worker.progress_updated.connect(self._queue_panel.update_progress)
+        self._worker.eta_updated.connect(self._queue_panel.update_eta)
         self._worker.file_started.connect(self._on_file_started)
         self._worker.file_completed.connect(self._on_file_completed)
+        self._worker.file_cancelled.connect(self._on_file_cancelled)
         self._worker.all_completed.connect(self._on_processing_complete)
         self._worker.finished.connect(self._on_worker_finished)
 
+        for path in files:
+            self._file_list.update_file_status(path.name, "Queued")
+        self._queue_panel.update_progress(0, len(files))
+        self._queue_panel.show()
         self._update_process_button()
         self._worker.start()
-        self._progress_dialog.exec()
+
+    def _prioritize_selected(self):
+        """Move the selected files to the front, requeueing failed ones."""
+        if self._worker:
+            selected = self._file_list.selected_files()
+            # Processing a finished file again would only duplicate its outputs
+            self._enqueue([f for f in selected if not self._worker.is_done(f)])
+            self._worker.prioritize(selected)
+
+    def _cancel_selected(self):
+        """Cancel the selected files, keeping them in the list."""
+        if self._worker:
+            self._worker.cancel_files(self._file_list.selected_files())
 
     @Slot(str)
     def _on_file_started(self, filename: str):
         """Handle file processing started."""
-        if self._progress_dialog:
-            self._progress_dialog.set_current_file(filename)
+        self._queue_panel.set_current_file(filename)
         self._file_list.update_file_status(filename, "Processing...")
 
     @Slot(str, bool, str)
     def _on_file_completed(self, filename: str, success: bool, message: str):
         """Handle file processing completed."""
-        if self._progress_dialog:
-            self._progress_dialog.log_result(filename, success, message)
-
         status = "Done" if success else f"Failed: {message}"
         self._file_list.update_file_status(filename, status)
 
+    @Slot(str)
+    def _on_file_cancelled(self, filename: str):
+        """Handle a file taken out of the queue."""
+        self._file_list.update_file_status(filename, "Cancelled")
+
     @Slot(int, int)
     def _on_processing_complete(self, successful: int, failed: int):
-        """Handle all processing complete."""
-        if self._progress_dialog:
-            self._progress_dialog.processing_complete(successful, failed)
+        """Handle the queue draining; the worker waits for more files."""
+        self._queue_panel.processing_complete(successful, failed)
 
     def _on_worker_finished(self):
         """Handle worker thread finished."""
         self._worker = None
+        self._queue_panel.hide()
         self._update_process_button()
 
     def _cancel_processing(self):
-        """Cancel the current processing."""
+        """Cancel every queued file; the queue stays ready for new ones."""
         if self._worker:
             self._worker.cancel()
 
+    def _stop_worker(self):
+        """Stop the queue, waiting for the file in progress to be abandoned."""
+        if self._worker:
+            self._worker.stop()
+            self._worker.wait()
+            self._worker = None
+
     def closeEvent(self, event):
         """Handle window close - ensure worker is stopped."""
-        if self._worker and self._worker.isRunning():
+        if self._worker and self._worker.queued_count():
             reply = QMessageBox.question(
                 self,
                 "Processing in Progress",
                 "Processing is still in progress. Do you want to cancel and exit?",
                 QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
             )
-            if reply == QMessageBox.StandardButton.Yes:
-                self._worker.cancel()
-                self._worker.wait()
-                event.accept()
-            else:
+            if reply != QMessageBox.StandardButton.Yes:
                 event.ignore()
-        else:
-            event.accept()
+                return
+        self._stop_worker()
+        self._stop_preview()
+        event.accept()
@@ -0,0 +1,347 @@
+"""Process-wide metrics with Prometheus text exposition."""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Environment variables that enable metrics without code changes
+PORT_ENV = "BGREMOVER_METRICS_PORT"
+FILE_ENV = "BGREMOVER_METRICS_FILE"
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """Base class holding one value per label combination."""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str]):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}"
+            )
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _label_text(self, key: LabelValues, extra: str = "") -> str:
+        pairs = [
+            f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, key)
+        ]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        """Add to the counter."""
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        """Return the current count."""
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        if not values and not self.labelnames:
+            values[()] = 0
+        return [
+            f"{self.name}{self._label_text(key)} {_format_value(value)}"
+            for key, value in sorted(values.items())
+        ]
+
+
+class Gauge(Counter):
+    """Value that can go up and down."""
+
+    kind = "gauge"
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        """Add to the gauge."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: str) -> None:
+        """Subtract from the gauge."""
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str) -> None:
+        """Replace the gauge value."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    """Distribution of observations in cumulative buckets."""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, buckets: Sequence[float], labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # Per label combination: [bucket counts..., sum, count]
+        self._values: Dict[LabelValues, List[float]] = {}
+        self._local = threading.local()
+
+    def observe(self, value: float, **labels: str) -> None:
+        """Record one observation."""
+        key = self._key(labels)
+        captured = getattr(self._local, "captured", None)
+        if captured is not None:
+            captured[key] = captured.get(key, 0.0) + value
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """Observe the wall-clock duration of a block in seconds."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    @contextmanager
+    def capture(self) -> Iterator[Dict[LabelValues, float]]:
+        """
+        Also sum the observations this thread makes in a block.
+
+        Yields:
+            Sum of the block's observations per label values, filled in as
+            they are made.
+        """
+        previous = getattr(self._local, "captured", None)
+        captured: Dict[LabelValues, float] = {}
+        self._local.captured = captured
+        try:
+            yield captured
+        finally:
+            self._local.captured = previous
+
+    def count(self, **labels: str) -> int:
+        """Return the number of observations."""
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            return int(state[-1]) if state else 0
+
+    def total(self, **labels: str) -> float:
+        """Return the sum of observations."""
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            return state[-2] if state else 0.0
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = {key: list(state) for key, state in self._values.items()}
+        lines = []
+        for key, state in sorted(values.items()):
+            for bound, count in zip(self.buckets, state):
+                le = f'le="{_format_value(bound)}"'
+                lines.append(
+                    f"{self.name}_bucket{self._label_text(key, le)} {int(count)}"
+                )
+            labels = self._label_text(key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(state[-2])}")
+            lines.append(f"{self.name}_count{labels} {int(state[-1])}")
+        return lines
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric):
+                    raise ValueError(f"Metric {metric.name} already registered")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, documentation, labelnames=()) -> Counter:
+        """Create or return a counter."""
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()) -> Gauge:
+        """Create or return a gauge."""
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, buckets, labelnames=()) -> Histogram:
+        """Create or return a histogram."""
+        return self._register(Histogram(name, documentation, buckets, labelnames))
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+    def write(self, path: Path) -> None:
+        """Write the current metrics to a file, replacing it atomically."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = path.with_name(f".{path.name}.tmp")
+        temporary.write_text(self.render(), encoding="utf-8")
+        os.replace(temporary, path)
+
+    def serve(self, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """
+        Expose the metrics over HTTP from a daemon thread.
+
+        Args:
+            port: TCP port to listen on; 0 picks a free port.
+            host: Interface to bind, local-only by default.
+
+        Returns:
+            The running server; call ``shutdown()`` to stop it.
+        """
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                # Scrapes would otherwise spam stderr
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        return server
+
+
+REGISTRY = MetricsRegistry()
+
+FILES_PROCESSED = REGISTRY.counter(
+    "bgremover_files_processed_total", "Files processed successfully."
+)
+FILES_FAILED = REGISTRY.counter(
+    "bgremover_files_failed_total", "Files that failed to process."
+)
+FILES_CACHED = REGISTRY.counter(
+    "bgremover_files_cached_total",
+    "Files served from an identical file's result without inference.",
+)
+STAGE_SECONDS = REGISTRY.histogram(
+    "bgremover_stage_seconds",
+    "Time spent per processing stage.",
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+    labelnames=("stage",),
+)
+IMAGE_MEGAPIXELS = REGISTRY.histogram(
+    "bgremover_image_megapixels",
+    "Size of processed images in megapixels.",
+    buckets=(0.1, 0.5, 1, 2, 4, 8, 12, 16, 24, 50, 100),
+)
+QUEUE_DEPTH = REGISTRY.gauge(
+    "bgremover_queue_depth", "Files waiting to be processed."
+)
+IN_FLIGHT_BYTES = REGISTRY.gauge(
+    "bgremover_in_flight_bytes", "Bytes of decoded image buffers being processed."
+)
+SESSION_POOL_SIZE = REGISTRY.gauge(
+    "bgremover_session_pool_size",
+    "Inference sessions created per model.",
+    labelnames=("model",),
+)
+SESSIONS_IN_USE = REGISTRY.gauge(
+    "bgremover_sessions_in_use",
+    "Inference sessions currently running an image.",
+    labelnames=("model",),
+)
+SESSION_WAIT_SECONDS = REGISTRY.histogram(
+    "bgremover_session_wait_seconds",
+    "Time spent waiting for a free inference session.",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30),
+    labelnames=("model",),
+)
+
+ETA_SECONDS = REGISTRY.gauge(
+    "bgremover_eta_seconds", "Estimated seconds until the current batch finishes."
+)
+THROUGHPUT_MEGAPIXELS = REGISTRY.gauge(
+    "bgremover_throughput_megapixels_per_second",
+    "Recent processing throughput of the current batch.",
+)
+
+
+def start_from_environment() -> Optional[ThreadingHTTPServer]:
+    """Start the HTTP endpoint if BGREMOVER_METRICS_PORT is set."""
+    port = os.environ.get(PORT_ENV)
+    if not port:
+        return None
+    return REGISTRY.serve(int(port))
+
+
+def file_from_environment() -> Optional[Path]:
+    """Return the end-of-batch metrics file named by BGREMOVER_METRICS_FILE."""
+    path = os.environ.get(FILE_ENV)
+    return Path(path) if path else None
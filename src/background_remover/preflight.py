@@ -0,0 +1,198 @@
+"""Header-only validation of input files before they are queued."""
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+from PIL import Image
+
+# File extensions accepted as inputs, the one list shared by preflight,
+# ImageProcessor and the file pickers
+SUPPORTED_EXTENSIONS = {
+    ".png",
+    ".jpg",
+    ".jpeg",
+    ".webp",
+    ".bmp",
+    ".gif",
+    ".tif",
+    ".tiff",
+}
+
+# Leading bytes identifying each supported format, as Pillow format names
+_SIGNATURES: Tuple[Tuple[bytes, str], ...] = (
+    (b"\x89PNG\r\n\x1a\n", "PNG"),
+    (b"\xff\xd8\xff", "JPEG"),
+    (b"GIF87a", "GIF"),
+    (b"GIF89a", "GIF"),
+    (b"BM", "BMP"),
+    (b"II*\x00", "TIFF"),
+    (b"MM\x00*", "TIFF"),
+)
+
+# Extensions each format is normally saved with
+_EXTENSIONS = {
+    "PNG": {".png"},
+    "JPEG": {".jpg", ".jpeg"},
+    "GIF": {".gif"},
+    "BMP": {".bmp"},
+    "TIFF": {".tiff", ".tif"},
+    "WEBP": {".webp"},
+}
+
+# Bytes read to sniff the format
+_HEADER_BYTES = 16
+
+# EXIF orientations that rotate the image by 90 degrees
+_TRANSPOSED_ORIENTATIONS = {5, 6, 7, 8}
+
+# Formats whose extra frames are animation frames; others, such as MPO
+# photos carrying a preview or stereo frame, are treated as single images
+ANIMATED_FORMATS = {"GIF", "PNG", "WEBP", "TIFF"}
+
+# Files probed concurrently; probing is dominated by file system latency
+DEFAULT_PREFLIGHT_WORKERS = 8
+
+
+@dataclass(frozen=True)
+class FileInfo:
+    """
+    Metadata of an input file read from its header.
+
+    Attributes:
+        path: The file.
+        format: Format detected from the file's contents.
+        width: Upright width in pixels, after EXIF orientation.
+        height: Upright height in pixels, after EXIF orientation.
+        mode: Pillow mode of the stored pixels, e.g. "RGB" or "P".
+        frames: Number of frames or pages.
+        file_size: Size of the file in bytes.
+    """
+
+    path: Path
+    format: str
+    width: int
+    height: int
+    mode: str
+    frames: int
+    file_size: int
+
+    @property
+    def megapixels(self) -> float:
+        """Pixels of all frames in millions."""
+        return self.width * self.height * self.frames / 1e6
+
+    @property
+    def decoded_bytes(self) -> int:
+        """Bytes one RGBA frame takes once decoded."""
+        return self.width * self.height * 4
+
+    @property
+    def mislabelled(self) -> bool:
+        """Check whether the extension doesn't match the actual format."""
+        return self.path.suffix.lower() not in _EXTENSIONS.get(self.format, set())
+
+    def describe(self) -> str:
+        """Short human-readable summary."""
+        text = f"{self.width}x{self.height} {self.format} {self.mode}"
+        if self.frames > 1:
+            text += f", {self.frames} frames"
+        return text
+
+
+def sniff_format(header: bytes) -> Optional[str]:
+    """Return the format identified by a file's leading bytes, if supported."""
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "WEBP"
+    for signature, format in _SIGNATURES:
+        if header.startswith(signature):
+            return format
+    return None
+
+
+def animation_frames(img: Image.Image) -> int:
+    """Return how many frames of an opened image get processed."""
+    if img.format in ANIMATED_FORMATS and getattr(img, "is_animated", False):
+        return img.n_frames
+    return 1
+
+
+def probe(path: Path) -> FileInfo:
+    """
+    Read a file's metadata without decoding its pixels.
+
+    Args:
+        path: File to probe.
+
+    Returns:
+        The file's metadata.
+
+    Raises:
+        ValueError: If the file is missing, empty, not a supported image, has
+            an unsupported extension, or its header is corrupt.
+    """
+    if path.suffix.lower() not in SUPPORTED_EXTENSIONS:
+        raise ValueError(f"Unsupported file extension: {path.suffix or '(none)'}")
+
+    try:
+        with open(path, "rb") as f:
+            header = f.read(_HEADER_BYTES)
+            file_size = f.seek(0, 2)
+    except OSError as e:
+        raise ValueError(f"Can't read file: {e.strerror or e}") from e
+
+    if not header:
+        raise ValueError("File is empty")
+    format = sniff_format(header)
+    if format is None:
+        raise ValueError("Not a supported image format")
+
+    try:
+        # Pillow parses only the header until pixel data is requested
+        with Image.open(path, formats=[format]) as img:
+            width, height = img.size
+            mode = img.mode
+            frames = animation_frames(img)
+            orientation = img.getexif().get(0x0112)
+    except Exception as e:
+        raise ValueError(f"Corrupt {format} header: {e}") from e
+
+    if width <= 0 or height <= 0:
+        raise ValueError(f"Invalid dimensions {width}x{height}")
+    if orientation in _TRANSPOSED_ORIENTATIONS:
+        width, height = height, width
+
+    return FileInfo(path, format, width, height, mode, frames, file_size)
+
+
+def preflight(
+    paths: Sequence[Path], workers: int = DEFAULT_PREFLIGHT_WORKERS
+) -> Tuple[List[FileInfo], List[Tuple[Path, str]]]:
+    """
+    Probe many files in parallel.
+
+    Args:
+        paths: Files to probe.
+        workers: Files probed at once.
+
+    Returns:
+        Metadata of the valid files and (path, reason) for rejected ones,
+        each in input order.
+    """
+
+    def check(path: Path) -> Tuple[Path, object]:
+        try:
+            return path, probe(path)
+        except ValueError as e:
+            return path, str(e)
+
+    accepted: List[FileInfo] = []
+    rejected: List[Tuple[Path, str]] = []
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        for path, result in executor.map(check, paths):
+            if isinstance(result, FileInfo):
+                accepted.append(result)
+            else:
+                rejected.append((path, result))
+    return accepted, rejected
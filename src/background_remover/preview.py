@@ -0,0 +1,160 @@
+"""Background thread rendering quick previews that are refined progressively."""
+
+from pathlib import Path
+from threading import Condition
+from typing import Optional
+
+import numpy as np
+from PIL import Image, ImageOps
+from PySide6.QtCore import QThread, Signal
+from PySide6.QtGui import QImage
+
+from background_remover.image_processor import ImageProcessor
+
+# Small model used for the first, near-instant preview
+FAST_MODEL = "u2netp"
+
+# Longest edge of the image fed to each stage; the fast stage matches the
+# model's 320px input so nothing larger is decoded than the model can use
+FAST_SIZE = 320
+REFINED_SIZE = 1024
+
+# Stage names reported with each preview
+FAST = "fast"
+REFINED = "refined"
+
+
+def load_preview_array(path: Path, max_size: int) -> np.ndarray:
+    """
+    Decode an image downscaled so its longest edge is at most ``max_size``.
+
+    JPEGs are decoded directly at a reduced scale, which is much faster than
+    decoding at full size and resizing afterwards.
+    """
+    with Image.open(path) as img:
+        img.draft("RGB", (max_size, max_size))
+        img = ImageOps.exif_transpose(img)
+        img.thumbnail((max_size, max_size), Image.Resampling.BILINEAR)
+        return np.array(img.convert("RGBA"))
+
+
+def to_qimage(rgba: np.ndarray) -> QImage:
+    """Copy an (H, W, 4) uint8 array into a QImage."""
+    height, width = rgba.shape[:2]
+    data = np.ascontiguousarray(rgba)
+    image = QImage(data.data, width, height, width * 4, QImage.Format.Format_RGBA8888)
+    # Detach from the NumPy buffer before it goes away
+    return image.copy()
+
+
+class PreviewWorker(QThread):
+    """
+    QThread that renders a cutout preview for the most recently requested file.
+
+    Each request first gets a fast preview from a small model on a tiny
+    input, then a refined one from the full model. Only the newest request is
+    worked on: a request made while another is in progress cancels the older
+    one at the next stage boundary, and its results are never emitted.
+
+    Previews use their own single-threaded sessions on a low-priority thread
+    so a running batch keeps its cores.
+    """
+
+    preview_ready = Signal(int, str, QImage)  # request id, stage, cutout
+    preview_failed = Signal(int, str)  # request id, error message
+
+    def __init__(
+        self,
+        fast_processor: Optional[ImageProcessor] = None,
+        full_processor: Optional[ImageProcessor] = None,
+        parent=None,
+    ):
+        """
+        Initialize the worker.
+
+        Args:
+            fast_processor: Processor for the first preview; defaults to the
+                small model.
+            full_processor: Processor for the refined preview; defaults to
+                the standard model.
+            parent: Parent QObject.
+        """
+        super().__init__(parent)
+        self._fast = fast_processor or ImageProcessor(FAST_MODEL, intra_op_threads=1)
+        self._full = full_processor or ImageProcessor(intra_op_threads=1)
+        self._condition = Condition()
+        self._request_id = 0
+        self._pending: Optional[Path] = None
+        self._stopped = False
+
+    def request(self, path: Optional[Path]) -> int:
+        """
+        Ask for a preview of a file, replacing any earlier request.
+
+        Args:
+            path: File to preview, or None to just cancel the current one.
+
+        Returns:
+            Id that the worker's signals will carry for this request.
+        """
+        with self._condition:
+            self._request_id += 1
+            self._pending = path
+            self._condition.notify()
+            return self._request_id
+
+    def stop(self) -> None:
+        """Stop the thread once the current stage finishes."""
+        with self._condition:
+            self._stopped = True
+            self._request_id += 1
+            self._condition.notify()
+
+    def is_current(self, request_id: int) -> bool:
+        """Check that no newer request has replaced this one."""
+        with self._condition:
+            return request_id == self._request_id and not self._stopped
+
+    def run(self):
+        """Render previews as they are requested until stopped."""
+        while True:
+            with self._condition:
+                while self._pending is None and not self._stopped:
+                    self._condition.wait()
+                if self._stopped:
+                    return
+            self.process_pending()
+
+    def process_pending(self) -> bool:
+        """
+        Render the pending request, if any, on the calling thread.
+
+        Returns:
+            True if a request was taken.
+        """
+        with self._condition:
+            path, request_id = self._pending, self._request_id
+            self._pending = None
+        if path is None:
+            return False
+
+        stages = (
+            (FAST, self._fast, FAST_SIZE),
+            (REFINED, self._full, REFINED_SIZE),
+        )
+        for stage, processor, size in stages:
+            if not self.is_current(request_id):
+                return True
+            try:
+                rgba, _ = processor.process_array(
+                    load_preview_array(path, size), inplace=True
+                )
+            except Exception as e:
+                # The fast model may be unavailable offline; the full model
+                # can still produce a preview
+                if stage == REFINED:
+                    self.preview_failed.emit(request_id, str(e))
+                continue
+            if self.is_current(request_id):
+                self.preview_ready.emit(request_id, stage, to_qimage(rgba))
+        return True
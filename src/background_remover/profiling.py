@@ -0,0 +1,242 @@
+"""Opt-in profiling of batch runs, enabled through environment variables.
+
+Set ``BGREMOVER_PROFILE`` to a folder and every batch, or every drained run
+of a persistent queue, writes there:
+
+* ``<run>.pstats``: cProfile statistics of processing every file, readable
+  with ``python -m pstats`` or snakeviz. Python 3.12+ allows one active
+  profiler at a time, so files processed concurrently with a profiled one
+  appear only in the stack samples.
+* ``<run>.tracemalloc.txt``: the top allocation sites when the batch ended,
+  plus the peak traced memory; ``<run>.tracemalloc`` holds the full snapshot
+  for ``tracemalloc.Snapshot.load``.
+* ``<run>.folded``: with ``BGREMOVER_PROFILE_SAMPLE_MS`` set, stacks of the
+  processing threads sampled at that interval, in the folded format read by
+  flamegraph.pl and speedscope.
+
+Files processed in isolated worker processes are profiled there and written
+as ``isolated-*`` reports, one set per worker process.
+
+Packaged builds honour the variables too, so no rebuild is needed.
+"""
+
+import cProfile
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+# Folder that enables profiling and receives the output files
+PROFILE_ENV = "BGREMOVER_PROFILE"
+
+# Stack sampling interval in milliseconds; sampling is off when unset
+SAMPLE_ENV = "BGREMOVER_PROFILE_SAMPLE_MS"
+
+# Allocation sites listed in the tracemalloc report
+TOP_ALLOCATIONS = 25
+
+# Frames kept per allocation traceback
+TRACEMALLOC_FRAMES = 10
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+
+
+class StackSampler(threading.Thread):
+    """Daemon thread counting the stacks of watched threads at an interval."""
+
+    def __init__(self, interval: float):
+        super().__init__(daemon=True, name="stack-sampler")
+        self._interval = interval
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()
+        self._threads: Dict[int, str] = {}
+        self.stacks: Counter = Counter()
+
+    def watch(self, thread: threading.Thread) -> None:
+        """Start sampling a thread."""
+        with self._lock:
+            self._threads[thread.ident] = thread.name
+
+    def run(self):
+        while not self._stopped.wait(self._interval):
+            self.sample()
+
+    def sample(self) -> None:
+        """Record the current stack of every watched thread once."""
+        with self._lock:
+            threads = dict(self._threads)
+        frames = sys._current_frames()
+        for ident, name in threads.items():
+            frame = frames.get(ident)
+            labels: List[str] = []
+            while frame is not None:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            if labels:
+                # Folded stacks list the root first, one sample per count
+                with self._lock:
+                    self.stacks[";".join([name] + labels[::-1])] += 1
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self.join()
+
+    def write(self, path: Path) -> None:
+        """Write the samples in the folded-stack format and start afresh."""
+        with self._lock:
+            stacks, self.stacks = self.stacks, Counter()
+        lines = [f"{stack} {count}" for stack, count in sorted(stacks.items())]
+        path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+class BatchProfiler:
+    """Collects CPU, allocation and stack-sample profiles for batch runs."""
+
+    def __init__(self, output_folder: Path, sample_interval: Optional[float] = None):
+        """
+        Initialize the profiler.
+
+        Args:
+            output_folder: Folder receiving the profile files.
+            sample_interval: Seconds between stack samples; None disables
+                sampling.
+        """
+        self.output_folder = output_folder
+        self.sample_interval = sample_interval
+        self._profiles: List[cProfile.Profile] = []
+        self._lock = threading.Lock()
+        self._sampler: Optional[StackSampler] = None
+        self._started_tracing = False
+        self._dumps = 0
+
+    @contextmanager
+    def profile(self, name: str = "batch") -> Iterator[Dict[str, Path]]:
+        """
+        Profile a block on the calling thread and write the results after it.
+
+        Work the block hands to other threads is included when it runs
+        inside :meth:`thread`.
+
+        Yields:
+            Mapping of report kind to output path, filled in once the block
+            ends.
+        """
+        self.start()
+        outputs: Dict[str, Path] = {}
+        try:
+            with self.thread():
+                yield outputs
+        finally:
+            outputs.update(self.dump(name))
+            self.stop()
+
+    def start(self) -> None:
+        """Start tracing allocations and, if enabled, sampling stacks."""
+        self._started_tracing = not tracemalloc.is_tracing()
+        if self._started_tracing:
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        tracemalloc.reset_peak()
+        if self.sample_interval:
+            self._sampler = StackSampler(self.sample_interval)
+            self._sampler.start()
+
+    def stop(self) -> None:
+        """Stop what start() started, discarding anything not yet dumped."""
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        if self._sampler:
+            self._sampler.stop()
+            self._sampler = None
+        with self._lock:
+            self._profiles = []
+
+    @contextmanager
+    def thread(self) -> Iterator[None]:
+        """Profile the calling thread for the duration of a block."""
+        if self._sampler:
+            self._sampler.watch(threading.current_thread())
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12+ allows only one active profiler; the samples
+            # still cover this thread
+            yield
+            return
+        try:
+            yield
+        finally:
+            profile.disable()
+            with self._lock:
+                self._profiles.append(profile)
+
+    def dump(self, name: str = "batch") -> Dict[str, Path]:
+        """
+        Write everything collected since the last dump and start afresh.
+
+        Returns:
+            Mapping of report kind to output path.
+        """
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        with self._lock:
+            profiles, self._profiles = self._profiles, []
+        self._dumps += 1
+        return self._write(name, profiles, snapshot, peak)
+
+    def _write(
+        self,
+        name: str,
+        profiles: List[cProfile.Profile],
+        snapshot: tracemalloc.Snapshot,
+        peak: int,
+    ) -> Dict[str, Path]:
+        """Write every report and return their paths."""
+        self.output_folder.mkdir(parents=True, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        # Runs of a persistent queue can end within the same second
+        base = self.output_folder / f"{name}-{stamp}-{os.getpid()}-{self._dumps}"
+        outputs = {
+            "tracemalloc": base.with_suffix(".tracemalloc"),
+            "allocations": base.with_suffix(".tracemalloc.txt"),
+        }
+
+        if profiles:
+            outputs["pstats"] = base.with_suffix(".pstats")
+            stats = pstats.Stats(profiles[0])
+            for profile in profiles[1:]:
+                stats.add(profile)
+            stats.dump_stats(outputs["pstats"])
+
+        snapshot.dump(str(outputs["tracemalloc"]))
+        lines = [f"Peak traced memory: {peak / 1e6:.1f} MB", ""]
+        for stat in snapshot.statistics("lineno")[:TOP_ALLOCATIONS]:
+            lines.append(str(stat))
+        outputs["allocations"].write_text("\n".join(lines) + "\n", "utf-8")
+
+        if self._sampler:
+            outputs["folded"] = base.with_suffix(".folded")
+            self._sampler.write(outputs["folded"])
+        return outputs
+
+
+def from_environment() -> Optional[BatchProfiler]:
+    """Return a profiler if BGREMOVER_PROFILE names an output folder."""
+    folder = os.environ.get(PROFILE_ENV)
+    if not folder:
+        return None
+    interval = os.environ.get(SAMPLE_ENV)
+    return BatchProfiler(
+        Path(folder), float(interval) / 1000 if interval else None
+    )
@@ -0,0 +1,254 @@
+"""INT8 quantization of the segmentation models for faster CPU inference.
+
+Quantized models are produced locally from the cached FP32 model with ONNX
+Runtime's quantization tooling and stored next to it in the rembg model
+folder, e.g. ``~/.u2net/u2net.int8-static.onnx``. Producing them needs the
+optional ``onnx`` and ``sympy`` packages; loading them does not.
+"""
+
+import os
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+import onnxruntime as ort
+from PIL import Image
+from rembg.sessions import sessions_class
+
+if TYPE_CHECKING:
+    from background_remover.image_processor import ImageProcessor
+
+# Model precisions ImageProcessor can load
+FP32 = "fp32"
+INT8_DYNAMIC = "int8-dynamic"
+INT8_STATIC = "int8-static"
+PRECISIONS = (FP32, INT8_DYNAMIC, INT8_STATIC)
+
+# Mask values at or above this count as foreground when comparing masks
+IOU_THRESHOLD = 128
+
+
+@dataclass
+class AccuracyReport:
+    """Mask agreement and speed of a quantized model versus FP32."""
+
+    ious: List[float] = field(default_factory=list)
+    reference_seconds: float = 0.0
+    candidate_seconds: float = 0.0
+
+    @property
+    def mean_iou(self) -> float:
+        return float(np.mean(self.ious)) if self.ious else 0.0
+
+    @property
+    def min_iou(self) -> float:
+        return min(self.ious) if self.ious else 0.0
+
+    @property
+    def speedup(self) -> float:
+        if not self.candidate_seconds:
+            return 0.0
+        return self.reference_seconds / self.candidate_seconds
+
+
+def session_class_for(model_name: str):
+    """Return the rembg session class of a model name."""
+    for session_class in sessions_class:
+        if session_class.name() == model_name:
+            return session_class
+    raise ValueError(f"Unknown model: {model_name}")
+
+
+def session_class_for_file(session_class, model_path: Path):
+    """
+    Return a session class that loads its weights from ``model_path``.
+
+    The model's own pre- and post-processing are kept, so a quantized file
+    behaves exactly like the model it was derived from.
+    """
+
+    class FileSession(session_class):
+        @classmethod
+        def download_models(cls, *args, **kwargs):
+            return str(model_path)
+
+    FileSession.__name__ = f"{session_class.__name__}FromFile"
+    return FileSession
+
+
+def fp32_model_path(model_name: str) -> Path:
+    """Return the cached FP32 model file, downloading it if needed."""
+    return Path(session_class_for(model_name).download_models())
+
+
+def quantized_model_path(model_name: str, precision: str) -> Path:
+    """Return where the quantized variant of a model is stored."""
+    if precision not in PRECISIONS or precision == FP32:
+        raise ValueError(f"Unsupported precision: {precision}")
+    home = Path(session_class_for(model_name).u2net_home())
+    return home / f"{model_name}.{precision}.onnx"
+
+
+def _quantization_tools():
+    """Import ONNX Runtime's quantization tooling and its optional dependencies."""
+    try:
+        # quant_pre_process imports sympy lazily, after the model is loaded
+        import sympy  # noqa: F401
+        from onnxruntime import quantization
+    except ImportError as e:
+        raise RuntimeError(
+            "Quantizing models needs the optional 'onnx' and 'sympy' packages. "
+            "Install them with: pip install 'background_remover[quantize]'"
+        ) from e
+    return quantization
+
+
+class _RecordingSession:
+    """Wraps an InferenceSession and records the inputs it is run with."""
+
+    def __init__(self, inner: ort.InferenceSession):
+        self._inner = inner
+        self.feeds: List[Dict[str, np.ndarray]] = []
+
+    def run(self, output_names, input_feed, *args, **kwargs):
+        self.feeds.append(input_feed)
+        return self._inner.run(output_names, input_feed, *args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._inner, name)
+
+
+def calibration_feeds(
+    model_name: str, model_path: Path, images: Sequence[np.ndarray]
+) -> List[Dict[str, np.ndarray]]:
+    """
+    Return the model inputs produced for each calibration image.
+
+    The FP32 session preprocesses every image exactly as it would during
+    normal use, so static quantization calibrates on realistic activations.
+    """
+    session_class = session_class_for_file(session_class_for(model_name), model_path)
+    session = session_class(model_name, ort.SessionOptions())
+    recorder = _RecordingSession(session.inner_session)
+    session.inner_session = recorder
+    for image in images:
+        session.predict(Image.fromarray(image))
+    return recorder.feeds
+
+
+class _FeedReader:
+    """Calibration data reader over recorded model inputs."""
+
+    def __init__(self, feeds: List[Dict[str, np.ndarray]]):
+        self._feeds: Iterator[Dict[str, np.ndarray]] = iter(feeds)
+
+    def get_next(self) -> Optional[Dict[str, np.ndarray]]:
+        return next(self._feeds, None)
+
+
+def quantize_model(
+    model_name: str = "u2net",
+    precision: str = INT8_DYNAMIC,
+    calibration_images: Optional[Sequence[np.ndarray]] = None,
+) -> Path:
+    """
+    Quantize a cached FP32 model and store the result next to it.
+
+    Dynamic quantization converts the weights ahead of time and the
+    activations at run time. Static quantization also fixes the activation
+    ranges using calibration images and is usually faster.
+
+    Args:
+        model_name: rembg model to quantize.
+        precision: INT8_DYNAMIC or INT8_STATIC.
+        calibration_images: RGB uint8 arrays used to calibrate static
+            quantization; ideally real images from the catalog.
+
+    Returns:
+        Path of the quantized model.
+
+    Raises:
+        RuntimeError: If the optional ``onnx`` or ``sympy`` package is missing.
+        ValueError: If the precision is unsupported or static quantization
+            has no calibration images.
+    """
+    destination = quantized_model_path(model_name, precision)
+    quantization = _quantization_tools()
+    source = fp32_model_path(model_name)
+    if precision == INT8_STATIC and not calibration_images:
+        raise ValueError("Static quantization needs calibration images")
+
+    temporary = destination.with_name(f".{destination.name}.{os.getpid()}.tmp")
+    prepared = destination.with_name(f".{destination.name}.{os.getpid()}.prep")
+
+    try:
+        # Fold constants and infer shapes so more nodes can be quantized
+        quantization.quant_pre_process(str(source), str(prepared))
+        if precision == INT8_DYNAMIC:
+            # Unsigned weights: signed ConvInteger has no CPU kernel
+            quantization.quantize_dynamic(
+                prepared, temporary, weight_type=quantization.QuantType.QUInt8
+            )
+        else:
+            feeds = calibration_feeds(model_name, source, calibration_images)
+            quantization.quantize_static(
+                prepared,
+                temporary,
+                _FeedReader(feeds),
+                quant_format=quantization.QuantFormat.QDQ,
+                per_channel=True,
+                activation_type=quantization.QuantType.QUInt8,
+                weight_type=quantization.QuantType.QInt8,
+            )
+        os.replace(temporary, destination)
+    finally:
+        for leftover in (temporary, prepared):
+            if leftover.exists():
+                leftover.unlink()
+    return destination
+
+
+def mask_iou(reference: np.ndarray, candidate: np.ndarray) -> float:
+    """Return the intersection over union of two masks' foregrounds."""
+    a = reference >= IOU_THRESHOLD
+    b = candidate >= IOU_THRESHOLD
+    union = np.logical_or(a, b).sum()
+    if not union:
+        return 1.0
+    return float(np.logical_and(a, b).sum() / union)
+
+
+def accuracy_report(
+    reference: "ImageProcessor",
+    candidate: "ImageProcessor",
+    images: Sequence[np.ndarray],
+) -> AccuracyReport:
+    """
+    Compare a quantized processor's masks and speed against FP32.
+
+    Args:
+        reference: Processor running the FP32 model.
+        candidate: Processor running the quantized model.
+        images: Sample uint8 images.
+
+    Returns:
+        Per-image mask IoU and the total inference time of each processor.
+    """
+    report = AccuracyReport()
+    # Load both models before timing anything
+    reference.process_array(images[0])
+    candidate.process_array(images[0])
+
+    for image in images:
+        start = time.perf_counter()
+        _, expected = reference.process_array(image)
+        report.reference_seconds += time.perf_counter() - start
+
+        start = time.perf_counter()
+        _, actual = candidate.process_array(image)
+        report.candidate_seconds += time.perf_counter() - start
+
+        report.ious.append(mask_iou(expected, actual))
+    return report
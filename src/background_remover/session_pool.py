@@ -0,0 +1,93 @@
+"""Bounded pool of inference sessions shared by threads."""
+
+import time
+from contextlib import contextmanager
+from threading import Condition
+from typing import Callable, Generic, Iterator, List, TypeVar
+
+from background_remover import metrics
+
+S = TypeVar("S")
+
+
+class SessionPool(Generic[S]):
+    """
+    Hands out sessions to one thread at a time, creating them on demand.
+
+    A thread that needs a session takes an idle one, creates a new one while
+    the pool is below ``max_size``, or otherwise waits for one to be returned.
+    Sessions are created outside the lock so one slow model load doesn't
+    block threads that could reuse an idle session.
+    """
+
+    def __init__(self, factory: Callable[[], S], max_size: int, label: str = ""):
+        """
+        Initialize the pool.
+
+        Args:
+            factory: Creates a new session.
+            max_size: Most sessions that will ever exist at once.
+            label: Name reported in the metrics' ``model`` label.
+        """
+        if max_size < 1:
+            raise ValueError("A session pool needs room for at least one session")
+        self._factory = factory
+        self.max_size = max_size
+        self._label = label
+        self._condition = Condition()
+        # Most recently returned last, so the warmest session is reused first
+        self._idle: List[S] = []
+        self._created = 0
+
+    def size(self) -> int:
+        """Return the number of sessions created or being created."""
+        with self._condition:
+            return self._created
+
+    def clear(self) -> None:
+        """Drop every idle session; sessions in use are kept."""
+        with self._condition:
+            idle, self._idle = self._idle, []
+            self._created -= len(idle)
+            self._condition.notify_all()
+        for _ in idle:
+            metrics.SESSION_POOL_SIZE.dec(model=self._label)
+
+    @contextmanager
+    def acquire(self) -> Iterator[S]:
+        """
+        Borrow a session for the duration of a block.
+
+        Raises:
+            Exception: Whatever the factory raises if a new session fails to
+                load; the slot is freed so a later call can retry.
+        """
+        start = time.perf_counter()
+        with self._condition:
+            while not self._idle and self._created >= self.max_size:
+                self._condition.wait()
+            session = self._idle.pop() if self._idle else None
+            if session is None:
+                self._created += 1
+        metrics.SESSION_WAIT_SECONDS.observe(
+            time.perf_counter() - start, model=self._label
+        )
+
+        if session is None:
+            try:
+                session = self._factory()
+            except BaseException:
+                with self._condition:
+                    self._created -= 1
+                    self._condition.notify()
+                raise
+            metrics.SESSION_POOL_SIZE.inc(model=self._label)
+
+        metrics.SESSIONS_IN_USE.inc(model=self._label)
+        try:
+            yield session
+        finally:
+            metrics.SESSIONS_IN_USE.dec(model=self._label)
+            with self._condition:
+                self._idle.append(session)
+                self._condition.notify()
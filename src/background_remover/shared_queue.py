@@ -0,0 +1,380 @@
+"""Coordinator-free work queue shared by workers over a common filesystem.
+
+Any number of processes, on any hosts that mount the same folders, can run a
+``SharedQueueWorker`` against the same input and output folders. Work is
+claimed through lease files created with ``O_CREAT | O_EXCL``, which is atomic
+on local filesystems and NFS alike. While a file is being processed its lease
+is touched periodically; a lease whose modification time is older than the
+lease TTL belongs to a dead worker and may be stolen; the dead worker's
+partial output is removed when its lease is taken over.
+
+Outputs are written to a worker-unique temporary name and moved into place
+with ``os.replace``, so even in the rare case that two workers process the
+same file the final output is never partially written.
+"""
+
+import hashlib
+import json
+import os
+import random
+import socket
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional
+
+from background_remover import metrics
+from background_remover.image_processor import ImageProcessor
+
+# Seconds after the last heartbeat before a lease is considered abandoned
+DEFAULT_LEASE_TTL = 120.0
+
+# Seconds to wait before rescanning when other workers hold the remaining work
+DEFAULT_POLL_INTERVAL = 5.0
+
+# Name of the folder inside the output folder holding queue state
+STATE_FOLDER = ".queue"
+
+
+@dataclass
+class QueueStats:
+    """Counts of files handled by one worker."""
+
+    processed: int = 0
+    failed: int = 0
+    stolen: int = 0
+
+
+class SharedWorkQueue:
+    """View of the queue state kept next to the outputs."""
+
+    def __init__(
+        self,
+        input_folder: Path,
+        output_folder: Path,
+        lease_ttl: float = DEFAULT_LEASE_TTL,
+    ):
+        """
+        Initialize the queue.
+
+        Args:
+            input_folder: Folder scanned recursively for images to process.
+            output_folder: Folder receiving outputs, mirroring the input tree.
+            lease_ttl: Seconds without a heartbeat after which a lease expires.
+        """
+        self.input_folder = input_folder
+        self.output_folder = output_folder
+        self.lease_ttl = lease_ttl
+
+        state = output_folder / STATE_FOLDER
+        self._leases = state / "leases"
+        self._done = state / "done"
+        self._failed = state / "failed"
+        for folder in (self._leases, self._done, self._failed):
+            folder.mkdir(parents=True, exist_ok=True)
+
+    def scan(self) -> Dict[str, Path]:
+        """Return pending input files keyed by their queue key."""
+        finished = set(os.listdir(self._done)) | set(os.listdir(self._failed))
+        pending = {}
+        for path in sorted(self.input_folder.rglob("*")):
+            if not path.is_file() or not ImageProcessor.is_supported_format(path):
+                continue
+            # Outputs may live inside the input tree; never queue them
+            if self.output_folder in path.parents:
+                continue
+            key = self.key_for(path)
+            if key not in finished:
+                pending[key] = path
+        return pending
+
+    def key_for(self, input_path: Path) -> str:
+        """Return the filesystem-safe queue key of an input file."""
+        relative = input_path.relative_to(self.input_folder).as_posix()
+        return hashlib.blake2b(relative.encode("utf-8"), digest_size=16).hexdigest()
+
+    def output_path_for(self, input_path: Path) -> Path:
+        """
+        Return the deterministic output path of an input file.
+
+        The input's extension is kept in the name when another supported file
+        in the same folder shares its stem, so outputs never collide.
+        """
+        relative = input_path.relative_to(self.input_folder)
+        siblings = [
+            p
+            for p in input_path.parent.glob(f"{input_path.stem}.*")
+            if p != input_path and ImageProcessor.is_supported_format(p)
+        ]
+        stem = input_path.stem
+        if siblings:
+            stem = f"{stem}_{input_path.suffix.lstrip('.').lower()}"
+        return self.output_folder / relative.parent / f"{stem}.png"
+
+    def temporary_path_for(self, input_path: Path, owner: str) -> Path:
+        """Return where a worker writes an output before moving it into place."""
+        output_path = self.output_path_for(input_path)
+        return output_path.with_name(f".{output_path.stem}.{owner}.tmp.png")
+
+    def is_finished(self, key: str) -> bool:
+        """Check whether any worker already completed or failed a file."""
+        return (self._done / key).exists() or (self._failed / key).exists()
+
+    def has_active_leases(self) -> bool:
+        """Check whether any worker currently holds an unexpired lease."""
+        return any(
+            not self._is_expired(lease)
+            for lease in self._leases.iterdir()
+            if lease.suffix == ".lease"
+        )
+
+    def try_claim(self, key: str, input_path: Path, owner: str) -> Optional[str]:
+        """
+        Try to take the lease for a file.
+
+        Returns:
+            None if another worker holds a live lease, "claimed" for a fresh
+            claim or "stolen" when an expired lease was taken over.
+        """
+        lease = self._lease_path(key)
+        if self._create_lease(lease, input_path, owner):
+            return "claimed"
+
+        if not self._is_expired(lease):
+            return None
+
+        # Move the stale lease aside; only one contender's rename succeeds
+        tombstone = lease.with_name(f"{lease.name}.{owner}.stale")
+        try:
+            os.rename(lease, tombstone)
+        except OSError:
+            return None
+
+        try:
+            # If the lease turned out to be fresh, another worker re-claimed
+            # it between our checks; give it back
+            if not self._is_expired(tombstone):
+                if not lease.exists():
+                    os.rename(tombstone, lease)
+                return None
+            self._remove_temporary(tombstone, input_path)
+        finally:
+            if tombstone.exists():
+                tombstone.unlink()
+
+        if self._create_lease(lease, input_path, owner):
+            return "stolen"
+        return None
+
+    def heartbeat(self, key: str) -> None:
+        """Refresh a held lease so other workers don't consider it expired."""
+        os.utime(self._lease_path(key))
+
+    def holds_lease(self, key: str, owner: str) -> bool:
+        """Check that a lease is still held by the given owner."""
+        try:
+            info = json.loads(self._lease_path(key).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return False
+        return info.get("owner") == owner
+
+    def release(self, key: str) -> None:
+        """Remove a lease."""
+        try:
+            self._lease_path(key).unlink()
+        except FileNotFoundError:
+            pass
+
+    def mark_done(self, key: str, input_path: Path, output_path: Path) -> None:
+        """Record that a file finished successfully."""
+        self._write_marker(self._done / key, input_path, output=str(output_path))
+
+    def mark_failed(self, key: str, input_path: Path, error: str) -> None:
+        """Record that a file failed so other workers don't retry it."""
+        self._write_marker(self._failed / key, input_path, error=error)
+
+    def _lease_path(self, key: str) -> Path:
+        return self._leases / f"{key}.lease"
+
+    def _remove_temporary(self, lease: Path, input_path: Path) -> None:
+        """Delete the partial output left behind by an expired lease's owner."""
+        try:
+            owner = json.loads(lease.read_text(encoding="utf-8"))["owner"]
+        except (OSError, ValueError, KeyError):
+            return
+        try:
+            self.temporary_path_for(input_path, owner).unlink()
+        except FileNotFoundError:
+            pass
+
+    def _is_expired(self, lease: Path) -> bool:
+        try:
+            age = time.time() - lease.stat().st_mtime
+        except FileNotFoundError:
+            return False
+        return age > self.lease_ttl
+
+    @staticmethod
+    def _create_lease(lease: Path, input_path: Path, owner: str) -> bool:
+        try:
+            fd = os.open(lease, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"owner": owner, "input": str(input_path)}, f)
+        return True
+
+    @staticmethod
+    def _write_marker(marker: Path, input_path: Path, **details) -> None:
+        temporary = marker.with_name(f".{marker.name}.{uuid.uuid4().hex}")
+        temporary.write_text(
+            json.dumps({"input": str(input_path), **details}), encoding="utf-8"
+        )
+        os.replace(temporary, marker)
+
+
+class SharedQueueWorker:
+    """Headless worker that processes files from a SharedWorkQueue."""
+
+    def __init__(
+        self,
+        queue: SharedWorkQueue,
+        processor: Optional[ImageProcessor] = None,
+        worker_id: Optional[str] = None,
+    ):
+        """
+        Initialize the worker.
+
+        Args:
+            queue: Queue to take work from.
+            processor: Optional pre-loaded ImageProcessor instance.
+            worker_id: Unique owner name written into leases.
+        """
+        self._queue = queue
+        self._processor = processor if processor else ImageProcessor()
+        self.worker_id = worker_id or (
+            f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        )
+        self._stop = threading.Event()
+
+    def stop(self) -> None:
+        """Ask the worker to stop after the current file."""
+        self._stop.set()
+
+    def run(
+        self,
+        follow: bool = False,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+    ) -> QueueStats:
+        """
+        Process files until the queue is drained.
+
+        Args:
+            follow: Keep polling for new input files instead of exiting once
+                every file is finished.
+            poll_interval: Seconds to wait between scans when no work can be
+                claimed.
+
+        Returns:
+            Counts of the files this worker handled.
+        """
+        stats = QueueStats()
+        while not self._stop.is_set():
+            pending = self._queue.scan()
+            worked = False
+
+            # Visit files in a per-worker order to reduce claim contention
+            items = list(pending.items())
+            random.shuffle(items)
+            for key, input_path in items:
+                if self._stop.is_set():
+                    break
+                if self._process_one(key, input_path, stats):
+                    worked = True
+
+            if worked:
+                continue
+            if not pending and not follow and not self._queue.has_active_leases():
+                break
+            self._stop.wait(poll_interval)
+
+        return stats
+
+    def _process_one(self, key: str, input_path: Path, stats: QueueStats) -> bool:
+        """Claim and process one file; return False if it couldn't be claimed."""
+        claim = self._queue.try_claim(key, input_path, self.worker_id)
+        if claim is None:
+            return False
+
+        try:
+            # Another worker may have finished it between our scan and claim
+            if self._queue.is_finished(key):
+                return False
+            if claim == "stolen":
+                stats.stolen += 1
+
+            output_path = self._queue.output_path_for(input_path)
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            temporary = self._queue.temporary_path_for(input_path, self.worker_id)
+
+            heartbeat = _Heartbeat(
+                self._queue, key, self.worker_id, self._queue.lease_ttl / 3
+            )
+            heartbeat.start()
+            try:
+                self._processor.process_image(input_path, temporary)
+            except Exception as e:
+                temporary.unlink(missing_ok=True)
+                self._queue.mark_failed(key, input_path, str(e))
+                metrics.FILES_FAILED.inc()
+                stats.failed += 1
+                return True
+            finally:
+                heartbeat.stop()
+
+            if not self._queue.holds_lease(key, self.worker_id):
+                # Our lease was stolen while we worked; the new owner will
+                # write the same output, so drop ours if it didn't already
+                temporary.unlink(missing_ok=True)
+                return True
+
+            os.replace(temporary, output_path)
+            self._queue.mark_done(key, input_path, output_path)
+            metrics.FILES_PROCESSED.inc()
+            stats.processed += 1
+            return True
+        finally:
+            if self._queue.holds_lease(key, self.worker_id):
+                self._queue.release(key)
+
+
+class _Heartbeat(threading.Thread):
+    """Background thread that keeps a lease fresh while a file is processed."""
+
+    def __init__(
+        self, queue: SharedWorkQueue, key: str, owner: str, interval: float
+    ):
+        super().__init__(daemon=True)
+        self._queue = queue
+        self._key = key
+        self._owner = owner
+        self._interval = interval
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self._interval):
+            # Once another worker has taken the lease over, refreshing it
+            # would keep that worker's lease alive even if it died
+            if not self._queue.holds_lease(self._key, self._owner):
+                return
+            try:
+                self._queue.heartbeat(self._key)
+            except OSError:
+                # Lease was removed or the share is briefly unavailable
+                pass
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
@@ -0,0 +1,365 @@
+"""Model weights shared read-only between processes through memory mapping.
+
+A model is split once into a small graph file and a raw weights file, stored
+next to the rembg models, e.g. ``~/.u2net/u2net.fp32.shared/``. Processes
+using shared weights memory-map the weights file and hand ONNX Runtime the
+mapped tensors as session initializers, which it uses in place instead of
+copying. Every process, and every pooled session within one, then reads the
+same physical pages from the OS page cache, so N workers on a node hold one
+copy of the weights rather than N.
+
+Graph optimizations that rewrite weights, such as folding BatchNormalization
+into Conv, would give every process its own copy. The model is therefore
+optimized once before it is split, and sessions on shared weights skip the
+optimizations that still rewrite weights: pre-packing and the layout
+transforms of ORT_ENABLE_ALL. Splitting a model needs the optional ``onnx``
+package; loading a split model does not.
+"""
+
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import onnxruntime as ort
+
+from background_remover import quantization
+
+GRAPH_FILENAME = "graph.onnx"
+WEIGHTS_FILENAME = "weights.bin"
+MANIFEST_FILENAME = "manifest.json"
+
+# Version of the split layout; older splits are made again. Version 2
+# optimizes the model before splitting it
+_FORMAT_VERSION = 2
+
+# Byte alignment of each tensor in the weights file, enough for SIMD loads
+_ALIGNMENT = 64
+
+# Optimizations applied before splitting. Basic ones rewrite weights, e.g.
+# constant folding and BatchNormalization folding, and give standard ONNX ops
+_PREPARE_OPTIMIZATION = ort.GraphOptimizationLevel.ORT_ENABLE_BASIC
+
+# Optimizations sessions on shared weights run; extended fusions use the
+# initializers as they are, while ORT_ENABLE_ALL reorders them into copies
+_SESSION_OPTIMIZATION = ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED
+
+# Seconds a measurement worker may take to load the model and run once
+_WORKER_STARTUP_TIMEOUT = 600
+
+
+def shared_model_dir(model_name: str, precision: str = quantization.FP32) -> Path:
+    """Return where the split form of a model is stored."""
+    home = Path(quantization.session_class_for(model_name).u2net_home())
+    return home / f"{model_name}.{precision}.shared"
+
+
+def _source_model_path(model_name: str, precision: str) -> Path:
+    if precision == quantization.FP32:
+        return quantization.fp32_model_path(model_name)
+    path = quantization.quantized_model_path(model_name, precision)
+    if not path.exists():
+        raise FileNotFoundError(
+            f"No {precision} model at {path}; create it with "
+            f"'background-remover quantize --precision {precision}'"
+        )
+    return path
+
+
+def _is_prepared(folder: Path) -> bool:
+    """Check whether a folder holds a split model in the current layout."""
+    try:
+        manifest = json.loads((folder / MANIFEST_FILENAME).read_text("utf-8"))
+    except (OSError, ValueError):
+        return False
+    return manifest.get("version") == _FORMAT_VERSION
+
+
+def _onnx():
+    """Import the ``onnx`` package needed to split models."""
+    try:
+        import onnx
+    except ImportError as e:
+        raise RuntimeError(
+            "Preparing shared weights needs the optional 'onnx' package. "
+            "Install it with: pip install 'background_remover[quantize]'"
+        ) from e
+    return onnx
+
+
+def prepare_shared_model(
+    model_name: str, precision: str = quantization.FP32
+) -> Path:
+    """
+    Optimize a model, then split it into a weights-free graph and a mappable
+    weights file.
+
+    Does nothing if the split form already exists. Concurrent callers are
+    safe: each writes to a staging folder that is renamed into place.
+
+    Args:
+        model_name: rembg model to split.
+        precision: FP32, or an INT8 variant created with ``quantize_model``.
+
+    Returns:
+        The folder holding the split model.
+
+    Raises:
+        RuntimeError: If the ``onnx`` package isn't installed.
+        FileNotFoundError: If the INT8 variant hasn't been created.
+    """
+    folder = shared_model_dir(model_name, precision)
+    if _is_prepared(folder):
+        return folder
+
+    onnx = _onnx()
+    from onnx import external_data_helper, numpy_helper
+
+    staging = Path(tempfile.mkdtemp(prefix=f".{folder.name}-", dir=folder.parent))
+    try:
+        # Rewrite the weights now, so sessions don't make private copies
+        optimized = staging / "optimized.onnx"
+        options = ort.SessionOptions()
+        options.graph_optimization_level = _PREPARE_OPTIMIZATION
+        options.optimized_model_filepath = str(optimized)
+        ort.InferenceSession(
+            str(_source_model_path(model_name, precision)),
+            options,
+            providers=["CPUExecutionProvider"],
+        )
+        model = onnx.load(str(optimized))
+        optimized.unlink()
+
+        entries = []
+        offset = 0
+        with open(staging / WEIGHTS_FILENAME, "wb") as f:
+            for tensor in model.graph.initializer:
+                array = np.ascontiguousarray(numpy_helper.to_array(tensor))
+                if array.dtype.kind in "OSU":
+                    # Strings can't be mapped; they stay in the graph
+                    continue
+                padding = -offset % _ALIGNMENT
+                f.write(b"\0" * padding)
+                offset += padding
+                f.write(array.tobytes())
+                entries.append(
+                    {
+                        "name": tensor.name,
+                        "dtype": array.dtype.str,
+                        "shape": list(array.shape),
+                        "offset": offset,
+                    }
+                )
+                # The graph keeps only a reference; sessions override it
+                external_data_helper.set_external_data(
+                    tensor, WEIGHTS_FILENAME, offset, array.nbytes
+                )
+                for field in ("raw_data", "float_data", "int32_data", "int64_data"):
+                    tensor.ClearField(field)
+                offset += array.nbytes
+
+        onnx.save(model, str(staging / GRAPH_FILENAME))
+        (staging / MANIFEST_FILENAME).write_text(
+            json.dumps({"version": _FORMAT_VERSION, "initializers": entries}),
+            encoding="utf-8",
+        )
+        if folder.exists() and not _is_prepared(folder):
+            # Split by an older release; processes mapping it keep their pages
+            shutil.rmtree(folder, ignore_errors=True)
+        try:
+            os.replace(staging, folder)
+        except OSError:
+            # Another process finished first
+            if not _is_prepared(folder):
+                raise
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    return folder
+
+
+class SharedWeights:
+    """Memory-mapped initializers of one split model."""
+
+    def __init__(self, folder: Path):
+        """
+        Map a split model's weights.
+
+        Args:
+            folder: Folder written by prepare_shared_model().
+        """
+        manifest = json.loads((folder / MANIFEST_FILENAME).read_text("utf-8"))
+        self.graph_path = folder / GRAPH_FILENAME
+        self._mapping = np.memmap(folder / WEIGHTS_FILENAME, mode="r")
+        # Sessions don't own these; they must outlive every session using them
+        self._values: Dict[str, ort.OrtValue] = {}
+        for entry in manifest["initializers"]:
+            array = np.ndarray(
+                entry["shape"],
+                dtype=entry["dtype"],
+                buffer=self._mapping,
+                offset=entry["offset"],
+            )
+            self._values[entry["name"]] = ort.OrtValue.ortvalue_from_numpy(array)
+
+    @property
+    def nbytes(self) -> int:
+        return self._mapping.nbytes
+
+    def apply(self, sess_opts: ort.SessionOptions) -> ort.SessionOptions:
+        """Make sessions created with these options use the mapped weights."""
+        for name, value in self._values.items():
+            sess_opts.add_initializer(name, value)
+        sess_opts.add_session_config_entry("session.disable_prepacking", "1")
+        sess_opts.graph_optimization_level = _SESSION_OPTIMIZATION
+        return sess_opts
+
+
+_loaded: Dict[Path, SharedWeights] = {}
+_loaded_lock = Lock()
+
+
+def load_shared_weights(
+    model_name: str, precision: str = quantization.FP32
+) -> SharedWeights:
+    """
+    Return this process's mapping of a model's weights, preparing it if needed.
+
+    The mapping is created once per process, so every session in the
+    process shares it too.
+    """
+    folder = prepare_shared_model(model_name, precision)
+    with _loaded_lock:
+        weights = _loaded.get(folder)
+        if weights is None:
+            weights = _loaded[folder] = SharedWeights(folder)
+        return weights
+
+
+@dataclass
+class MemoryUsage:
+    """
+    Memory of one process.
+
+    Attributes:
+        pid: Process ID.
+        rss: Resident bytes, counting shared pages in full.
+        pss: Proportional bytes, splitting shared pages between the
+            processes mapping them; None where the OS doesn't report it.
+        anonymous: Bytes not backed by a file, which no other process can
+            share; None where the OS doesn't report it.
+    """
+
+    pid: int
+    rss: int
+    pss: Optional[int] = None
+    anonymous: Optional[int] = None
+
+
+def process_memory(pid: int) -> MemoryUsage:
+    """Measure a process's RSS, and its PSS and anonymous memory on Linux."""
+    values: Dict[str, int] = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", encoding="ascii") as f:
+            for line in f:
+                key, _, rest = line.partition(":")
+                if key in ("Rss", "Pss", "Anonymous"):
+                    values[key] = int(rest.split()[0]) * 1024
+    except (OSError, ValueError):
+        pass
+    if "Rss" in values:
+        return MemoryUsage(
+            pid, values["Rss"], values.get("Pss"), values.get("Anonymous")
+        )
+
+    try:
+        import psutil
+
+        return MemoryUsage(pid, psutil.Process(pid).memory_info().rss)
+    except ImportError:
+        pass
+    import resource
+
+    # Only this process can be measured without psutil
+    if pid != os.getpid():
+        raise RuntimeError("Measuring other processes needs psutil on this OS")
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return MemoryUsage(pid, peak if sys.platform == "darwin" else peak * 1024)
+
+
+def _memory_worker(model_name, precision, shared, results, stop) -> None:
+    """Measurement worker: load the model, run once, then idle until stopped."""
+    from background_remover.image_processor import ImageProcessor
+    from background_remover.tuning import synthetic_images
+
+    try:
+        processor = ImageProcessor(
+            model_name, precision=precision, max_sessions=1, shared_weights=shared
+        )
+        processor.process_array(synthetic_images(1, (640, 480))[0])
+    except Exception as e:
+        results.put((os.getpid(), str(e)))
+        return
+    results.put((os.getpid(), None))
+    stop.wait()
+
+
+def measure_workers(
+    workers: int,
+    shared: bool,
+    model_name: str = "u2net",
+    precision: str = quantization.FP32,
+) -> List[MemoryUsage]:
+    """
+    Start worker processes that each load the model, and measure them.
+
+    Every worker processes one image first, so the numbers include ONNX
+    Runtime's working memory and not just the loaded weights.
+
+    Args:
+        workers: Processes to start.
+        shared: Load weights through shared memory mapping.
+        model_name: rembg model to load.
+        precision: Model precision.
+
+    Returns:
+        Memory of each worker while all of them are loaded.
+
+    Raises:
+        RuntimeError: If a worker fails to load the model.
+    """
+    if shared:
+        prepare_shared_model(model_name, precision)
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    stop = context.Event()
+    processes = [
+        context.Process(
+            target=_memory_worker,
+            args=(model_name, precision, shared, results, stop),
+            daemon=True,
+        )
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    try:
+        loaded: List[Tuple[int, Optional[str]]] = [
+            results.get(timeout=_WORKER_STARTUP_TIMEOUT) for _ in processes
+        ]
+        errors = [error for _, error in loaded if error]
+        if errors:
+            raise RuntimeError(f"Worker failed to load the model: {errors[0]}")
+        return [process_memory(pid) for pid, _ in loaded]
+    finally:
+        stop.set()
+        for process in processes:
+            process.join(5)
+            if process.is_alive():
+                process.kill()
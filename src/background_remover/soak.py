@@ -0,0 +1,284 @@
+"""Memory soak test for long-running processing.
+
+Pushes thousands of synthetic images of varied sizes through ImageProcessor
+and ProcessingWorker with an offline stand-in session, sampling RSS and
+tracemalloc as it goes. Growth that continues after a warm-up period points
+at a per-image leak (unclosed images, retained buffers, growing arenas) that
+would eventually kill a long run.
+"""
+
+import csv
+import gc
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from PIL import Image
+
+from background_remover.image_processor import ImageProcessor
+from background_remover.tuning import synthetic_images
+from background_remover.worker import ProcessingWorker
+
+# Image sizes cycled through so buffers of many shapes are allocated
+DEFAULT_SIZES: Tuple[Tuple[int, int], ...] = (
+    (320, 240),
+    (640, 480),
+    (1024, 768),
+    (1500, 1000),
+    (800, 1200),
+)
+
+# Allowed memory growth across the steady-state part of a run
+DEFAULT_MAX_GROWTH_MB = 50.0
+
+# Leading fraction of samples ignored while caches and arenas fill up
+WARMUP_FRACTION = 0.2
+
+
+class SyntheticSession:
+    """Offline stand-in for a rembg session that allocates like the real one."""
+
+    def predict(self, img, *args, **kwargs):
+        # Downscale and upscale like rembg so the same kinds of buffers churn
+        small = img.convert("L").resize((320, 320), Image.Resampling.BILINEAR)
+        mask = small.point(lambda v: 255 if v > 127 else 0)
+        return [mask.resize(img.size, Image.Resampling.LANCZOS)]
+
+
+def current_rss() -> int:
+    """Return the resident set size of this process in bytes."""
+    try:
+        with open("/proc/self/statm", encoding="ascii") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    # Peak rather than current, but still catches unbounded growth
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+@dataclass
+class MemorySample:
+    """Memory use after a number of images."""
+
+    images: int
+    seconds: float
+    rss: int
+    traced: int
+
+
+@dataclass
+class SoakReport:
+    """Memory over time for one soak run and the verdict on it."""
+
+    samples: List[MemorySample] = field(default_factory=list)
+    max_growth_mb: float = DEFAULT_MAX_GROWTH_MB
+
+    def _steady(self) -> List[MemorySample]:
+        skip = int(len(self.samples) * WARMUP_FRACTION)
+        return self.samples[skip:]
+
+    def _growth(self, attribute: str) -> float:
+        """Fitted growth in MB across the steady-state samples."""
+        steady = self._steady()
+        if len(steady) < 2:
+            return 0.0
+        images = np.array([s.images for s in steady], dtype=float)
+        values = np.array([getattr(s, attribute) for s in steady], dtype=float)
+        # A fitted slope ignores one-off spikes from the allocator
+        slope = np.polyfit(images, values, 1)[0]
+        return float(slope * (images[-1] - images[0]) / 1e6)
+
+    @property
+    def rss_growth_mb(self) -> float:
+        return self._growth("rss")
+
+    @property
+    def traced_growth_mb(self) -> float:
+        return self._growth("traced")
+
+    @property
+    def passed(self) -> bool:
+        return (
+            self.rss_growth_mb <= self.max_growth_mb
+            and self.traced_growth_mb <= self.max_growth_mb
+        )
+
+    def summary(self) -> str:
+        """Describe the outcome in one line."""
+        images = self.samples[-1].images if self.samples else 0
+        verdict = "PASSED" if self.passed else "FAILED"
+        return (
+            f"{verdict}: {images} images, steady-state growth "
+            f"RSS {self.rss_growth_mb:+.1f} MB, "
+            f"Python heap {self.traced_growth_mb:+.1f} MB "
+            f"(limit {self.max_growth_mb:.0f} MB)"
+        )
+
+    def write(self, path: Path) -> None:
+        """Write memory over time as CSV."""
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["images", "seconds", "rss_mb", "traced_mb"])
+            for s in self.samples:
+                writer.writerow(
+                    [
+                        s.images,
+                        f"{s.seconds:.2f}",
+                        f"{s.rss / 1e6:.2f}",
+                        f"{s.traced / 1e6:.2f}",
+                    ]
+                )
+
+
+class _Recorder:
+    """Takes memory samples relative to the start of the run."""
+
+    def __init__(self, report: SoakReport):
+        self._report = report
+        self._start = time.perf_counter()
+
+    def sample(self, images: int) -> None:
+        gc.collect()
+        traced, _ = tracemalloc.get_traced_memory()
+        elapsed = time.perf_counter() - self._start
+        self._report.samples.append(
+            MemorySample(images, elapsed, current_rss(), traced)
+        )
+
+
+def _image(index: int, sizes: Sequence[Tuple[int, int]]) -> np.ndarray:
+    return synthetic_images(1, sizes[index % len(sizes)], seed=index)[0]
+
+
+def run_soak(
+    images: int = 2000,
+    sizes: Sequence[Tuple[int, int]] = DEFAULT_SIZES,
+    batch_size: int = 50,
+    max_growth_mb: float = DEFAULT_MAX_GROWTH_MB,
+    session_factory: Callable[[], object] = SyntheticSession,
+    progress: Optional[Callable[[MemorySample], None]] = None,
+) -> SoakReport:
+    """
+    Process synthetic images and track memory until ``images`` are done.
+
+    Half of the images go through ImageProcessor's in-memory APIs and half
+    through ProcessingWorker batches of files written to a temporary
+    folder, so decoding, encoding and the worker's bookkeeping are covered.
+    Memory is sampled after every ``batch_size`` images.
+
+    Args:
+        images: Total number of images to process.
+        sizes: Image sizes cycled through.
+        batch_size: Images per worker batch and between samples.
+        max_growth_mb: Steady-state growth above which the run fails.
+        session_factory: Creates the stand-in inference sessions.
+        progress: Optional callback receiving each sample.
+
+    Returns:
+        Samples of memory over time and the pass/fail verdict.
+    """
+    report = SoakReport(max_growth_mb=max_growth_mb)
+    processor = ImageProcessor(session_factory=session_factory)
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+
+    def record(done: int) -> None:
+        recorder.sample(done)
+        if progress:
+            progress(report.samples[-1])
+
+    try:
+        recorder = _Recorder(report)
+        record(0)
+        done = 0
+        with tempfile.TemporaryDirectory(prefix="bgremover-soak-") as folder:
+            workdir = Path(folder)
+            while done < images:
+                count = min(batch_size, images - done)
+                if (done // batch_size) % 2 == 0:
+                    _soak_processor(processor, done, count, sizes)
+                else:
+                    _soak_worker(processor, workdir, done, count, sizes)
+                done += count
+                record(done)
+    finally:
+        if started_tracing:
+            tracemalloc.stop()
+    return report
+
+
+def _soak_processor(
+    processor: ImageProcessor,
+    start: int,
+    count: int,
+    sizes: Sequence[Tuple[int, int]],
+) -> None:
+    """Run images through the array and in-memory encode/decode paths."""
+    for index in range(start, start + count):
+        array = _image(index, sizes)
+        if index % 2:
+            processor.process_array(array, inplace=True)
+        else:
+            buffer = _encode(array, "JPEG" if index % 4 else "PNG")
+            processor.process_bytes(buffer)
+
+
+def _soak_worker(
+    processor: ImageProcessor,
+    workdir: Path,
+    start: int,
+    count: int,
+    sizes: Sequence[Tuple[int, int]],
+) -> None:
+    """Run a batch of files through ProcessingWorker, then delete them."""
+    inputs = workdir / "inputs"
+    outputs = workdir / "outputs"
+    inputs.mkdir(exist_ok=True)
+    outputs.mkdir(exist_ok=True)
+
+    files = []
+    for index in range(start, start + count):
+        path = inputs / f"image_{index}.{'jpg' if index % 2 else 'png'}"
+        Image.fromarray(_image(index, sizes)).save(path)
+        files.append(path)
+
+    failures = []
+
+    def completed(filename: str, success: bool, message: str):
+        if not success:
+            failures.append(message)
+
+    # Stand-in timings would skew the estimates of real batches
+    worker = ProcessingWorker(files, outputs, processor, persist_costs=False)
+    worker.file_completed.connect(completed)
+    # Run on this thread; signals are delivered directly without an event loop
+    worker.run()
+    if failures:
+        raise RuntimeError(f"Soak batch failed: {failures[0]}")
+
+    for folder in (inputs, outputs):
+        for path in folder.iterdir():
+            path.unlink()
+
+
+def _encode(array: np.ndarray, format: str) -> bytes:
+    output = io.BytesIO()
+    Image.fromarray(array).save(output, format)
+    return output.getvalue()
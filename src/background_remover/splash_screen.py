@@ -22,12 +22,19 @@ class ModelLoaderThread(QThread):
 
         # Import here to avoid slow import at app start
         self.progress.emit(30, "Loading libraries...")
+        from background_remover import tuning
         from background_remover.image_processor import ImageProcessor
 
+        # A stale profile is reported by the main window once it's shown
+        profile = tuning.startup_profile()
+
         self.progress.emit(50, "Loading AI model (first run downloads ~176MB)...")
 
         # Create processor and trigger model load
-        processor = ImageProcessor()
+        processor = ImageProcessor(
+            intra_op_threads=profile.threads if profile else None,
+            max_sessions=profile.workers if profile else None,
+        )
 
         self.progress.emit(70, "Initializing AI model...")
         # Access session property to trigger lazy load
@@ -0,0 +1,209 @@
+"""Cropping cutouts to their visible content and recording where they came from.
+
+A trimmed output stores the crop box in source pixel coordinates so layout
+tools can put it back in place. PNG outputs carry it in the file itself: a
+standard ``oFFs`` chunk with the offset, understood by most image editors,
+and a ``bgremover.trim`` text chunk with the full box and original size.
+Other formats get a ``<output>.trim.json`` sidecar with the same fields.
+Outputs resized after cropping also record ``scale``, the output pixels per
+source pixel, and their ``oFFs`` offset is scaled to match.
+"""
+
+import io
+import json
+import struct
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Dict, Optional, Tuple, Union
+
+import numpy as np
+from PIL import Image
+
+from background_remover.apng import png_chunk
+
+# Crop box as (left, top, right, bottom), like Pillow's Image.crop
+Box = Tuple[int, int, int, int]
+
+# PNG text chunk holding the crop box and original size as JSON
+METADATA_KEY = "bgremover.trim"
+
+# Suffix of the sidecar written next to non-PNG outputs
+SIDECAR_SUFFIX = ".trim.json"
+
+
+@dataclass(frozen=True)
+class Trim:
+    """
+    Settings for cropping a cutout to its subject.
+
+    Attributes:
+        threshold: Minimum alpha (1-255) a pixel needs to count as content.
+        padding: Transparent margin in pixels kept around the content.
+    """
+
+    threshold: int = 1
+    padding: int = 0
+
+    def __post_init__(self):
+        if not 1 <= self.threshold <= 255:
+            raise ValueError("Trim threshold must be between 1 and 255")
+        if self.padding < 0:
+            raise ValueError("Trim padding can't be negative")
+
+    def bbox(self, alpha: np.ndarray) -> Optional[Box]:
+        """Return the padded content box of an alpha plane, or None if empty."""
+        return content_bbox(alpha, self.threshold, self.padding)
+
+
+def content_bbox(
+    alpha: np.ndarray, threshold: int = 1, padding: int = 0
+) -> Optional[Box]:
+    """
+    Find the bounding box of the pixels whose alpha reaches a threshold.
+
+    Rows and columns are reduced with a max first, so only two small 1-D
+    arrays are compared against the threshold instead of the whole plane.
+
+    Args:
+        alpha: (H, W) uint8 alpha or mask plane.
+        threshold: Minimum alpha that counts as content.
+        padding: Pixels added on every side, clamped to the image.
+
+    Returns:
+        (left, top, right, bottom) with exclusive right/bottom, or None when
+        no pixel reaches the threshold.
+    """
+    rows = np.flatnonzero(alpha.max(axis=1) >= threshold)
+    if not rows.size:
+        return None
+    columns = np.flatnonzero(alpha.max(axis=0) >= threshold)
+
+    height, width = alpha.shape
+    return (
+        max(int(columns[0]) - padding, 0),
+        max(int(rows[0]) - padding, 0),
+        min(int(columns[-1]) + 1 + padding, width),
+        min(int(rows[-1]) + 1 + padding, height),
+    )
+
+
+def union(first: Optional[Box], second: Optional[Box]) -> Optional[Box]:
+    """Return the smallest box containing both boxes."""
+    if first is None:
+        return second
+    if second is None:
+        return first
+    return (
+        min(first[0], second[0]),
+        min(first[1], second[1]),
+        max(first[2], second[2]),
+        max(first[3], second[3]),
+    )
+
+
+def placement(
+    box: Box, original_size: Tuple[int, int], scale: float = 1.0
+) -> Dict[str, float]:
+    """Describe a crop so it can be positioned on the original canvas."""
+    left, top, right, bottom = box
+    width, height = original_size
+    described: Dict[str, float] = {
+        "left": left,
+        "top": top,
+        "right": right,
+        "bottom": bottom,
+        "original_width": width,
+        "original_height": height,
+    }
+    if scale != 1.0:
+        described["scale"] = scale
+    return described
+
+
+def metadata_chunks(
+    box: Box, original_size: Tuple[int, int], scale: float = 1.0
+) -> bytes:
+    """Encode the text and oFFs chunks recording a crop, as save_png writes them."""
+    text = json.dumps(placement(box, original_size, scale))
+    # oFFs holds signed 32-bit x and y offsets; unit 0 means pixels
+    offset = struct.pack(">iiB", round(box[0] * scale), round(box[1] * scale), 0)
+    return png_chunk(
+        b"tEXt", METADATA_KEY.encode("latin-1") + b"\0" + text.encode("latin-1")
+    ) + png_chunk(b"oFFs", offset)
+
+
+def save_png(
+    image: Image.Image,
+    destination: Union[str, BinaryIO],
+    box: Optional[Box] = None,
+    original_size: Optional[Tuple[int, int]] = None,
+    scale: float = 1.0,
+    **options,
+) -> None:
+    """
+    Save a PNG, recording its crop when a box is given.
+
+    Pillow only writes a fixed set of public chunks, so the crop's chunks are
+    spliced in before the image data of the encoded file.
+
+    Args:
+        image: Image to save; ``options`` are passed to Image.save().
+        destination: Path or writable binary stream.
+        box: Crop box in source pixels, or None for an untrimmed image.
+        original_size: Size of the source canvas the box is on.
+        scale: Output pixels per source pixel.
+    """
+    if box is None:
+        image.save(destination, "PNG", **options)
+        return
+
+    encoded = io.BytesIO()
+    image.save(encoded, "PNG", **options)
+    data = encoded.getbuffer()
+    # Walk the chunks after the 8-byte signature to the first image data
+    position = 8
+    while bytes(data[position + 4 : position + 8]) != b"IDAT":
+        (length,) = struct.unpack(">I", data[position : position + 4])
+        position += length + 12
+    chunks = metadata_chunks(box, original_size, scale)
+    parts = (data[:position], chunks, data[position:])
+    if hasattr(destination, "write"):
+        destination.writelines(parts)
+    else:
+        with open(destination, "wb") as f:
+            f.writelines(parts)
+
+
+def sidecar_path(output_path: Path) -> Path:
+    """Return where the crop of a non-PNG output is recorded."""
+    return output_path.with_name(output_path.name + SIDECAR_SUFFIX)
+
+
+def write_sidecar(
+    output_path: Path,
+    box: Box,
+    original_size: Tuple[int, int],
+    scale: float = 1.0,
+) -> Path:
+    """Write the crop of a non-PNG output to a JSON file next to it."""
+    sidecar = sidecar_path(output_path)
+    sidecar.write_text(
+        json.dumps(placement(box, original_size, scale)), encoding="utf-8"
+    )
+    return sidecar
+
+
+def read_placement(path: Path) -> Optional[Dict[str, float]]:
+    """
+    Read the crop recorded for a trimmed output.
+
+    Returns:
+        The placement written by save_png or write_sidecar, or None if the
+        output wasn't trimmed.
+    """
+    sidecar = sidecar_path(path)
+    if sidecar.exists():
+        return json.loads(sidecar.read_text(encoding="utf-8"))
+    with Image.open(path) as img:
+        text = getattr(img, "text", {}).get(METADATA_KEY)
+    return json.loads(text) if text else None
@@ -0,0 +1,324 @@
+"""Per-machine tuning of worker count and ONNX Runtime threads, and benchmarks."""
+
+import json
+import os
+import platform
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from background_remover import direct_inference
+from background_remover.image_processor import ImageProcessor
+
+# Overrides the folder holding per-machine settings
+CONFIG_DIR_ENV = "BGREMOVER_CONFIG_DIR"
+
+PROFILE_FILENAME = "tuning.json"
+
+# Synthetic workload used while benchmarking
+DEFAULT_BENCHMARK_IMAGES = 8
+DEFAULT_BENCHMARK_SIZE = (1024, 768)
+
+# Most concurrent workers a layout may use; each holds its own session and
+# working memory, so one per core would exhaust memory on large machines
+MAX_WORKERS = ImageProcessor.DEFAULT_MAX_SESSIONS
+
+# Shown at startup when the saved profile was measured on other hardware
+RETUNE_HINT = (
+    "The CPU changed since performance was last tuned, so default settings "
+    "are used. Run 'background-remover tune' to re-tune."
+)
+
+ProcessorFactory = Callable[[int], ImageProcessor]
+
+# Builds a single-session processor for an inference backend
+BackendFactory = Callable[[str], ImageProcessor]
+
+
+@dataclass
+class TuningProfile:
+    """Fastest layout measured on one machine."""
+
+    workers: int
+    threads: int
+    images_per_second: float
+    cpu: str
+    cores: int
+    tuned_at: float
+
+    def matches(self, machine: Dict[str, object]) -> bool:
+        """Check whether this profile was measured on the given hardware."""
+        return self.cpu == machine["cpu"] and self.cores == machine["cores"]
+
+
+@dataclass
+class BackendTiming:
+    """
+    Average cost of one image with one inference backend.
+
+    Attributes:
+        backend: The backend measured.
+        seconds: Seconds per image through ``process_array``.
+        model_seconds: Seconds per image spent running the model alone.
+    """
+
+    backend: str
+    seconds: float
+    model_seconds: float
+
+    @property
+    def overhead_seconds(self) -> float:
+        """Return the seconds per image spent outside the model."""
+        return max(self.seconds - self.model_seconds, 0.0)
+
+
+def config_dir() -> Path:
+    """Return the per-user folder for settings that belong to this machine."""
+    override = os.environ.get(CONFIG_DIR_ENV)
+    if override:
+        return Path(override)
+    if sys.platform == "win32":
+        base = Path(os.environ.get("APPDATA", Path.home() / "AppData" / "Roaming"))
+        return base / "BackgroundRemover"
+    if sys.platform == "darwin":
+        return Path.home() / "Library" / "Application Support" / "BackgroundRemover"
+    base = Path(os.environ.get("XDG_CONFIG_HOME", Path.home() / ".config"))
+    return base / "background_remover"
+
+
+def machine_fingerprint() -> Dict[str, object]:
+    """Describe the CPU so a saved profile can be invalidated on new hardware."""
+    cpu = platform.processor()
+    try:
+        with open("/proc/cpuinfo", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("model name"):
+                    cpu = line.split(":", 1)[1].strip()
+                    break
+    except OSError:
+        pass
+    return {"cpu": cpu or platform.machine(), "cores": os.cpu_count() or 1}
+
+
+def candidate_layouts(
+    cores: int, max_workers: int = MAX_WORKERS
+) -> List[Tuple[int, int]]:
+    """
+    List (workers, threads) pairs worth benchmarking.
+
+    Both values are powers of two (plus the core count itself), the product
+    never exceeds the number of cores and there are at most ``max_workers``
+    workers.
+    """
+    counts = sorted({2**i for i in range(cores.bit_length())} | {cores})
+    return [
+        (workers, threads)
+        for workers in counts
+        for threads in counts
+        if workers * threads <= cores and workers <= max_workers
+    ]
+
+
+def synthetic_images(
+    count: int, size: Tuple[int, int] = DEFAULT_BENCHMARK_SIZE, seed: int = 0
+) -> List[np.ndarray]:
+    """Generate noisy RGB images with a bright subject for benchmarking."""
+    rng = np.random.default_rng(seed)
+    width, height = size
+    images = []
+    for _ in range(count):
+        image = rng.integers(0, 96, (height, width, 3), dtype=np.uint8)
+        top, left = rng.integers(0, height // 2), rng.integers(0, width // 2)
+        image[top : top + height // 2, left : left + width // 2] += 128
+        images.append(image)
+    return images
+
+
+def benchmark_layout(
+    processor: ImageProcessor, workers: int, images: List[np.ndarray]
+) -> float:
+    """Return images per second for one processor shared by ``workers`` threads."""
+    # Warm up so model load and first-run allocations aren't measured
+    processor.process_array(images[0])
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(processor.process_array, images))
+    return len(images) / (time.perf_counter() - start)
+
+
+def _time_model(processor: ImageProcessor, image: np.ndarray, runs: int) -> float:
+    """Return the seconds one model run takes on a prepared image."""
+    session = processor.session
+    if not isinstance(session, direct_inference.DirectSession):
+        raise ValueError(
+            f"Model {processor.model_name} isn't supported by the "
+            f"{direct_inference.BACKEND_ONNXRUNTIME} backend"
+        )
+    session.prepare(ImageProcessor.to_rgba_buffer(image, inplace=False))
+    session.run_model()
+    start = time.perf_counter()
+    for _ in range(runs):
+        session.run_model()
+    return (time.perf_counter() - start) / runs
+
+
+def benchmark_backends(
+    model_name: str = "u2net",
+    images: int = DEFAULT_BENCHMARK_IMAGES,
+    size: Tuple[int, int] = DEFAULT_BENCHMARK_SIZE,
+    processor_factory: Optional[BackendFactory] = None,
+) -> Dict[str, BackendTiming]:
+    """
+    Compare the per-image cost of each inference backend.
+
+    Both backends run the same model, so the model's own time, measured
+    once with the direct backend, separates inference from the pre- and
+    post-processing overhead each backend adds.
+
+    Args:
+        model_name: Model to benchmark; must be supported by the direct
+            backend.
+        images: Number of synthetic images per backend.
+        size: Width and height of the synthetic images.
+        processor_factory: Builds a processor for a backend; defaults to a
+            single-session processor for ``model_name``.
+
+    Returns:
+        Timings keyed by backend.
+
+    Raises:
+        ValueError: If the direct backend doesn't support the model.
+    """
+    if processor_factory is None:
+
+        def processor_factory(backend: str) -> ImageProcessor:
+            return ImageProcessor(model_name, max_sessions=1, backend=backend)
+
+    workload = synthetic_images(images, size)
+    processors = {
+        backend: processor_factory(backend) for backend in direct_inference.BACKENDS
+    }
+    model_seconds = _time_model(
+        processors[direct_inference.BACKEND_ONNXRUNTIME], workload[0], images
+    )
+    return {
+        backend: BackendTiming(
+            backend,
+            1 / benchmark_layout(processor, 1, workload),
+            model_seconds,
+        )
+        for backend, processor in processors.items()
+    }
+
+
+def _default_processor(threads: int) -> ImageProcessor:
+    # Room for one session per worker in every layout using this thread count
+    cores = int(machine_fingerprint()["cores"])
+    return ImageProcessor(
+        intra_op_threads=threads, max_sessions=min(cores // threads, MAX_WORKERS)
+    )
+
+
+def autotune(
+    processor_factory: Optional[ProcessorFactory] = None,
+    images: int = DEFAULT_BENCHMARK_IMAGES,
+    size: Tuple[int, int] = DEFAULT_BENCHMARK_SIZE,
+    report: Optional[Callable[[int, int, float], None]] = None,
+) -> TuningProfile:
+    """
+    Benchmark every candidate layout and save the fastest one.
+
+    Args:
+        processor_factory: Builds a processor for a thread count; defaults to
+            the standard model.
+        images: Number of synthetic images per layout.
+        size: Width and height of the synthetic images.
+        report: Optional callback receiving (workers, threads, images/s).
+
+    Returns:
+        The saved profile.
+    """
+    if processor_factory is None:
+        processor_factory = _default_processor
+
+    machine = machine_fingerprint()
+    workload = synthetic_images(images, size)
+    layouts = candidate_layouts(int(machine["cores"]))
+    best: Optional[Tuple[float, int, int]] = None
+
+    for threads in sorted({threads for _, threads in layouts}):
+        # Only one thread count's sessions are loaded at a time
+        processor = processor_factory(threads)
+        try:
+            for workers in [w for w, t in layouts if t == threads]:
+                rate = benchmark_layout(processor, workers, workload)
+                if report:
+                    report(workers, threads, rate)
+                if best is None or rate > best[0]:
+                    best = (rate, workers, threads)
+        finally:
+            processor.close()
+
+    rate, workers, threads = best
+    profile = TuningProfile(
+        workers=workers,
+        threads=threads,
+        images_per_second=rate,
+        cpu=str(machine["cpu"]),
+        cores=int(machine["cores"]),
+        tuned_at=time.time(),
+    )
+    save_profile(profile)
+    return profile
+
+
+def save_profile(profile: TuningProfile) -> Path:
+    """Write a profile to the per-machine settings folder."""
+    path = config_dir() / PROFILE_FILENAME
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(asdict(profile), indent=2), encoding="utf-8")
+    return path
+
+
+def read_profile() -> Optional[TuningProfile]:
+    """Read the saved profile regardless of which hardware produced it."""
+    try:
+        data = json.loads((config_dir() / PROFILE_FILENAME).read_text("utf-8"))
+        return TuningProfile(**data)
+    except (OSError, ValueError, TypeError):
+        return None
+
+
+def load_profile() -> Optional[TuningProfile]:
+    """Return the saved profile if it was measured on this hardware."""
+    profile = read_profile()
+    if profile is None or not profile.matches(machine_fingerprint()):
+        return None
+    return profile
+
+
+def needs_retune() -> bool:
+    """Check whether a saved profile exists but the CPU has since changed."""
+    profile = read_profile()
+    return profile is not None and not profile.matches(machine_fingerprint())
+
+
+def startup_profile(
+    warn: Optional[Callable[[str], None]] = None,
+) -> Optional[TuningProfile]:
+    """
+    Return the profile for this machine without benchmarking.
+
+    Tuning takes minutes, so it only runs through the ``tune`` command.
+    Without a profile for this hardware, defaults are used; if the saved
+    profile came from other hardware, ``warn`` receives RETUNE_HINT.
+    """
+    if warn and needs_retune():
+        warn(RETUNE_HINT)
+    return load_profile()
@@ -1,6 +1,6 @@
 """UI components for the background remover app."""
 
 from background_remover.ui.file_list_widget import FileListWidget
-from background_remover.ui.progress_dialog import ProgressDialog
+from background_remover.ui.queue_panel import QueuePanel
 
-__all__ = ["FileListWidget", "ProgressDialog"]
+__all__ = ["FileListWidget", "QueuePanel"]
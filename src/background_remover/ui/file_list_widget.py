@@ -1,9 +1,9 @@
 """Widget for displaying and managing the list of files to process."""
 
 from pathlib import Path
-from typing import List
+from typing import Dict, List, Optional, Set, Tuple
 
-from PySide6.QtCore import Signal
+from PySide6.QtCore import QObject, QRunnable, Qt, QThreadPool, Signal
 from PySide6.QtWidgets import (
     QAbstractItemView,
     QHBoxLayout,
@@ -15,16 +15,51 @@ from PySide6.QtWidgets import (
     QWidget,
 )
 
+from background_remover import preflight
+from background_remover.preflight import FileInfo
+
+
+class _ProbeSignals(QObject):
+    """Carries preflight results from the probing thread to the GUI thread."""
+
+    probed = Signal(list, list)
+
+
+class _ProbeTask(QRunnable):
+    """Runnable that probes a batch of newly added files."""
+
+    def __init__(self, files: List[Path], signals: _ProbeSignals):
+        super().__init__()
+        self._files = files
+        # Held here too, so results can be sent after the widget is gone
+        self._signals = signals
+
+    def run(self):
+        self._signals.probed.emit(*preflight.preflight(self._files))
+
 
 class FileListWidget(QWidget):
     """Widget showing queued files with management controls."""
 
     files_changed = Signal()  # Emitted when file list changes
+    current_file_changed = Signal(object)  # Selected Path, or None
+    files_rejected = Signal(list)  # (Path, reason) for files failing preflight
+    files_removed = Signal(list)  # Paths taken out of the list
+    files_added = Signal(list)  # Paths listed once their preflight passed
 
     def __init__(self, parent=None):
         """Initialize the file list widget."""
         super().__init__(parent)
         self._files: List[Path] = []
+        self._info: Dict[Path, FileInfo] = {}
+        # Files being probed, so adding them again doesn't list them twice
+        self._probing: Set[Path] = set()
+        # Probing reads every header, which is slow on network shares. The
+        # pool is a child, so destroying the widget waits for running probes
+        self._probe_pool = QThreadPool(self)
+        self._probe_pool.setMaxThreadCount(1)
+        self._probe_signals = _ProbeSignals()
+        self._probe_signals.probed.connect(self._on_probed)
         self._setup_ui()
 
     def _setup_ui(self):
@@ -68,21 +103,67 @@ class FileListWidget(QWidget):
         self._list_widget.itemSelectionChanged.connect(self._on_selection_changed)
 
     def _on_selection_changed(self):
-        """Enable/disable remove button based on selection."""
+        """Enable/disable remove button and report the selected file."""
         self._remove_btn.setEnabled(len(self._list_widget.selectedItems()) > 0)
-
-    def add_files(self, files: List[Path]):
-        """Add files to the list, avoiding duplicates."""
-        existing = set(self._files)
-        for file_path in files:
-            if file_path not in existing:
-                self._files.append(file_path)
-                item = QListWidgetItem(file_path.name)
-                item.setToolTip(str(file_path))
-                self._list_widget.addItem(item)
+        self.current_file_changed.emit(self.selected_file())
+
+    def selected_file(self) -> Optional[Path]:
+        """Get the file selected on its own, or None for zero or several."""
+        selected = self._list_widget.selectedItems()
+        if len(selected) != 1:
+            return None
+        return self._files[self._list_widget.row(selected[0])]
+
+    def selected_files(self) -> List[Path]:
+        """Get every selected file, in list order."""
+        selected = self._list_widget.selectedItems()
+        rows = sorted(self._list_widget.row(item) for item in selected)
+        return [self._files[row] for row in rows]
+
+    def add_files(self, files: List[Path]) -> None:
+        """
+        Add files to the list, avoiding duplicates.
+
+        New files are probed in parallel from their headers in the
+        background, so the window stays responsive. Valid files are then
+        listed and reported through files_added; files that aren't valid
+        images are left out and reported through files_rejected.
+        """
+        existing = set(self._files) | self._probing
+        new_files = [f for f in dict.fromkeys(files) if f not in existing]
+        if not new_files:
+            return
+        self._probing.update(new_files)
+        self._probe_pool.start(_ProbeTask(new_files, self._probe_signals))
+
+    def is_probing(self) -> bool:
+        """Check whether files are still being probed."""
+        return bool(self._probing)
+
+    def _on_probed(
+        self, accepted: List[FileInfo], rejected: List[Tuple[Path, str]]
+    ) -> None:
+        """List the files that passed preflight."""
+        self._probing.difference_update(info.path for info in accepted)
+        self._probing.difference_update(path for path, _ in rejected)
+
+        for info in accepted:
+            self._files.append(info.path)
+            self._info[info.path] = info
+            item = QListWidgetItem(info.path.name)
+            item.setData(Qt.ItemDataRole.UserRole, str(info.path))
+            details = info.describe()
+            if info.mislabelled:
+                details += f" (extension doesn't match {info.format} content)"
+            item.setToolTip(f"{info.path}\n{details}")
+            self._list_widget.addItem(item)
 
         self._update_count()
         self.files_changed.emit()
+        if accepted:
+            self.files_added.emit([info.path for info in accepted])
+        if rejected:
+            self.files_rejected.emit(rejected)
 
     def _remove_selected(self):
         """Remove selected files from the list."""
@@ -90,19 +171,26 @@ class FileListWidget(QWidget):
             [self._list_widget.row(item) for item in self._list_widget.selectedItems()],
             reverse=True,
         )
+        removed = []
         for row in selected_rows:
+            # Drop the path first; taking the item reports the new selection
+            removed.append(self._files.pop(row))
+            self._info.pop(removed[-1], None)
             self._list_widget.takeItem(row)
-            del self._files[row]
 
         self._update_count()
         self.files_changed.emit()
+        self.files_removed.emit(removed[::-1])
 
     def clear(self):
         """Remove all files from the list."""
+        removed = self._files.copy()
         self._list_widget.clear()
         self._files.clear()
+        self._info.clear()
         self._update_count()
         self.files_changed.emit()
+        self.files_removed.emit(removed)
 
     def _update_count(self):
         """Update the file count label."""
@@ -114,6 +202,14 @@ class FileListWidget(QWidget):
         """Get the list of files."""
         return self._files.copy()
 
+    def file_info(self, path: Path) -> Optional[FileInfo]:
+        """Get the header metadata probed for a listed file."""
+        return self._info.get(path)
+
+    def get_file_infos(self) -> List[FileInfo]:
+        """Get the header metadata of every listed file, in list order."""
+        return [self._info[path] for path in self._files]
+
     def file_count(self) -> int:
         """Get the number of files in the list."""
         return len(self._files)
@@ -122,7 +218,7 @@ class FileListWidget(QWidget):
         """Update the display text for a file to show its status."""
         for i in range(self._list_widget.count()):
             item = self._list_widget.item(i)
-            # Check if this is the right file (by original name in tooltip)
-            if Path(item.toolTip()).name == filename:
+            # Check if this is the right file (by the path stored on the item)
+            if Path(item.data(Qt.ItemDataRole.UserRole)).name == filename:
                 item.setText(f"{filename} - {status}")
                 break
@@ -0,0 +1,113 @@
+"""Pane showing a cutout preview of the selected file."""
+
+from PySide6.QtCore import Qt
+from PySide6.QtGui import QBrush, QColor, QImage, QPainter, QPixmap
+from PySide6.QtWidgets import QLabel, QSizePolicy, QVBoxLayout, QWidget
+
+from background_remover.preview import FAST
+
+# Size of one square of the transparency checkerboard
+CHECKER_SIZE = 8
+
+
+def _checker_brush() -> QBrush:
+    """Brush painting the usual light gray transparency checkerboard."""
+    tile = QPixmap(CHECKER_SIZE * 2, CHECKER_SIZE * 2)
+    tile.fill(QColor("#ffffff"))
+    painter = QPainter(tile)
+    painter.fillRect(0, 0, CHECKER_SIZE, CHECKER_SIZE, QColor("#d8d8d8"))
+    painter.fillRect(
+        CHECKER_SIZE, CHECKER_SIZE, CHECKER_SIZE, CHECKER_SIZE, QColor("#d8d8d8")
+    )
+    painter.end()
+    return QBrush(tile)
+
+
+class PreviewPane(QWidget):
+    """Widget displaying the cutout of one file over a checkerboard."""
+
+    def __init__(self, parent=None):
+        """Initialize the preview pane."""
+        super().__init__(parent)
+        self._image = QImage()
+        self._setup_ui()
+
+    def _setup_ui(self):
+        """Set up the widget layout."""
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        self._title_label = QLabel("Preview")
+        self._title_label.setStyleSheet("font-weight: bold;")
+        layout.addWidget(self._title_label)
+
+        self._image_label = QLabel()
+        self._image_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self._image_label.setMinimumSize(240, 240)
+        # Let the layout decide the size rather than the pixmap, which is
+        # rescaled to whatever space the label gets
+        self._image_label.setSizePolicy(
+            QSizePolicy.Policy.Ignored, QSizePolicy.Policy.Ignored
+        )
+        self._image_label.setStyleSheet(
+            "border: 1px solid #cccccc; border-radius: 5px;"
+        )
+        layout.addWidget(self._image_label, stretch=1)
+
+        self._status_label = QLabel("Select a file to preview its cutout")
+        self._status_label.setStyleSheet("color: #666666;")
+        layout.addWidget(self._status_label)
+
+    def show_loading(self, filename: str):
+        """Show that a preview for a file is being rendered."""
+        self._image = QImage()
+        self._image_label.clear()
+        self._title_label.setText(f"Preview: {filename}")
+        self._status_label.setText("Rendering preview...")
+
+    def show_image(self, image: QImage, stage: str):
+        """Display a rendered cutout."""
+        self._image = image
+        self._render()
+        if stage == FAST:
+            self._status_label.setText("Quick preview - refining...")
+        else:
+            self._status_label.setText("Full-quality preview")
+
+    def show_error(self, message: str):
+        """Show that the preview could not be rendered."""
+        self._image = QImage()
+        self._image_label.clear()
+        self._status_label.setText(f"Preview failed: {message}")
+
+    def clear(self):
+        """Return to the empty state."""
+        self._image = QImage()
+        self._image_label.clear()
+        self._title_label.setText("Preview")
+        self._status_label.setText("Select a file to preview its cutout")
+
+    def has_image(self) -> bool:
+        """Check whether a cutout is currently displayed."""
+        return not self._image.isNull()
+
+    def resizeEvent(self, event):
+        """Rescale the displayed cutout to the new size."""
+        super().resizeEvent(event)
+        self._render()
+
+    def _render(self):
+        """Draw the cutout scaled to fit over a checkerboard."""
+        if self._image.isNull():
+            return
+        scaled = self._image.scaled(
+            self._image_label.contentsRect().size(),
+            Qt.AspectRatioMode.KeepAspectRatio,
+            Qt.TransformationMode.SmoothTransformation,
+        )
+        pixmap = QPixmap(scaled.size())
+        painter = QPainter(pixmap)
+        painter.fillRect(pixmap.rect(), _checker_brush())
+        painter.drawImage(0, 0, scaled)
+        painter.end()
+        self._image_label.setPixmap(pixmap)
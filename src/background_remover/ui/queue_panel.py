@@ -0,0 +1,103 @@
+"""Panel showing the processing queue without blocking the main window."""
+
+from typing import Optional
+
+from PySide6.QtCore import Qt, Signal
+from PySide6.QtWidgets import (
+    QHBoxLayout,
+    QLabel,
+    QProgressBar,
+    QPushButton,
+    QVBoxLayout,
+    QWidget,
+)
+
+from background_remover import eta
+
+
+class QueuePanel(QWidget):
+    """Progress of the running queue with controls for the queued files."""
+
+    prioritize_requested = Signal()  # Process the selected files next
+    cancel_selected_requested = Signal()
+    cancel_all_requested = Signal()
+
+    def __init__(self, parent=None):
+        """Initialize the queue panel."""
+        super().__init__(parent)
+        self._setup_ui()
+
+    def _setup_ui(self):
+        """Set up the panel layout."""
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        # Status and progress on one line
+        status_layout = QHBoxLayout()
+        self._status_label = QLabel("Preparing...")
+        self._status_label.setStyleSheet("font-weight: bold;")
+        status_layout.addWidget(self._status_label, stretch=1)
+        self._progress_label = QLabel("0 / 0")
+        status_layout.addWidget(self._progress_label)
+        layout.addLayout(status_layout)
+
+        # Progress bar
+        self._progress_bar = QProgressBar()
+        self._progress_bar.setRange(0, 0)
+        self._progress_bar.setTextVisible(False)
+        layout.addWidget(self._progress_bar)
+
+        # Time remaining
+        self._eta_label = QLabel(eta.describe(None))
+        self._eta_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self._eta_label.setStyleSheet("color: #666666;")
+        layout.addWidget(self._eta_label)
+
+        # Queue controls
+        button_layout = QHBoxLayout()
+        self._prioritize_btn = QPushButton("Process Selected Next")
+        self._prioritize_btn.clicked.connect(self.prioritize_requested)
+        button_layout.addWidget(self._prioritize_btn)
+
+        self._cancel_selected_btn = QPushButton("Cancel Selected")
+        self._cancel_selected_btn.clicked.connect(self.cancel_selected_requested)
+        button_layout.addWidget(self._cancel_selected_btn)
+
+        button_layout.addStretch()
+        self._cancel_all_btn = QPushButton("Cancel All")
+        self._cancel_all_btn.clicked.connect(self.cancel_all_requested)
+        button_layout.addWidget(self._cancel_all_btn)
+        layout.addLayout(button_layout)
+
+        self.set_selection_count(0)
+
+    def set_selection_count(self, count: int):
+        """Enable the per-file controls when files are selected."""
+        self._prioritize_btn.setEnabled(count > 0)
+        self._cancel_selected_btn.setEnabled(count > 0)
+
+    def update_progress(self, current: int, total: int):
+        """Update the progress of the current run; total grows as files are added."""
+        self._progress_bar.setRange(0, max(total, 1))
+        self._progress_bar.setValue(current)
+        self._progress_label.setText(f"{current} / {total}")
+        self._cancel_all_btn.setEnabled(current < total)
+        if current < total:
+            self._eta_label.show()
+
+    def update_eta(self, seconds: Optional[float]):
+        """Show the estimated time remaining, or None while it's unknown."""
+        self._eta_label.setText(eta.describe(seconds))
+
+    def set_current_file(self, filename: str):
+        """Set the currently processing file."""
+        self._status_label.setText(f"Processing: {filename}")
+
+    def processing_complete(self, successful: int, failed: int):
+        """Show that the queue drained and is waiting for more files."""
+        summary = f"Idle: {successful} processed"
+        if failed > 0:
+            summary += f", {failed} failed"
+        self._status_label.setText(f"{summary}. Add files to process them.")
+        self._eta_label.hide()
+        self._cancel_all_btn.setEnabled(False)
@@ -1,22 +1,44 @@
-"""Worker thread for async image processing."""
+"""Worker thread processing a queue of images in the background."""
 
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from threading import Lock
-from typing import List, Optional
+from threading import Condition
+from typing import Dict, List, Optional, Set, Tuple
 
 from PySide6.QtCore import QThread, Signal
 
+from background_remover import metrics, profiling
+from background_remover.dedup import group_duplicates, link_or_copy
+from background_remover.eta import CostModel, EtaEstimator
+from background_remover.export import ExportVariant
 from background_remover.image_processor import ImageProcessor
+from background_remover.isolation import (
+    FileLimits,
+    IsolatedRunner,
+    ProcessingCancelledError,
+    ProcessorSpec,
+)
+from background_remover.preflight import FileInfo, preflight
+from background_remover.trim import sidecar_path
 
 
 class ProcessingWorker(QThread):
-    """QThread for non-blocking batch image processing."""
+    """
+    QThread for non-blocking image processing from a queue that can grow.
+
+    Files are processed in queue order. More can be added, cancelled or
+    moved to the front while the worker runs. By default the worker exits
+    once its queue drains; a persistent worker instead waits for more files,
+    so a single warm model serves every file added during a session.
+    """
 
     # Signals
     progress_updated = Signal(int, int)  # current, total
     file_started = Signal(str)  # filename
     file_completed = Signal(str, bool, str)  # filename, success, message
-    all_completed = Signal(int, int)  # successful, failed
+    file_cancelled = Signal(str)  # filename
+    all_completed = Signal(int, int)  # successful, failed; once per drained queue
+    eta_updated = Signal(object)  # seconds remaining, or None while unknown
 
     def __init__(
         self,
@@ -24,57 +46,512 @@ class ProcessingWorker(QThread):
         output_folder: Path,
         processor: Optional[ImageProcessor] = None,
         parent=None,
+        variants: Optional[List[ExportVariant]] = None,
+        metrics_file: Optional[Path] = None,
+        workers: int = 1,
+        file_info: Optional[Dict[Path, FileInfo]] = None,
+        limits: Optional[FileLimits] = None,
+        persistent: bool = False,
+        persist_costs: bool = True,
     ):
         """
         Initialize the worker.
 
         Args:
-            files: List of input file paths to process.
+            files: Input file paths to queue initially.
             output_folder: Folder where outputs will be saved.
             processor: Optional pre-loaded ImageProcessor instance.
             parent: Parent QObject.
+            variants: Optional export spec; when given, every variant is
+                rendered per file instead of a single transparent PNG.
+            metrics_file: Optional file the metrics are written to whenever
+                the queue drains; defaults to BGREMOVER_METRICS_FILE if set.
+            workers: Number of files processed concurrently. ONNX Runtime
+                releases the GIL during inference, so threads overlap.
+            file_info: Optional header metadata of the files, as probed
+                when they were queued; missing files are probed here. Used
+                to estimate the time remaining.
+            limits: Optional per-file time and memory limits. When set,
+                files are processed in child processes that are killed if
+                a file exceeds them or is cancelled mid-way.
+            persistent: Keep waiting for files once the queue drains,
+                until stop() is called.
+            persist_costs: Save the per-stage costs learned from this
+                worker's files for future estimates; turn off for runs that
+                don't use the real model, such as soak tests.
         """
         super().__init__(parent)
-        self._files = files
         self._output_folder = output_folder
-        self._cancelled = False
-        self._cancel_lock = Lock()
         self._processor = processor if processor else ImageProcessor()
+        self._variants = variants
+        self._metrics_file = metrics_file or metrics.file_from_environment()
+        self._workers = max(1, workers)
+        self._persistent = persistent
+        self._persist_costs = persist_costs
+        self._profiler: Optional[profiling.BatchProfiler] = None
+        self._file_info = dict(file_info or {})
+        self._costs: Optional[CostModel] = None
+        self._eta: Optional[EtaEstimator] = None
+        self._limits = limits
+        self._runner: Optional[IsolatedRunner] = None
+
+        # Guards the queue and the counters below
+        self._condition = Condition()
+        # Files added but not yet fingerprinted into duplicate groups
+        self._incoming: List[Path] = list(dict.fromkeys(files))
+        # Duplicate groups waiting for a thread, in processing order
+        self._pending: List[List[Path]] = []
+        # Every file not yet finished, and those of them to drop on sight
+        self._queued: Set[Path] = set(self._incoming)
+        self._cancelled: Set[Path] = set()
+        # Files whose latest run succeeded
+        self._succeeded: Set[Path] = set()
+        # Incoming files to put first once they are grouped
+        self._priority: Set[Path] = set()
+        self._ingesting = False
+        self._active = 0
+        self._stopped = False
+        # Whether anything was queued since the queue last drained
+        self._run_open = bool(self._incoming) or not persistent
+        self._total = len(self._incoming)
+        self._successful = 0
+        self._failed = 0
+        self._done = 0
+
+    def add_files(
+        self, files: List[Path], file_info: Optional[Dict[Path, FileInfo]] = None
+    ) -> List[Path]:
+        """
+        Append files to the queue, even while it is being processed.
+
+        Args:
+            files: Input file paths; files already queued are ignored.
+            file_info: Optional header metadata of the files.
+
+        Returns:
+            The files that were queued.
+        """
+        if file_info:
+            self._file_info.update(file_info)
+        with self._condition:
+            added = [f for f in dict.fromkeys(files) if f not in self._queued]
+            if not added:
+                return []
+            self._incoming.extend(added)
+            self._queued.update(added)
+            self._total += len(added)
+            self._run_open = True
+            done, total = self._done, self._total
+            self._condition.notify_all()
+        metrics.QUEUE_DEPTH.set(total - done)
+        self.progress_updated.emit(done, total)
+        return added
+
+    def cancel_files(self, files: List[Path]) -> None:
+        """
+        Remove files from the queue.
+
+        Waiting files are dropped at once. A file already being processed
+        is stopped mid-way when per-file limits are set, and otherwise
+        finishes normally.
+        """
+        with self._condition:
+            targets = set(files) & self._queued
+            if not targets:
+                return
+            dropped = [f for f in self._incoming if f in targets]
+            self._incoming = [f for f in self._incoming if f not in targets]
+            pending = []
+            for group in self._pending:
+                dropped.extend(f for f in group if f in targets)
+                group = [f for f in group if f not in targets]
+                if group:
+                    pending.append(group)
+            self._pending = pending
+            # The rest are being grouped or processed; they're dropped there
+            self._cancelled |= targets.difference(dropped)
+            self._condition.notify_all()
+        for path in dropped:
+            self._cancel(path)
 
     def cancel(self):
-        """Request cancellation of the processing."""
-        with self._cancel_lock:
-            self._cancelled = True
+        """Cancel every queued file, including those being processed."""
+        with self._condition:
+            queued = list(self._queued)
+        self.cancel_files(queued)
+
+    def stop(self):
+        """Cancel everything queued and let the thread exit."""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        self.cancel()
+
+    def prioritize(self, files: List[Path]) -> None:
+        """Move queued files ahead of every other waiting file."""
+        targets = set(files)
+        with self._condition:
+            first = [group for group in self._pending if targets.intersection(group)]
+            rest = [group for group in self._pending if not targets.intersection(group)]
+            self._pending = first + rest
+            self._incoming.sort(key=lambda path: path not in targets)
+            self._priority |= targets.intersection(self._incoming)
+
+    def is_done(self, path: Path) -> bool:
+        """Check whether a file has been processed successfully."""
+        with self._condition:
+            return path in self._succeeded
+
+    def queued_count(self) -> int:
+        """Get the number of files waiting or being processed."""
+        with self._condition:
+            return len(self._queued)
 
-    def is_cancelled(self) -> bool:
-        """Check if cancellation was requested."""
-        with self._cancel_lock:
-            return self._cancelled
+    def set_output_folder(self, output_folder: Path) -> None:
+        """Save files started from now on into another folder."""
+        self._output_folder = output_folder
+
+    def is_cancelled(self, path: Path) -> bool:
+        """Check if a file was cancelled while being processed."""
+        with self._condition:
+            return path in self._cancelled
 
     def run(self):
-        """Process all files in the queue."""
-        total = len(self._files)
-        successful = 0
-        failed = 0
+        """Process queued files, running inference once per unique image."""
+        # Profiling is opt-in through BGREMOVER_PROFILE so packaged builds
+        # can capture it without a rebuild
+        self._profiler = profiling.from_environment()
+        # Isolated children write profiles of their own when a run drains
+        if self._limits and self._limits.enabled:
+            self._runner = IsolatedRunner(
+                ProcessorSpec.from_processor(self._processor), self._limits
+            )
+        if self._profiler:
+            self._profiler.start()
+        try:
+            self._run()
+        finally:
+            if self._profiler:
+                self._profiler.stop()
+            if self._runner:
+                self._runner.close()
+                self._runner = None
+
+    def _run(self):
+        """Process the queue; see run()."""
+        self._costs = CostModel.load()
+        with self._condition:
+            metrics.QUEUE_DEPTH.set(self._total)
+
+        if self._workers > 1 and self._runner is None:
+            # Load the model before threads race to create it
+            _ = self._processor.session
+
+        if self._workers > 1:
+            with ThreadPoolExecutor(max_workers=self._workers) as executor:
+                list(executor.map(lambda _: self._drain(), range(self._workers)))
+        else:
+            self._drain()
 
-        for i, input_path in enumerate(self._files):
-            if self.is_cancelled():
-                break
+        # Reports a batch, or a persistent queue stopped with files queued
+        totals = self._close_run()
+        if totals:
+            self._finish_run(*totals)
 
-            filename = input_path.name
-            self.file_started.emit(filename)
+    def _drain(self) -> None:
+        """Process groups from the queue until it is done or stopped."""
+        while True:
+            group = self._next_group()
+            if group is None:
+                return
+            try:
+                if self._profiler:
+                    with self._profiler.thread():
+                        self._process_group(group)
+                else:
+                    self._process_group(group)
+            finally:
+                with self._condition:
+                    self._active -= 1
+                    self._condition.notify_all()
+
+    def _next_group(self) -> Optional[List[Path]]:
+        """Wait for the next group to process, or None once the worker is done."""
+        while True:
+            totals = None
+            with self._condition:
+                while True:
+                    if self._stopped:
+                        return None
+                    if self._incoming and not self._ingesting:
+                        # Group new files first so priorities apply to them
+                        incoming, self._incoming = self._incoming, []
+                        self._ingesting = True
+                        break
+                    if self._pending:
+                        self._active += 1
+                        return self._pending.pop(0)
+                    if not self._persistent:
+                        if self._ingesting:
+                            self._condition.wait()
+                            continue
+                        # Threads still busy pick up anything they requeue;
+                        # run() reports the drained queue
+                        return None
+                    if not self._ingesting and not self._active and self._run_open:
+                        totals = self._close_run()
+                        break
+                    self._condition.wait()
+            if totals:
+                self._finish_run(*totals)
+                continue
+            self._ingest(incoming)
+
+    def _ingest(self, files: List[Path]) -> None:
+        """Group new files into duplicates and add them to the queue."""
+        try:
+            with metrics.STAGE_SECONDS.time(stage="fingerprint"):
+                groups = group_duplicates(files)
+        except OSError:
+            # Unreadable files then fail one by one with their own errors
+            groups = [[path] for path in files]
+        self._track_eta([group[0] for group in groups])
+        cancelled = []
+        with self._condition:
+            first, rest = [], []
+            for group in groups:
+                cancelled.extend(f for f in group if f in self._cancelled)
+                group = [f for f in group if f not in self._cancelled]
+                if group:
+                    priority = self._priority.intersection(group)
+                    (first if priority else rest).append(group)
+            self._priority.difference_update(files)
+            self._pending = first + self._pending + rest
+            self._ingesting = False
+            self._condition.notify_all()
+        for path in cancelled:
+            self._cancel(path)
+
+    def _close_run(self) -> Optional[Tuple[int, int]]:
+        """End the current run, returning its totals if one was open."""
+        with self._condition:
+            if not self._run_open:
+                return None
+            totals = (self._successful, self._failed)
+            self._run_open = False
+            self._total = len(self._queued)
+            self._successful = self._failed = self._done = 0
+            # Idle time until the next file would skew the live estimate
+            self._eta = None
+            return totals
+
+    def _finish_run(self, successful: int, failed: int) -> None:
+        """Report a drained queue and keep what it taught the estimator."""
+        metrics.QUEUE_DEPTH.set(0)
+        metrics.ETA_SECONDS.set(0)
+        self._save_costs()
+        if self._metrics_file:
+            metrics.REGISTRY.write(self._metrics_file)
+        if self._profiler:
+            self._profiler.dump()
+            if self._runner:
+                self._runner.dump_profiles()
+        self.all_completed.emit(successful, failed)
 
+    def _process_group(self, group: List[Path]) -> None:
+        """Process the first file of a duplicate group and fan out to the rest."""
+        primary, duplicates = group[0], group[1:]
+        primary_outputs: Optional[Dict[str, Path]] = None
+        error = ""
+
+        self.file_started.emit(primary.name)
+        # A file that loads the model would skew the learned costs
+        cold = self._runner is None and self._processor.session_pool_size() == 0
+        try:
+            with metrics.STAGE_SECONDS.capture() as stages:
+                primary_outputs = self._process_file(primary)
+            if cold:
+                self._eta.skip(primary)
+            else:
+                self._eta.file_done(primary, {k[0]: v for k, v in stages.items()})
+            self._report_eta()
+            self.file_completed.emit(
+                primary.name, True, self._describe(primary_outputs)
+            )
+            metrics.FILES_PROCESSED.inc()
+            self._record(primary, True)
+        except ProcessingCancelledError:
+            self._cancel(primary)
+            self._report_eta()
+            self._requeue(duplicates)
+            return
+        except Exception as e:
+            error = str(e)
+            self._eta.skip(primary)
+            self._report_eta()
+            self.file_completed.emit(primary.name, False, error)
+            metrics.FILES_FAILED.inc()
+            self._record(primary, False)
+
+        # Fan the result out to every other copy of the same image
+        for duplicate in duplicates:
+            if self.is_cancelled(duplicate):
+                self._cancel(duplicate)
+                continue
+            self.file_started.emit(duplicate.name)
             try:
-                output_path = self._processor.generate_output_path(
-                    input_path, self._output_folder
+                if primary_outputs is None:
+                    raise RuntimeError(error)
+                outputs = self._fan_out(duplicate, primary_outputs)
+                self.file_completed.emit(
+                    duplicate.name, True, self._describe(outputs)
                 )
-                self._processor.process_image(input_path, output_path)
-                self.file_completed.emit(filename, True, str(output_path))
-                successful += 1
+                metrics.FILES_CACHED.inc()
+                self._record(duplicate, True)
             except Exception as e:
-                self.file_completed.emit(filename, False, str(e))
-                failed += 1
+                self.file_completed.emit(duplicate.name, False, str(e))
+                metrics.FILES_FAILED.inc()
+                self._record(duplicate, False)
 
-            self.progress_updated.emit(i + 1, total)
+    def _requeue(self, duplicates: List[Path]) -> None:
+        """Queue the copies of a cancelled file to be processed in its place."""
+        with self._condition:
+            cancelled = [f for f in duplicates if f in self._cancelled]
+            remaining = [f for f in duplicates if f not in self._cancelled]
+            if remaining:
+                self._pending.insert(0, remaining)
+                self._condition.notify_all()
+        for path in cancelled:
+            self._cancel(path)
 
-        self.all_completed.emit(successful, failed)
+    def _track_eta(self, primaries: List[Path]) -> None:
+        """Add the sizes of files needing inference to the estimate."""
+        unknown = [path for path in primaries if path not in self._file_info]
+        if unknown:
+            accepted, _ = preflight(unknown)
+            self._file_info.update((info.path, info) for info in accepted)
+        sizes = {}
+        for path in primaries:
+            info = self._file_info.get(path)
+            sizes[path] = info.megapixels if info else 0.0
+        if self._eta is None:
+            self._eta = EtaEstimator(
+                f"{self._processor.model_name}-{self._processor.precision}",
+                sizes,
+                self._costs,
+                parallelism=self._workers,
+            )
+        else:
+            self._eta.add(sizes)
+        self._report_eta()
+
+    def _report_eta(self) -> None:
+        """Publish the time remaining and recent throughput."""
+        estimator = self._eta
+        if estimator is None:
+            return
+        seconds = estimator.remaining_seconds()
+        if seconds is not None:
+            metrics.ETA_SECONDS.set(seconds)
+        metrics.THROUGHPUT_MEGAPIXELS.set(estimator.throughput())
+        self.eta_updated.emit(seconds)
+
+    def _save_costs(self) -> None:
+        """Keep what this batch learned for the next estimate."""
+        if not self._persist_costs:
+            return
+        try:
+            self._costs.save()
+        except OSError:
+            pass
+
+    def _record(self, path: Path, success: bool) -> None:
+        """Count a finished file and report progress."""
+        with self._condition:
+            self._queued.discard(path)
+            self._cancelled.discard(path)
+            if success:
+                self._successful += 1
+                self._succeeded.add(path)
+            else:
+                self._failed += 1
+                self._succeeded.discard(path)
+            self._done += 1
+            done, total = self._done, self._total
+        metrics.QUEUE_DEPTH.set(total - done)
+        self.progress_updated.emit(done, total)
+
+    def _cancel(self, path: Path) -> None:
+        """Drop a cancelled file from the queue and its totals."""
+        with self._condition:
+            if path not in self._queued:
+                return
+            self._queued.discard(path)
+            self._cancelled.discard(path)
+            self._total -= 1
+            done, total = self._done, self._total
+            estimator = self._eta
+        if estimator:
+            estimator.skip(path)
+        metrics.QUEUE_DEPTH.set(total - done)
+        self.file_cancelled.emit(path.name)
+        self.progress_updated.emit(done, total)
+
+    def _process_file(self, input_path: Path) -> Dict[str, Path]:
+        """Process one file and return its outputs keyed by variant name."""
+        output_folder = self._output_folder
+        if self._variants:
+            if self._runner:
+                output_paths = self._processor.variant_output_paths(
+                    input_path, output_folder, self._variants
+                )
+                try:
+                    return self._runner.export_variants(
+                        input_path,
+                        output_folder,
+                        self._variants,
+                        output_paths,
+                        lambda: self.is_cancelled(input_path),
+                    )
+                finally:
+                    for output_path in output_paths.values():
+                        self._processor.release_output_path(output_path)
+            return self._processor.export_variants(
+                input_path, output_folder, self._variants
+            )
+
+        output_path = self._processor.generate_output_path(input_path, output_folder)
+        if self._runner:
+            try:
+                self._runner.process_image(
+                    input_path, output_path, lambda: self.is_cancelled(input_path)
+                )
+            finally:
+                self._processor.release_output_path(output_path)
+        else:
+            self._processor.process_image(input_path, output_path)
+        return {"": output_path}
+
+    def _fan_out(
+        self, duplicate: Path, outputs: Dict[str, Path]
+    ) -> Dict[str, Path]:
+        """Place copies of another file's outputs under a duplicate's names."""
+        placed = {}
+        for variant, source in outputs.items():
+            destination = self._processor.generate_output_path(
+                duplicate, self._output_folder, variant, source.suffix
+            )
+            try:
+                link_or_copy(source, destination)
+                # Trimmed non-PNG outputs record their crop alongside
+                if sidecar_path(source).exists():
+                    link_or_copy(sidecar_path(source), sidecar_path(destination))
+            finally:
+                self._processor.release_output_path(destination)
+            placed[variant] = destination
+        return placed
+
+    @staticmethod
+    def _describe(outputs: Dict[str, Path]) -> str:
+        """Format output paths for the completion message."""
+        return ", ".join(str(path) for path in outputs.values())
@@ -1,8 +1,13 @@
 """Pytest configuration and fixtures."""
 
+import numpy as np
 import pytest
 from pathlib import Path
 
+from background_remover import quantization
+from background_remover.image_processor import ImageProcessor
+from tests.helpers import StandInSession
+
 
 @pytest.fixture
 def test_data_dir() -> Path:
@@ -16,3 +21,64 @@ def temp_output_dir(tmp_path) -> Path:
     output_dir = tmp_path / "output"
     output_dir.mkdir()
     return output_dir
+
+
+@pytest.fixture
+def stand_in_session() -> StandInSession:
+    """Return a session that works without downloading a model."""
+    return StandInSession()
+
+
+@pytest.fixture
+def offline_processor(stand_in_session) -> ImageProcessor:
+    """Return an ImageProcessor wired to the stand-in session."""
+    return ImageProcessor(session_factory=lambda: stand_in_session)
+
+
+@pytest.fixture(autouse=True)
+def isolated_config_dir(tmp_path, monkeypatch) -> Path:
+    """Keep per-machine settings out of the home folder."""
+    folder = tmp_path / "config"
+    monkeypatch.setenv("BGREMOVER_CONFIG_DIR", str(folder))
+    return folder
+
+
+@pytest.fixture
+def model_home(tmp_path, monkeypatch):
+    """Keep quantized models inside the test's temp folder."""
+    folder = tmp_path / "models"
+    folder.mkdir()
+    monkeypatch.setenv("U2NET_HOME", str(folder))
+    return folder
+
+
+@pytest.fixture
+def tiny_model(tmp_path, monkeypatch, model_home):
+    """Replace the cached FP32 model with a small two-layer network."""
+    onnx = pytest.importorskip("onnx")
+    from onnx import TensorProto, helper, numpy_helper
+
+    rng = np.random.default_rng(0)
+    weights = [
+        numpy_helper.from_array(rng.normal(0, 0.3, (8, 3, 3, 3)).astype("f4"), "w1"),
+        numpy_helper.from_array(rng.normal(0, 0.3, (1, 8, 3, 3)).astype("f4"), "w2"),
+    ]
+    graph = helper.make_graph(
+        [
+            helper.make_node("Conv", ["input", "w1"], ["h"], pads=[1, 1, 1, 1]),
+            helper.make_node("Relu", ["h"], ["r"]),
+            helper.make_node("Conv", ["r", "w2"], ["o"], pads=[1, 1, 1, 1]),
+            helper.make_node("Sigmoid", ["o"], ["mask"]),
+        ],
+        "tiny",
+        [helper.make_tensor_value_info("input", TensorProto.FLOAT, [1, 3, 320, 320])],
+        [helper.make_tensor_value_info("mask", TensorProto.FLOAT, [1, 1, 320, 320])],
+        weights,
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)])
+    model.ir_version = 8
+
+    path = tmp_path / "tiny.onnx"
+    onnx.save(model, str(path))
+    monkeypatch.setattr(quantization, "fp32_model_path", lambda name: path)
+    return path
@@ -0,0 +1,29 @@
+"""Stand-ins and factories shared by the test modules."""
+
+from background_remover import quantization
+from background_remover.image_processor import ImageProcessor
+
+
+class StandInSession:
+    """Offline replacement for a rembg session that masks bright pixels."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def predict(self, img, *args, **kwargs):
+        self.calls += 1
+        mask = img.convert("L").point(lambda v: 255 if v > 127 else 0)
+        return [mask]
+
+
+def fp32_processor(model_path, **options) -> ImageProcessor:
+    """Processor loading an FP32 model file directly, bypassing rembg."""
+    session_class = quantization.session_class_for_file(
+        quantization.session_class_for("u2net"), model_path
+    )
+    return ImageProcessor(
+        session_factory=lambda: session_class(
+            "u2net", quantization.ort.SessionOptions()
+        ),
+        **options,
+    )
@@ -0,0 +1,56 @@
+"""Tests for the frame-by-frame animated PNG writer."""
+
+import io
+
+import pytest
+from PIL import Image, ImageSequence
+
+from background_remover.apng import APNGWriter
+
+
+def _frame(color, size=(8, 6)) -> Image.Image:
+    return Image.new("RGBA", size, color=color)
+
+
+class TestAPNGWriter:
+    """Tests for APNGWriter."""
+
+    def test_round_trip(self):
+        """Test that Pillow reads back every frame with its pixels and delay."""
+        output = io.BytesIO()
+        colors = [(255, 0, 0, 255), (0, 255, 0, 128), (0, 0, 255, 0)]
+
+        with APNGWriter(output, len(colors), loop=2) as writer:
+            for index, color in enumerate(colors):
+                writer.add(_frame(color), duration=10 * (index + 1))
+
+        output.seek(0)
+        with Image.open(output) as result:
+            assert result.n_frames == 3
+            assert result.info["loop"] == 2
+            frames = [
+                (frame.convert("RGBA").getpixel((0, 0)), frame.info["duration"])
+                for frame in ImageSequence.Iterator(result)
+            ]
+        assert frames == [(c, 10.0 * (i + 1)) for i, c in enumerate(colors)]
+
+    def test_failure_removes_partial_file(self, tmp_path):
+        """Test that a file abandoned halfway through is deleted."""
+        path = tmp_path / "spin.png"
+
+        with pytest.raises(ValueError):
+            with APNGWriter(str(path), 2) as writer:
+                writer.add(_frame("white"), duration=50)
+                writer.add(_frame("white", size=(4, 4)), duration=50)
+
+        assert not path.exists()
+
+    def test_missing_frames_rejected(self, tmp_path):
+        """Test that fewer frames than announced is an error."""
+        path = tmp_path / "spin.png"
+
+        with pytest.raises(ValueError):
+            with APNGWriter(str(path), 3) as writer:
+                writer.add(_frame("white"), duration=50)
+
+        assert not path.exists()
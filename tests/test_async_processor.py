@@ -0,0 +1,180 @@
+"""Tests for the asyncio processing facade."""
+
+import asyncio
+import io
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from PIL import Image
+
+from background_remover.async_processor import AsyncImageProcessor
+from background_remover.image_processor import ImageProcessor
+from tests.helpers import StandInSession
+
+
+class SlowSession(StandInSession):
+    """Stand-in session that takes a while and records its threads."""
+
+    threads = set()
+
+    def predict(self, img, *args, **kwargs):
+        SlowSession.threads.add(threading.current_thread().name)
+        time.sleep(0.2)
+        return super().predict(img)
+
+
+def _png(color="white", size=(24, 16)) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", size, color=color).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def _facade(session_factory=StandInSession, **kwargs) -> AsyncImageProcessor:
+    return AsyncImageProcessor(
+        ImageProcessor(max_sessions=1, session_factory=session_factory), **kwargs
+    )
+
+
+class TestAsyncImageProcessor:
+    """Tests for AsyncImageProcessor."""
+
+    def test_process_bytes(self):
+        """Test that awaiting process returns a transparent PNG."""
+
+        async def main():
+            async with _facade() as facade:
+                return await facade.process(_png())
+
+        result = Image.open(io.BytesIO(asyncio.run(main())))
+
+        assert result.mode == "RGBA"
+        assert result.size == (24, 16)
+
+    def test_event_loop_stays_responsive(self):
+        """Test that inference runs off the loop thread."""
+        SlowSession.threads.clear()
+
+        async def main():
+            async with _facade(SlowSession) as facade:
+                ticks = 0
+
+                async def ticker():
+                    nonlocal ticks
+                    while True:
+                        await asyncio.sleep(0.01)
+                        ticks += 1
+
+                task = asyncio.ensure_future(ticker())
+                await facade.process(_png())
+                task.cancel()
+                return ticks
+
+        assert asyncio.run(main()) >= 5
+        threads = SlowSession.threads
+        assert all(name.startswith("bgremover-inference") for name in threads)
+
+    def test_one_model_shared(self):
+        """Test that concurrent requests share a single session."""
+
+        async def main():
+            async with _facade() as facade:
+                await asyncio.gather(*(facade.process(_png()) for _ in range(6)))
+                return facade.processor.session_pool_size()
+
+        assert asyncio.run(main()) == 1
+
+    def test_timeout(self):
+        """Test that a slow image raises TimeoutError."""
+
+        async def main():
+            async with _facade(SlowSession, timeout=0.05) as facade:
+                await facade.process(_png())
+
+        with pytest.raises(asyncio.TimeoutError):
+            asyncio.run(main())
+
+    def test_timeout_keeps_output_reserved(self, tmp_path, temp_output_dir):
+        """Test that a timed-out file keeps its path until the stage finishes."""
+        path = tmp_path / "photo.png"
+        path.write_bytes(_png())
+
+        async def main():
+            async with _facade(SlowSession, timeout=0.05) as facade:
+                processor = facade.processor
+                output_path = processor.generate_output_path(path, temp_output_dir)
+                with pytest.raises(asyncio.TimeoutError):
+                    await facade.process_file(path, output_path)
+                during = processor.generate_output_path(path, temp_output_dir)
+                processor.release_output_path(during)
+                await asyncio.sleep(0.4)
+                after = processor.generate_output_path(path, temp_output_dir)
+                return output_path, during, after
+
+        output_path, during, after = asyncio.run(main())
+
+        assert during != output_path
+        assert after == output_path
+
+    def test_cancellation(self):
+        """Test that cancelling a request doesn't wait for inference."""
+
+        async def main():
+            async with _facade(SlowSession) as facade:
+                task = asyncio.ensure_future(facade.process(_png()))
+                await asyncio.sleep(0.05)
+                task.cancel()
+                start = time.monotonic()
+                with pytest.raises(asyncio.CancelledError):
+                    await task
+                return time.monotonic() - start
+
+        assert asyncio.run(main()) < 0.1
+
+    def test_process_many(self, tmp_path, temp_output_dir):
+        """Test the batch iterator over files and bytes, including failures."""
+        path = tmp_path / "photo.png"
+        path.write_bytes(_png("black"))
+        sources = [_png(), b"not an image", path]
+
+        async def main():
+            async with _facade() as facade:
+                return [
+                    result
+                    async for result in facade.process_many(
+                        sources, output_folder=temp_output_dir
+                    )
+                ]
+
+        results = sorted(asyncio.run(main()), key=lambda r: r.index)
+
+        assert [r.ok for r in results] == [True, False, True]
+        assert Image.open(io.BytesIO(results[0].output)).mode == "RGBA"
+        assert results[2].output == temp_output_dir / "photo.png"
+        assert results[2].output.exists()
+
+    def test_concurrency_is_bounded(self):
+        """Test that no more images than allowed are in progress at once."""
+        active = peak = 0
+
+        class CountingSession(StandInSession):
+            def predict(self, img, *args, **kwargs):
+                nonlocal active, peak
+                active += 1
+                peak = max(peak, active)
+                time.sleep(0.02)
+                active -= 1
+                return super().predict(img)
+
+        async def main():
+            processor = ImageProcessor(max_sessions=4, session_factory=CountingSession)
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                async with AsyncImageProcessor(
+                    processor, max_concurrency=2, inference_executor=executor
+                ) as facade:
+                    async for result in facade.process_many([_png()] * 8):
+                        assert result.ok
+
+        asyncio.run(main())
+        assert peak == 2
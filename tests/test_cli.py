@@ -0,0 +1,122 @@
+"""Tests for the headless command-line interface."""
+
+import base64
+import io
+import json
+import struct
+from pathlib import Path
+
+from PIL import Image
+
+from background_remover.cli import (
+    _variants_from_args,
+    build_parser,
+    stream_length_prefixed,
+    stream_ndjson,
+)
+from background_remover.export import DEFAULT_EXPORT_SPEC
+
+
+def _encode_png(color) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (16, 16), color=color).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+class TestStreaming:
+    """Tests for the stdin/stdout streaming modes."""
+
+    def test_length_prefixed(self, offline_processor):
+        """Test that each framed image yields one framed PNG result."""
+        source = io.BytesIO()
+        for payload in (_encode_png("white"), b"not an image", _encode_png("black")):
+            source.write(struct.pack(">I", len(payload)) + payload)
+        source.seek(0)
+        destination = io.BytesIO()
+
+        failed = stream_length_prefixed(offline_processor, source, destination)
+
+        destination.seek(0)
+        sizes = []
+        while True:
+            header = destination.read(4)
+            if not header:
+                break
+            (size,) = struct.unpack(">I", header)
+            payload = destination.read(size)
+            if size:
+                assert Image.open(io.BytesIO(payload)).mode == "RGBA"
+            sizes.append(size)
+
+        assert failed == 1
+        assert len(sizes) == 3
+        assert sizes[1] == 0
+
+    def test_truncated_frame(self, offline_processor, capsys):
+        """Test that a cut-off frame fails cleanly after the complete ones."""
+        payload = _encode_png("white")
+        source = io.BytesIO(
+            struct.pack(">I", len(payload))
+            + payload
+            + struct.pack(">I", 1000)
+            + b"only part of the image"
+        )
+        destination = io.BytesIO()
+
+        failed = stream_length_prefixed(offline_processor, source, destination)
+
+        output = destination.getvalue()
+        (size,) = struct.unpack(">I", output[:4])
+        assert failed == 1
+        assert output[4 + size :] == struct.pack(">I", 0)
+        assert "Image 1 failed" in capsys.readouterr().err
+
+    def test_ndjson(self, offline_processor):
+        """Test that NDJSON results echo ids and report errors inline."""
+        lines = [
+            {"id": "a", "data": base64.b64encode(_encode_png("white")).decode()},
+            {"id": "b", "data": base64.b64encode(b"garbage").decode()},
+        ]
+        source = io.BytesIO(
+            b"".join(json.dumps(line).encode() + b"\n" for line in lines)
+        )
+        destination = io.BytesIO()
+
+        failed = stream_ndjson(offline_processor, source, destination)
+
+        responses = [json.loads(line) for line in destination.getvalue().splitlines()]
+        assert failed == 1
+        assert [r["id"] for r in responses] == ["a", "b"]
+        assert "data" in responses[0]
+        assert "error" in responses[1]
+
+
+class TestBatchOptions:
+    """Tests for parsing the batch command's options."""
+
+    def test_variants_flag_before_inputs(self):
+        """Test that --variants doesn't take the following input as a spec."""
+        args = build_parser().parse_args(
+            ["batch", "--variants", "a.png", "b.png", "-o", "out"]
+        )
+
+        assert args.inputs == [Path("a.png"), Path("b.png")]
+        assert _variants_from_args(args) == DEFAULT_EXPORT_SPEC
+
+    def test_variants_spec(self, tmp_path):
+        """Test that a spec file replaces the default variants."""
+        spec = tmp_path / "spec.json"
+        spec.write_text(json.dumps([{"name": "thumb", "max_size": 64}]))
+
+        args = build_parser().parse_args(
+            ["batch", "--variants-spec", str(spec), "a.png", "-o", "out"]
+        )
+
+        assert args.inputs == [Path("a.png")]
+        assert [v.name for v in _variants_from_args(args)] == ["thumb"]
+
+    def test_no_variants_by_default(self):
+        """Test that plain batches render only the usual output."""
+        args = build_parser().parse_args(["batch", "a.png", "-o", "out"])
+
+        assert _variants_from_args(args) is None
@@ -0,0 +1,128 @@
+"""Tests for duplicate input detection."""
+
+from pathlib import Path
+
+from PIL import Image
+
+from background_remover.dedup import (
+    PARTIAL_HASH_BYTES,
+    group_duplicates,
+    link_or_copy,
+)
+from background_remover.export import ExportVariant
+from background_remover.trim import read_placement
+from background_remover.worker import ProcessingWorker
+
+
+class TestGroupDuplicates:
+    """Tests for group_duplicates."""
+
+    def test_identical_files_are_grouped(self, tmp_path):
+        """Test that files with the same bytes end up in one group."""
+        a = tmp_path / "a.png"
+        b = tmp_path / "b.png"
+        c = tmp_path / "c.png"
+        a.write_bytes(b"same contents")
+        b.write_bytes(b"other bytes!!")
+        c.write_bytes(b"same contents")
+
+        assert group_duplicates([a, b, c]) == [[a, c], [b]]
+
+    def test_partial_collision_uses_full_hash(self, tmp_path):
+        """Test that files differing only in the middle are kept apart."""
+        head = b"h" * PARTIAL_HASH_BYTES
+        tail = b"t" * PARTIAL_HASH_BYTES
+        a = tmp_path / "a.png"
+        b = tmp_path / "b.png"
+        a.write_bytes(head + b"1" * 1000 + tail)
+        b.write_bytes(head + b"2" * 1000 + tail)
+
+        assert group_duplicates([a, b]) == [[a], [b]]
+
+    def test_missing_file_is_its_own_group(self, tmp_path):
+        """Test that unreadable files are left for the processor to report."""
+        a = tmp_path / "a.png"
+        a.write_bytes(b"data")
+        missing = tmp_path / "missing.png"
+
+        assert group_duplicates([missing, a]) == [[missing], [a]]
+
+    def test_link_or_copy(self, tmp_path):
+        """Test that the destination receives the source contents."""
+        source = tmp_path / "source.png"
+        source.write_bytes(b"result")
+        destination = tmp_path / "destination.png"
+
+        assert link_or_copy(source, destination) in ("link", "copy")
+        assert destination.read_bytes() == b"result"
+
+
+class CountingProcessor:
+    """Stand-in processor that records which inputs were processed."""
+
+    model_name = "counting"
+    precision = "fp32"
+
+    def __init__(self):
+        self.processed = []
+
+    def session_pool_size(self) -> int:
+        return 1
+
+    def generate_output_path(
+        self, input_path: Path, output_folder: Path, variant="", extension=".png"
+    ) -> Path:
+        return output_folder / f"{input_path.stem}{extension}"
+
+    def release_output_path(self, output_path: Path) -> None:
+        pass
+
+    def process_image(self, input_path: Path, output_path: Path) -> None:
+        self.processed.append(input_path)
+        output_path.write_bytes(b"cutout of " + input_path.read_bytes())
+
+
+class TestWorkerDeduplication:
+    """Tests for duplicate fan-out in ProcessingWorker."""
+
+    def test_duplicates_processed_once(self, tmp_path, temp_output_dir):
+        """Test that each unique image is processed once and fanned out."""
+        a = tmp_path / "a.jpg"
+        b = tmp_path / "b.jpg"
+        c = tmp_path / "c.jpg"
+        a.write_bytes(b"one")
+        b.write_bytes(b"two")
+        c.write_bytes(b"one")
+
+        processor = CountingProcessor()
+        worker = ProcessingWorker([a, b, c], temp_output_dir, processor)
+        results = []
+        totals = []
+        worker.file_completed.connect(lambda *args: results.append(args))
+        worker.all_completed.connect(lambda *args: totals.append(args))
+        worker.run()
+
+        assert processor.processed == [a, b]
+        assert sorted(name for name, _, _ in results) == ["a.jpg", "b.jpg", "c.jpg"]
+        assert totals == [(3, 0)]
+        assert (temp_output_dir / "c.png").read_bytes() == b"cutout of one"
+
+    def test_duplicates_get_trim_sidecars(
+        self, offline_processor, tmp_path, temp_output_dir
+    ):
+        """Test that a duplicate's trimmed variant keeps its recorded crop."""
+        image = Image.new("RGB", (60, 40), color="black")
+        image.paste((255, 255, 255), (10, 5, 30, 25))
+        first, second = tmp_path / "first.png", tmp_path / "second.png"
+        image.save(first)
+        image.save(second)
+        variants = [ExportVariant("web", format="WEBP", trim=True)]
+
+        worker = ProcessingWorker(
+            [first, second], temp_output_dir, offline_processor, variants=variants
+        )
+        worker.run()
+
+        placement = read_placement(temp_output_dir / "second_web.webp")
+        assert placement == read_placement(temp_output_dir / "first_web.webp")
+        assert placement["left"] == 10
@@ -0,0 +1,127 @@
+"""Tests for the direct ONNX Runtime backend."""
+
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from background_remover import direct_inference, quantization, tuning
+from background_remover.direct_inference import DirectSession, ModelSpec
+from background_remover.image_processor import ImageProcessor
+from background_remover.tuning import synthetic_images
+from tests.helpers import StandInSession, fp32_processor
+
+pytestmark = pytest.mark.usefixtures("model_home")
+
+
+def _masks(tiny_model, image):
+    """Return the masks of both backends for one image."""
+    return [
+        fp32_processor(tiny_model, backend=backend).process_array(image)[1]
+        for backend in direct_inference.BACKENDS
+    ]
+
+
+class TestDirectSession:
+    """Tests for masks computed without rembg's processing."""
+
+    def test_session_wrapped(self, tiny_model):
+        """Test that supported rembg sessions use the direct path."""
+        direct = fp32_processor(tiny_model)
+        fallback = fp32_processor(tiny_model, backend=direct_inference.BACKEND_REMBG)
+
+        assert isinstance(direct.session, DirectSession)
+        assert not isinstance(fallback.session, DirectSession)
+
+    def test_matches_rembg(self, tiny_model):
+        """Test that images near the model size get rembg's mask to rounding."""
+        direct, rembg = _masks(tiny_model, synthetic_images(1, (640, 480))[0])
+
+        assert direct.shape == rembg.shape == (480, 640)
+        assert np.abs(direct.astype(int) - rembg).max() <= 1
+
+    def test_large_image_close_to_rembg(self, tiny_model):
+        """Test that pre-reducing large images changes masks only slightly."""
+        direct, rembg = _masks(tiny_model, synthetic_images(1, (2400, 1800))[0])
+
+        assert np.abs(direct.astype(int) - rembg).mean() < 3
+
+    def test_buffers_reused(self, tiny_model):
+        """Test that repeated images don't allocate new model buffers."""
+        processor = fp32_processor(tiny_model)
+        images = synthetic_images(2, (200, 150))
+        processor.process_array(images[0])
+        session = processor.session
+        buffers = (session._input, session._mask)
+
+        processor.process_array(images[1])
+
+        assert (session._input, session._mask) == buffers
+
+    def test_sigmoid_output(self, tiny_model):
+        """Test that models with raw logits get sigmoid then min-max scaling."""
+        session = fp32_processor(tiny_model).session
+        spec = ModelSpec((320, 320), (0.5,) * 3, (0.5,) * 3, sigmoid=True)
+        direct = DirectSession(session.rembg_session, spec)
+        logits = np.linspace(-4, 4, 320 * 320, dtype=np.float32)
+
+        direct._scale_mask(logits.reshape(1, 1, 320, 320))
+
+        assert direct._mask.min() == 0 and direct._mask.max() >= 254
+        assert direct._mask[0, 0] < direct._mask[160, 0] < direct._mask[-1, -1]
+
+    def test_unsupported_sessions_unchanged(self, tiny_model):
+        """Test that stand-ins and unknown models keep the rembg path."""
+        stand_in = StandInSession()
+        rembg_session = fp32_processor(
+            tiny_model, backend=direct_inference.BACKEND_REMBG
+        ).session
+
+        assert direct_inference.wrap_session(stand_in, "u2net") is stand_in
+        assert direct_inference.wrap_session(rembg_session, "custom") is rembg_session
+
+    @pytest.mark.parametrize("model_name", sorted(direct_inference.MODEL_SPECS))
+    def test_spec_matches_rembg_normalization(self, model_name):
+        """Test that each spec uses the size, mean and std rembg's session does."""
+
+        class NormalizedError(Exception):
+            pass
+
+        def normalize(img, mean, std, size, *args, **kwargs):
+            raise NormalizedError(size, mean, std)
+
+        session_class = quantization.session_class_for(model_name)
+        # Skip loading the model; predict stops at normalization
+        session = session_class.__new__(session_class)
+        session.inner_session = SimpleNamespace(run=None)
+        session.normalize = normalize
+        spec = direct_inference.MODEL_SPECS[model_name]
+
+        with pytest.raises(NormalizedError) as normalized:
+            session.predict(Image.new("RGB", (8, 8)))
+
+        size, mean, std = normalized.value.args
+        assert tuple(size) == spec.size
+        assert tuple(mean) == pytest.approx(spec.mean)
+        assert tuple(std) == pytest.approx(spec.std)
+
+    def test_invalid_backend(self):
+        """Test that an unknown backend is rejected."""
+        with pytest.raises(ValueError, match="backend"):
+            ImageProcessor(backend="tensorrt")
+
+    def test_benchmark_backends(self, tiny_model):
+        """Test that the benchmark times both backends and the model alone."""
+        timings = tuning.benchmark_backends(
+            images=2,
+            size=(320, 240),
+            processor_factory=lambda backend: fp32_processor(
+                tiny_model, backend=backend
+            ),
+        )
+
+        assert set(timings) == set(direct_inference.BACKENDS)
+        for timing in timings.values():
+            assert timing.seconds > 0 and 0 < timing.model_seconds
+            assert timing.overhead_seconds >= 0
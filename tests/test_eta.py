@@ -0,0 +1,152 @@
+"""Tests for learned time-remaining estimates."""
+
+import pytest
+from PIL import Image
+
+from background_remover import eta, metrics
+from background_remover.eta import CostModel, EtaEstimator, StageCost
+from background_remover.worker import ProcessingWorker
+
+
+class FakeClock:
+    """Monotonic clock advanced by hand."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestCostModel:
+    """Tests for learning and persisting stage costs."""
+
+    def test_fits_fixed_and_per_megapixel_cost(self):
+        """Test that a linear cost is recovered from mixed sizes."""
+        cost = StageCost()
+        for megapixels in (1, 4, 2, 8, 1, 12):
+            cost.observe(megapixels, 0.2 + 0.05 * megapixels)
+
+        fixed, per_mp = cost.coefficients()
+
+        assert fixed == pytest.approx(0.2)
+        assert per_mp == pytest.approx(0.05)
+        assert cost.predict(20) == pytest.approx(1.2)
+
+    def test_single_size_scales_with_pixels(self):
+        """Test the fallback when every file so far had the same size."""
+        cost = StageCost()
+        cost.observe(2, 1.0)
+
+        assert cost.predict(2) == pytest.approx(1.0)
+        assert cost.predict(4) == pytest.approx(2.0)
+
+    def test_recent_files_dominate(self):
+        """Test that old timings fade out as the machine gets faster."""
+        cost = StageCost()
+        for _ in range(50):
+            cost.observe(1, 10.0)
+        for _ in range(100):
+            cost.observe(1, 1.0)
+
+        assert cost.predict(1) < 2.0
+
+    def test_predicts_sum_of_stages(self):
+        """Test that a file's cost covers every stage of its model only."""
+        costs = CostModel()
+        costs.observe("u2net-fp32", "decode", 2, 0.2)
+        costs.observe("u2net-fp32", "inference", 2, 0.6)
+
+        assert costs.predict("u2net-fp32", 2) == pytest.approx(0.8)
+        assert costs.predict("u2netp-fp32", 2) is None
+
+    def test_save_and_load(self, tmp_path):
+        """Test that learned costs survive a restart."""
+        costs = CostModel()
+        costs.observe("u2net-fp32", "inference", 3, 1.5)
+        path = costs.save(tmp_path / "eta.json")
+
+        assert CostModel.load(path).predict("u2net-fp32", 3) == pytest.approx(1.5)
+
+    def test_invalid_file_starts_fresh(self, tmp_path):
+        """Test that a corrupt costs file is ignored."""
+        path = tmp_path / "eta.json"
+        path.write_text("{not json")
+
+        assert CostModel.load(path).predict("u2net-fp32", 1) is None
+
+
+class TestEtaEstimator:
+    """Tests for batch time-remaining estimates."""
+
+    def test_unknown_until_costs_are_learned(self):
+        """Test that no estimate is made without any timings."""
+        estimator = EtaEstimator("m", {"a": 1.0}, CostModel())
+
+        assert estimator.remaining_seconds() is None
+
+    def test_uses_remaining_sizes_and_live_throughput(self):
+        """Test that larger remaining files take longer and parallelism counts."""
+        clock = FakeClock()
+        sizes = {"a": 1.0, "b": 1.0, "big": 4.0}
+        estimator = EtaEstimator("m", sizes, CostModel(), parallelism=2, clock=clock)
+
+        clock.now = 1.0
+        estimator.file_done("a", {"inference": 2.0})
+
+        # Two seconds of work finished after one second of wall-clock time
+        assert estimator.remaining_seconds() == pytest.approx((2.0 + 8.0) / 2)
+        assert estimator.throughput() == pytest.approx(1.0)
+
+        estimator.skip("b")
+        assert estimator.remaining_seconds() == pytest.approx(4.0)
+
+        estimator.skip("big")
+        assert estimator.remaining_seconds() == 0.0
+
+    def test_files_added_mid_batch(self):
+        """Test that files queued while the batch runs are included."""
+        costs = CostModel()
+        costs.observe("m", "inference", 1.0, 1.0)
+        estimator = EtaEstimator("m", {"a": 1.0}, costs)
+
+        estimator.add({"b": 3.0})
+
+        assert estimator.remaining_seconds() == pytest.approx(4.0)
+
+    def test_format_duration(self):
+        """Test short duration formatting."""
+        assert eta.format_duration(42) == "42s"
+        assert eta.format_duration(250) == "4m 10s"
+        assert eta.format_duration(3900) == "1h 05m"
+
+
+class TestWorkerEta:
+    """Tests for estimates published during a batch."""
+
+    def test_batch_reports_and_learns(self, offline_processor, tmp_path):
+        """Test that estimates end at zero and later batches start informed."""
+        files = []
+        for i, size in enumerate([(64, 48), (128, 96), (256, 192)]):
+            path = tmp_path / f"image_{i}.png"
+            Image.new("RGB", size, color=(i * 80, 200, 0)).save(path)
+            files.append(path)
+        output = tmp_path / "out"
+        output.mkdir()
+        _ = offline_processor.session
+
+        estimates = []
+        worker = ProcessingWorker(files, output, offline_processor)
+        worker.eta_updated.connect(estimates.append)
+        worker.run()
+
+        assert estimates[0] is None
+        assert estimates[-1] == 0.0
+        assert metrics.ETA_SECONDS.value() == 0
+
+        estimates.clear()
+        worker = ProcessingWorker(files, output, offline_processor)
+        worker.eta_updated.connect(estimates.append)
+        worker.run()
+
+        assert estimates[0] is not None and estimates[0] > 0
@@ -0,0 +1,96 @@
+"""Tests for multi-variant export."""
+
+import pytest
+from PIL import Image
+
+from background_remover.export import (
+    DEFAULT_EXPORT_SPEC,
+    FLATTEN,
+    MASK,
+    ExportVariant,
+)
+from background_remover.image_processor import ImageProcessor
+
+
+@pytest.fixture
+def subject_image(tmp_path):
+    """Create a dark image with a bright square subject."""
+    img = Image.new("RGB", (200, 100), color="black")
+    img.paste((255, 255, 255), (50, 20, 90, 60))
+    path = tmp_path / "product.jpg"
+    img.save(path)
+    return path
+
+
+class TestExportVariant:
+    """Tests for ExportVariant validation."""
+
+    def test_unknown_kind_rejected(self):
+        """Test that an invalid kind raises ValueError."""
+        with pytest.raises(ValueError, match="Unknown variant kind"):
+            ExportVariant("bad", kind="sketch")
+
+    def test_transparent_jpeg_rejected(self):
+        """Test that a JPEG cutout is refused since it can't hold alpha."""
+        with pytest.raises(ValueError, match="transparency"):
+            ExportVariant("bad", format="JPEG")
+
+
+class TestExportVariants:
+    """Tests for ImageProcessor.export_variants."""
+
+    def test_single_inference_for_all_variants(
+        self, offline_processor, stand_in_session, subject_image, temp_output_dir
+    ):
+        """Test that every variant is written from one mask."""
+        outputs = offline_processor.export_variants(
+            subject_image, temp_output_dir, DEFAULT_EXPORT_SPEC
+        )
+
+        assert stand_in_session.calls == 1
+        assert sorted(outputs) == ["cutout", "mask", "web", "white"]
+        assert outputs["white"].name == "product_white.jpg"
+        assert all(path.exists() for path in outputs.values())
+
+    def test_variant_contents(
+        self, offline_processor, subject_image, temp_output_dir
+    ):
+        """Test mask, flatten and trim rendering."""
+        variants = [
+            ExportVariant("mask", kind=MASK),
+            ExportVariant("white", kind=FLATTEN, format="JPEG"),
+            ExportVariant("trimmed", trim=True),
+        ]
+        outputs = offline_processor.export_variants(
+            subject_image, temp_output_dir, variants
+        )
+
+        with Image.open(outputs["mask"]) as mask:
+            assert mask.mode == "L"
+        with Image.open(outputs["white"]) as white:
+            assert white.mode == "RGB"
+            assert white.getpixel((0, 0))[0] > 240
+        with Image.open(outputs["trimmed"]) as trimmed:
+            assert trimmed.size == (40, 40)
+
+    def test_flatten_blends_edges_once(self, temp_output_dir, tmp_path):
+        """Test that a half-transparent edge lands halfway to the background."""
+
+        class HalfMaskSession:
+            def predict(self, img, *args, **kwargs):
+                return [Image.new("L", img.size, 128)]
+
+        source = tmp_path / "red.png"
+        Image.new("RGB", (16, 16), (200, 0, 0)).save(source)
+        processor = ImageProcessor(session_factory=HalfMaskSession)
+
+        outputs = processor.export_variants(
+            source, temp_output_dir, [ExportVariant("white", kind=FLATTEN)]
+        )
+
+        with Image.open(outputs["white"]) as white:
+            red, green, blue = white.getpixel((8, 8))
+        # Halfway between (200, 0, 0) and white is about (228, 127, 127)
+        assert red == pytest.approx(228, abs=2)
+        assert green == pytest.approx(127, abs=2)
+        assert blue == pytest.approx(127, abs=2)
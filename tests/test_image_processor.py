@@ -1,8 +1,11 @@
 """Tests for the ImageProcessor class."""
 
+import io
+
+import numpy as np
 import pytest
 from pathlib import Path
-from PIL import Image
+from PIL import Image, ImageSequence
 
 from background_remover.image_processor import ImageProcessor
 
@@ -78,6 +81,64 @@ class TestImageProcessor:
             processor.process_image(fake_file, temp_output_dir / "output.png")
 
 
+class TestProcessArray:
+    """Tests for the array-native processing API."""
+
+    def test_rgb_input(self, offline_processor):
+        """Test that an RGB array yields an RGBA cutout and a matching mask."""
+        array = np.zeros((20, 30, 3), dtype=np.uint8)
+        array[5:15, 10:20] = 255
+
+        rgba, mask = offline_processor.process_array(array)
+
+        assert rgba.shape == (20, 30, 4)
+        assert mask.shape == (20, 30)
+        assert rgba[10, 15, 3] == 255
+        assert rgba[0, 0, 3] == 0
+
+    def test_inplace_reuses_buffer(self, offline_processor):
+        """Test that an RGBA array is used as the output buffer when allowed."""
+        array = np.full((10, 10, 4), 200, dtype=np.uint8)
+
+        rgba, _ = offline_processor.process_array(array, inplace=True)
+
+        assert rgba is array
+
+    def test_input_untouched_by_default(self, offline_processor):
+        """Test that the caller's array is not modified without inplace."""
+        array = np.full((10, 10, 4), 50, dtype=np.uint8)
+
+        offline_processor.process_array(array)
+
+        assert (array == 50).all()
+
+    def test_invalid_dtype(self, offline_processor):
+        """Test that non-uint8 arrays are rejected."""
+        with pytest.raises(ValueError, match="uint8"):
+            offline_processor.process_array(np.zeros((4, 4, 3), dtype=np.float32))
+
+
+class TestProcessBytes:
+    """Tests for the in-memory processing API."""
+
+    def test_round_trip(self, offline_processor):
+        """Test that encoded bytes in give PNG bytes out."""
+        buffer = io.BytesIO()
+        Image.new("RGB", (30, 20), color="white").save(buffer, "JPEG")
+
+        result = offline_processor.process_bytes(buffer.getvalue())
+
+        with Image.open(io.BytesIO(result)) as img:
+            assert img.format == "PNG"
+            assert img.mode == "RGBA"
+            assert img.size == (30, 20)
+
+    def test_invalid_data(self, offline_processor):
+        """Test that undecodable data raises RuntimeError."""
+        with pytest.raises(RuntimeError, match="Failed to open image"):
+            offline_processor.process_bytes(b"not an image")
+
+
 class TestImageProcessorIntegration:
     """Integration tests that actually process images."""
 
@@ -121,3 +182,102 @@ class TestImageProcessorIntegration:
         with Image.open(sample_image) as original:
             with Image.open(output_path) as result:
                 assert result.size == original.size
+
+
+class TestMultiFrameProcessing:
+    """Tests for animated and multi-page inputs."""
+
+    @staticmethod
+    def _save_animation(path: Path, colors) -> None:
+        frames = [Image.new("RGB", (40, 40), color=color) for color in colors]
+        frames[0].save(
+            path, save_all=True, append_images=frames[1:], duration=50, loop=0
+        )
+
+    def test_all_frames_are_written(self, offline_processor, tmp_path):
+        """Test that every input frame appears in the animated output."""
+        input_path = tmp_path / "spin.gif"
+        self._save_animation(input_path, ["white", "black", "white"])
+        output_path = tmp_path / "spin.png"
+
+        offline_processor.process_image(input_path, output_path)
+
+        with Image.open(output_path) as result:
+            assert result.n_frames == 3
+            assert result.mode == "RGBA"
+
+    def test_unchanged_frames_reuse_mask(
+        self, offline_processor, stand_in_session, tmp_path
+    ):
+        """Test that inference only runs when a frame actually changes."""
+        input_path = tmp_path / "spin.gif"
+        # Near-identical frames differ by one level so GIF doesn't merge them
+        self._save_animation(
+            input_path,
+            [(255, 255, 255), (254, 254, 254), (255, 255, 255), "black", (1, 1, 1)],
+        )
+        with Image.open(input_path) as source:
+            assert source.n_frames == 5
+
+        offline_processor.process_image(input_path, tmp_path / "spin.png")
+
+        assert stand_in_session.calls == 2
+
+    def test_frame_durations_kept(self, offline_processor, tmp_path):
+        """Test that each output frame keeps its input duration."""
+        input_path = tmp_path / "spin.gif"
+        frames = [Image.new("RGB", (40, 40), color=c) for c in ("white", "black")]
+        frames[0].save(
+            input_path, save_all=True, append_images=frames[1:], duration=[40, 120]
+        )
+        output_path = tmp_path / "spin.png"
+
+        offline_processor.process_image(input_path, output_path)
+
+        with Image.open(output_path) as result:
+            durations = []
+            for frame in ImageSequence.Iterator(result):
+                durations.append(frame.info["duration"])
+            assert result.info["loop"] == 0
+        assert durations == [40, 120]
+
+    def test_frames_follow_exif_orientation(self, offline_processor, tmp_path):
+        """Test that animation frames are rotated like single images."""
+        input_path = tmp_path / "spin.webp"
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Rotate 90 degrees clockwise to display
+        frames = [Image.new("RGB", (40, 20), color=c) for c in ("white", "black")]
+        frames[0].save(
+            input_path,
+            save_all=True,
+            append_images=frames[1:],
+            exif=exif,
+            lossless=True,
+        )
+        output_path = tmp_path / "spin.png"
+
+        offline_processor.process_image(input_path, output_path)
+
+        with Image.open(output_path) as result:
+            assert result.n_frames == 2
+            assert result.size == (20, 40)
+
+    def test_mpo_preview_frame_ignored(
+        self, offline_processor, stand_in_session, tmp_path
+    ):
+        """Test that a camera MPO's smaller preview frame is not processed."""
+        input_path = tmp_path / "photo.jpg"
+        Image.new("RGB", (64, 48), "white").save(
+            input_path,
+            "MPO",
+            save_all=True,
+            append_images=[Image.new("RGB", (16, 12), "black")],
+        )
+        output_path = tmp_path / "photo.png"
+
+        offline_processor.process_image(input_path, output_path)
+
+        with Image.open(output_path) as result:
+            assert not getattr(result, "is_animated", False)
+            assert result.size == (64, 48)
+        assert stand_in_session.calls == 1
@@ -0,0 +1,204 @@
+"""Tests for per-file limits and isolated processing."""
+
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from background_remover import isolation
+from background_remover.cli import main
+from background_remover.export import ExportVariant
+from background_remover.image_processor import ImageProcessor
+from background_remover.isolation import (
+    FileLimitError,
+    FileLimits,
+    IsolatedRunner,
+    ProcessingCancelledError,
+    ProcessorSpec,
+)
+from background_remover.trim import sidecar_path
+from background_remover.worker import ProcessingWorker
+
+# Input widths that make TroubleSession misbehave
+HANG, HOG, CRASH, KEEP = 13, 17, 19, 23
+
+# Memory TroubleSession holds on to between files, like a grown arena
+_kept = []
+
+
+class TroubleSession:
+    """Stand-in session that hangs, hogs memory or crashes on cue."""
+
+    def predict(self, img, *args, **kwargs):
+        if img.width == HANG:
+            time.sleep(60)
+        elif img.width == HOG:
+            hog = np.ones(400 * 2**20, dtype=np.uint8)
+            time.sleep(60)
+            del hog
+        elif img.width == CRASH:
+            os._exit(3)
+        elif img.width == KEEP:
+            _kept.append(np.ones(120 * 2**20, dtype=np.uint8))
+            time.sleep(0.5)
+        return [img.convert("L")]
+
+
+def _image(folder, name, width):
+    path = folder / name
+    Image.new("RGB", (width, 10), color="white").save(path)
+    return path
+
+
+@pytest.fixture
+def runner():
+    """Isolated runner with a 3 second, 200 MB limit per file."""
+    runner = IsolatedRunner(
+        ProcessorSpec(session_factory=TroubleSession), FileLimits(3, 200)
+    )
+    yield runner
+    runner.close()
+
+
+class TestIsolatedRunner:
+    """Tests for killing files that misbehave."""
+
+    def test_limits_from_environment(self, monkeypatch):
+        """Test that the environment overrides defaults and 0 disables."""
+        monkeypatch.setenv("BGREMOVER_FILE_TIMEOUT", "0")
+        monkeypatch.setenv("BGREMOVER_FILE_MEMORY_MB", "512")
+
+        limits = FileLimits.from_environment(default_timeout=300)
+
+        assert limits == FileLimits(None, 512)
+        with pytest.raises(ValueError):
+            FileLimits(timeout=-1)
+
+    def test_memory_limit_rejected_without_rss(self, monkeypatch, tmp_path, capsys):
+        """Test that a memory limit fails loudly when RSS can't be measured."""
+
+        def no_proc(*args, **kwargs):
+            raise FileNotFoundError("no /proc")
+
+        monkeypatch.setattr(isolation, "open", no_proc, raising=False)
+        monkeypatch.setitem(sys.modules, "psutil", None)
+
+        assert isolation.process_rss(os.getpid()) is None
+        FileLimits(timeout=5).check_supported()
+        with pytest.raises(RuntimeError, match="psutil"):
+            FileLimits(memory_mb=512).check_supported()
+
+        source = _image(tmp_path, "a.png", 10)
+        code = main(
+            ["batch", str(source), "-o", str(tmp_path / "out"), "--memory-limit", "512"]
+        )
+
+        assert code != 0
+        assert "psutil" in capsys.readouterr().err
+        assert not (tmp_path / "out").exists()
+
+    def test_limits_off_without_environment(self, monkeypatch):
+        """Test that isolation stays opt-in when no limit is configured."""
+        monkeypatch.delenv("BGREMOVER_FILE_TIMEOUT", raising=False)
+        monkeypatch.delenv("BGREMOVER_FILE_MEMORY_MB", raising=False)
+
+        assert not FileLimits.from_environment().enabled
+
+    def test_processes_in_child(self, runner, tmp_path):
+        """Test that a well-behaved file is processed normally."""
+        output = tmp_path / "out.png"
+
+        runner.process_image(_image(tmp_path, "ok.png", 8), output)
+
+        assert Image.open(output).mode == "RGBA"
+
+    @pytest.mark.parametrize(
+        "width, message", [(HANG, "Timed out"), (HOG, "memory limit")]
+    )
+    def test_limit_kills_file_and_recovers(self, runner, tmp_path, width, message):
+        """Test that an offending file fails and the next one still works."""
+        with pytest.raises(FileLimitError, match=message):
+            runner.process_image(_image(tmp_path, "bad.png", width), tmp_path / "a.png")
+
+        runner.process_image(_image(tmp_path, "ok.png", 8), tmp_path / "b.png")
+        assert (tmp_path / "b.png").exists()
+
+    def test_memory_kept_by_earlier_files_not_charged(self, runner, tmp_path):
+        """Test that each file's memory is measured from when it started."""
+        for name in ("a", "b"):
+            runner.process_image(
+                _image(tmp_path, f"{name}.png", KEEP), tmp_path / f"{name}-out.png"
+            )
+
+        assert (tmp_path / "b-out.png").exists()
+
+    def test_crash_reported(self, runner, tmp_path):
+        """Test that a child dying mid-file fails only that file."""
+        with pytest.raises(RuntimeError, match="crashed"):
+            runner.process_image(_image(tmp_path, "bad.png", CRASH), tmp_path / "a.png")
+
+    def test_cancel_mid_file(self, runner, tmp_path):
+        """Test that cancelling stops a hanging file within moments."""
+        cancel = threading.Event()
+        runner.process_image(_image(tmp_path, "ok.png", 8), tmp_path / "a.png")
+        threading.Timer(0.5, cancel.set).start()
+        start = time.monotonic()
+
+        with pytest.raises(ProcessingCancelledError):
+            runner.process_image(
+                _image(tmp_path, "bad.png", HANG), tmp_path / "b.png", cancel.is_set
+            )
+
+        assert time.monotonic() - start < 2
+
+    def test_cancelled_export_removes_partial_outputs(self, runner, tmp_path):
+        """Test that variants and sidecars of an abandoned file are removed."""
+        variants = [ExportVariant("web", format="WEBP", trim=True)]
+        output_paths = {"web": tmp_path / "bad_web.webp"}
+        # Stand in for a variant the child wrote before it was stopped
+        output_paths["web"].write_bytes(b"partial")
+        sidecar_path(output_paths["web"]).write_text("{}")
+
+        with pytest.raises(ProcessingCancelledError):
+            runner.export_variants(
+                _image(tmp_path, "bad.png", HANG),
+                tmp_path,
+                variants,
+                output_paths,
+                lambda: True,
+            )
+
+        assert not output_paths["web"].exists()
+        assert not sidecar_path(output_paths["web"]).exists()
+
+
+class TestWorkerLimits:
+    """Tests for limits in ProcessingWorker."""
+
+    def test_batch_continues_past_timeout(self, tmp_path, temp_output_dir):
+        """Test that a hanging file is failed and the rest are processed."""
+        files = [
+            _image(tmp_path, "first.png", 8),
+            _image(tmp_path, "stuck.png", HANG),
+            _image(tmp_path, "last.png", 9),
+        ]
+        results = {}
+        worker = ProcessingWorker(
+            files,
+            temp_output_dir,
+            ImageProcessor(session_factory=TroubleSession),
+            limits=FileLimits(timeout=2),
+        )
+        worker.file_completed.connect(
+            lambda name, success, message: results.update({name: (success, message)})
+        )
+
+        worker.run()
+
+        assert results["first.png"][0] and results["last.png"][0]
+        assert results["stuck.png"] == (False, "Timed out after 2s")
+        assert not (temp_output_dir / "stuck.png").exists()
@@ -0,0 +1,126 @@
+"""Tests for the metrics registry."""
+
+import threading
+from urllib.request import urlopen
+
+import pytest
+from PIL import Image
+
+from background_remover import metrics
+from background_remover.metrics import MetricsRegistry
+from background_remover.worker import ProcessingWorker
+
+
+class TestMetricsRegistry:
+    """Tests for Prometheus text exposition."""
+
+    def test_counter_and_gauge(self):
+        """Test counter and gauge samples."""
+        registry = MetricsRegistry()
+        done = registry.counter("jobs_total", "Jobs done.", labelnames=("kind",))
+        depth = registry.gauge("depth", "Queue depth.")
+        done.inc(kind="a")
+        done.inc(2, kind="b")
+        depth.set(5)
+        depth.dec()
+
+        text = registry.render()
+
+        assert "# TYPE jobs_total counter" in text
+        assert 'jobs_total{kind="a"} 1' in text
+        assert 'jobs_total{kind="b"} 2' in text
+        assert "depth 4" in text
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Test histogram bucket, sum and count lines."""
+        registry = MetricsRegistry()
+        latency = registry.histogram("latency_seconds", "Latency.", buckets=(1, 5))
+        for value in (0.5, 2, 10):
+            latency.observe(value)
+
+        text = registry.render()
+
+        assert 'latency_seconds_bucket{le="1"} 1' in text
+        assert 'latency_seconds_bucket{le="5"} 2' in text
+        assert 'latency_seconds_bucket{le="+Inf"} 3' in text
+        assert "latency_seconds_sum 12.5" in text
+        assert "latency_seconds_count 3" in text
+
+    def test_histogram_capture_is_per_thread(self):
+        """Test that a capture sums only its own thread's observations."""
+        registry = MetricsRegistry()
+        stages = registry.histogram("s", "S.", buckets=(1,), labelnames=("stage",))
+
+        with stages.capture() as captured:
+            stages.observe(0.5, stage="decode")
+            stages.observe(0.25, stage="decode")
+            other = threading.Thread(
+                target=stages.observe, args=(9,), kwargs={"stage": "encode"}
+            )
+            other.start()
+            other.join()
+        stages.observe(1, stage="decode")
+
+        assert captured == {("decode",): 0.75}
+        assert stages.count(stage="encode") == 1
+
+    def test_wrong_labels_rejected(self):
+        """Test that missing labels raise ValueError."""
+        registry = MetricsRegistry()
+        counter = registry.counter("c", "C.", labelnames=("stage",))
+        with pytest.raises(ValueError):
+            counter.inc()
+
+    def test_serve_and_write(self, tmp_path):
+        """Test the HTTP endpoint and the end-of-run file."""
+        registry = MetricsRegistry()
+        registry.counter("served_total", "Served.").inc()
+        server = registry.serve(0)
+        try:
+            port = server.server_address[1]
+            with urlopen(f"http://127.0.0.1:{port}/metrics") as response:
+                body = response.read().decode()
+        finally:
+            server.shutdown()
+        registry.write(tmp_path / "metrics.prom")
+
+        assert "served_total 1" in body
+        assert "served_total 1" in (tmp_path / "metrics.prom").read_text()
+
+
+class TestWorkerMetrics:
+    """Tests for metrics recorded during a batch."""
+
+    def test_batch_updates_metrics(self, offline_processor, tmp_path):
+        """Test counters, stage timings and the end-of-batch file."""
+        good = tmp_path / "good.png"
+        Image.new("RGB", (20, 20), color="white").save(good)
+        copy = tmp_path / "copy.png"
+        copy.write_bytes(good.read_bytes())
+        bad = tmp_path / "bad.png"
+        bad.write_bytes(b"not an image")
+        output = tmp_path / "out"
+        output.mkdir()
+
+        processed = metrics.FILES_PROCESSED.value()
+        cached = metrics.FILES_CACHED.value()
+        failed = metrics.FILES_FAILED.value()
+        inferences = metrics.STAGE_SECONDS.count(stage="inference")
+
+        worker = ProcessingWorker(
+            [good, copy, bad],
+            output,
+            offline_processor,
+            metrics_file=tmp_path / "batch.prom",
+        )
+        worker.run()
+
+        assert metrics.FILES_PROCESSED.value() == processed + 1
+        assert metrics.FILES_CACHED.value() == cached + 1
+        assert metrics.FILES_FAILED.value() == failed + 1
+        assert metrics.STAGE_SECONDS.count(stage="inference") == inferences + 1
+        assert metrics.QUEUE_DEPTH.value() == 0
+        assert metrics.IN_FLIGHT_BYTES.value() == 0
+        assert "bgremover_files_processed_total" in (
+            tmp_path / "batch.prom"
+        ).read_text()
@@ -0,0 +1,156 @@
+"""Tests for header-only preflight validation."""
+
+import threading
+
+import pytest
+from PIL import Image
+
+from background_remover import preflight as preflight_module
+from background_remover.image_processor import ImageProcessor
+from background_remover.preflight import preflight, probe, sniff_format
+from background_remover.ui.file_list_widget import FileListWidget
+
+
+@pytest.fixture
+def animated_gif(tmp_path):
+    """Create a three-frame GIF."""
+    frames = [Image.new("L", (40, 30), color=i * 100) for i in range(3)]
+    path = tmp_path / "anim.gif"
+    frames[0].save(path, save_all=True, append_images=frames[1:])
+    return path
+
+
+@pytest.fixture
+def bad_files(tmp_path):
+    """Create an empty file, a non-image and a truncated PNG header."""
+    empty = tmp_path / "empty.png"
+    empty.write_bytes(b"")
+    text = tmp_path / "notes.jpg"
+    text.write_text("not an image")
+    truncated = tmp_path / "truncated.png"
+    truncated.write_bytes(b"\x89PNG\r\n\x1a\n\x00\x00")
+    return [empty, text, truncated]
+
+
+class TestProbe:
+    """Tests for probing single files."""
+
+    def test_sniff_format(self):
+        """Test that formats are identified by content, not name."""
+        assert sniff_format(b"\x89PNG\r\n\x1a\n....") == "PNG"
+        assert sniff_format(b"RIFF\x00\x00\x00\x00WEBPVP8 ") == "WEBP"
+        assert sniff_format(b"%PDF-1.7") is None
+
+    def test_reads_header_metadata(self, animated_gif):
+        """Test that size, mode and frame count are read."""
+        info = probe(animated_gif)
+
+        assert (info.format, info.width, info.height) == ("GIF", 40, 30)
+        assert info.mode in ("L", "P")
+        assert info.frames == 3
+        assert info.file_size == animated_gif.stat().st_size
+        assert not info.mislabelled
+
+    def test_mpo_counts_one_frame(self, tmp_path):
+        """Test that an MPO photo's preview frame isn't counted as animation."""
+        path = tmp_path / "photo.jpg"
+        Image.new("RGB", (64, 48)).save(
+            path, "MPO", save_all=True, append_images=[Image.new("RGB", (16, 12))]
+        )
+
+        info = probe(path)
+
+        assert (info.format, info.frames) == ("JPEG", 1)
+
+    def test_exif_rotation_reports_upright_size(self, tmp_path):
+        """Test that a rotated photo reports the size it will be processed at."""
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        path = tmp_path / "rotated.jpg"
+        Image.new("RGB", (60, 20)).save(path, exif=exif)
+
+        info = probe(path)
+
+        assert (info.width, info.height) == (20, 60)
+
+    def test_mislabelled_file_accepted(self, tmp_path):
+        """Test that a readable file with the wrong extension is flagged."""
+        path = tmp_path / "actually_png.jpg"
+        Image.new("RGB", (8, 8)).save(path, "PNG")
+
+        info = probe(path)
+
+        assert info.format == "PNG"
+        assert info.mislabelled
+
+    def test_extensions_match_processor(self, tmp_path):
+        """Test that preflight accepts exactly the extensions the processor does."""
+        tif = tmp_path / "scan.tif"
+        Image.new("RGB", (8, 8)).save(tif, "TIFF")
+        renamed = tmp_path / "image.txt"
+        Image.new("RGB", (8, 8)).save(renamed, "PNG")
+
+        assert probe(tif).format == "TIFF"
+        assert ImageProcessor.is_supported_format(tif)
+        with pytest.raises(ValueError, match="extension"):
+            probe(renamed)
+
+    def test_bad_files_rejected(self, bad_files):
+        """Test that empty, foreign and corrupt files raise ValueError."""
+        for path in bad_files:
+            with pytest.raises(ValueError):
+                probe(path)
+
+    def test_preflight_splits_in_order(self, animated_gif, bad_files, tmp_path):
+        """Test that a parallel pass keeps input order in both results."""
+        missing = tmp_path / "missing.png"
+
+        accepted, rejected = preflight([bad_files[0], animated_gif, missing])
+
+        assert [info.path for info in accepted] == [animated_gif]
+        assert [path for path, _ in rejected] == [bad_files[0], missing]
+
+
+class TestFileListWidget:
+    """Tests for preflight when files are queued."""
+
+    def test_rejects_bad_files_and_keeps_metadata(
+        self, qtbot, animated_gif, bad_files
+    ):
+        """Test that only valid files are listed, with their metadata."""
+        widget = FileListWidget()
+        qtbot.addWidget(widget)
+
+        with qtbot.waitSignal(widget.files_rejected) as blocker:
+            widget.add_files([animated_gif, *bad_files, animated_gif])
+
+        assert widget.get_files() == [animated_gif]
+        assert widget.file_info(animated_gif).frames == 3
+        assert [path for path, _ in blocker.args[0]] == bad_files
+
+        widget.update_file_status(animated_gif.name, "Done")
+        widget.clear()
+        assert widget.file_info(animated_gif) is None
+
+    def test_probes_off_the_gui_thread(self, qtbot, monkeypatch, animated_gif):
+        """Test that slow probing doesn't block adding files."""
+        release = threading.Event()
+
+        def slow_preflight(paths):
+            release.wait(10)
+            return preflight(paths)
+
+        monkeypatch.setattr(preflight_module, "preflight", slow_preflight)
+        widget = FileListWidget()
+        qtbot.addWidget(widget)
+
+        widget.add_files([animated_gif])
+        widget.add_files([animated_gif])
+        assert widget.get_files() == [] and widget.is_probing()
+
+        with qtbot.waitSignal(widget.files_added) as blocker:
+            release.set()
+
+        assert blocker.args == [[animated_gif]]
+        assert widget.get_files() == [animated_gif]
+        assert not widget.is_probing()
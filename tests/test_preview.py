@@ -0,0 +1,119 @@
+"""Tests for progressive previews."""
+
+import pytest
+from PIL import Image
+
+from background_remover.image_processor import ImageProcessor
+from background_remover.preview import (
+    FAST,
+    FAST_SIZE,
+    REFINED,
+    PreviewWorker,
+    load_preview_array,
+)
+from tests.helpers import StandInSession
+
+
+@pytest.fixture
+def photo(tmp_path):
+    """Create a large JPEG with a bright subject."""
+    img = Image.new("RGB", (2000, 1000), color="black")
+    img.paste((255, 255, 255), (500, 250, 1500, 750))
+    path = tmp_path / "photo.jpg"
+    img.save(path)
+    return path
+
+
+class RecordingProcessor(ImageProcessor):
+    """Offline processor that records input sizes and can run a hook."""
+
+    def __init__(self, hook=None, error=None):
+        super().__init__(session_factory=StandInSession)
+        self.sizes = []
+        self._hook = hook
+        self._error = error
+
+    def process_array(self, array, inplace=False):
+        self.sizes.append(array.shape[:2])
+        if self._hook:
+            self._hook()
+        if self._error:
+            raise RuntimeError(self._error)
+        return super().process_array(array, inplace)
+
+
+def _collect(worker: PreviewWorker):
+    ready, failed = [], []
+    worker.preview_ready.connect(
+        lambda request_id, stage, image: ready.append(
+            (request_id, stage, image.width())
+        )
+    )
+    worker.preview_failed.connect(lambda *args: failed.append(args))
+    return ready, failed
+
+
+class TestPreviewWorker:
+    """Tests for PreviewWorker."""
+
+    def test_load_preview_array_downscales(self, photo):
+        """Test that the preview input is bounded by the requested size."""
+        array = load_preview_array(photo, FAST_SIZE)
+
+        assert array.shape == (160, 320, 4)
+
+    def test_fast_then_refined(self, photo):
+        """Test that a fast preview is followed by the full-model one."""
+        fast, full = RecordingProcessor(), RecordingProcessor()
+        worker = PreviewWorker(fast, full)
+        ready, failed = _collect(worker)
+
+        request_id = worker.request(photo)
+        assert worker.process_pending()
+
+        assert ready == [(request_id, FAST, 320), (request_id, REFINED, 1024)]
+        assert not failed
+        assert max(fast.sizes[0]) < max(full.sizes[0])
+        assert not worker.process_pending()
+
+    def test_new_selection_cancels_stale_preview(self, photo, tmp_path):
+        """Test that a request made mid-preview stops the older one."""
+        other = tmp_path / "other.png"
+        Image.new("RGB", (100, 50)).save(other)
+        worker = PreviewWorker()
+        fast = RecordingProcessor(hook=lambda: worker.request(other))
+        full = RecordingProcessor()
+        worker._fast, worker._full = fast, full
+        ready, _ = _collect(worker)
+
+        worker.request(photo)
+        worker.process_pending()
+
+        assert ready == []
+        assert full.sizes == []
+
+    def test_unavailable_fast_model_falls_back(self, photo):
+        """Test that the full model still previews if the fast one fails."""
+        worker = PreviewWorker(
+            RecordingProcessor(error="no model"), RecordingProcessor()
+        )
+        ready, failed = _collect(worker)
+
+        request_id = worker.request(photo)
+        worker.process_pending()
+
+        assert ready == [(request_id, REFINED, 1024)]
+        assert not failed
+
+    def test_failure_reported(self, photo):
+        """Test that a preview that can't be rendered reports an error."""
+        worker = PreviewWorker(
+            RecordingProcessor(error="broken"), RecordingProcessor(error="broken")
+        )
+        ready, failed = _collect(worker)
+
+        request_id = worker.request(photo)
+        worker.process_pending()
+
+        assert ready == []
+        assert failed == [(request_id, "broken")]
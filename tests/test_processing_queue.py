@@ -0,0 +1,188 @@
+"""Tests for the processing queue that accepts files while it runs."""
+
+import threading
+import time
+
+from PIL import Image
+
+from background_remover.image_processor import ImageProcessor
+from background_remover.isolation import FileLimits
+from background_remover.worker import ProcessingWorker
+
+# Input width that makes SlowSession hang
+HANG = 13
+
+
+class SlowSession:
+    """Stand-in session that hangs on cue."""
+
+    def predict(self, img, *args, **kwargs):
+        if img.width == HANG:
+            time.sleep(60)
+        return [img.convert("L")]
+
+
+def _images(folder, names, width=8):
+    paths = []
+    for i, name in enumerate(names):
+        path = folder / name
+        Image.new("RGB", (width, 10), color=(i * 60, 0, 0)).save(path)
+        paths.append(path)
+    return paths
+
+
+class TestProcessingQueue:
+    """Tests for adding, reordering and cancelling queued files."""
+
+    def test_files_added_while_running(
+        self, qtbot, offline_processor, tmp_path, temp_output_dir
+    ):
+        """Test that a persistent worker processes files added after it drained."""
+        first, second = _images(tmp_path, ["first.png", "second.png"])
+        worker = ProcessingWorker(
+            [first], temp_output_dir, offline_processor, persistent=True
+        )
+        totals = []
+        worker.all_completed.connect(lambda *args: totals.append(args))
+
+        with qtbot.waitSignal(worker.all_completed, timeout=10000):
+            worker.start()
+        with qtbot.waitSignal(worker.all_completed, timeout=10000):
+            assert worker.add_files([second, second]) == [second]
+
+        assert worker.isRunning()
+        worker.stop()
+        assert worker.wait(10000)
+        assert totals == [(1, 0), (1, 0)]
+        assert (temp_output_dir / "second.png").exists()
+
+    def test_prioritize(self, offline_processor, tmp_path, temp_output_dir):
+        """Test that prioritized files jump ahead of waiting ones."""
+        a, b, c, d = _images(tmp_path, ["a.png", "b.png", "c.png", "d.png"])
+        worker = ProcessingWorker([a, b, c, d], temp_output_dir, offline_processor)
+        started = []
+        worker.file_started.connect(started.append)
+        # Reorder before grouping, then again while the batch runs
+        worker.prioritize([c])
+        worker.file_started.connect(
+            lambda name: name == "c.png" and worker.prioritize([d])
+        )
+
+        worker.run()
+
+        assert started == ["c.png", "d.png", "a.png", "b.png"]
+
+    def test_cancel_waiting_file(self, offline_processor, tmp_path, temp_output_dir):
+        """Test that a cancelled file is skipped and left out of the totals."""
+        a, b, c = _images(tmp_path, ["a.png", "b.png", "c.png"])
+        worker = ProcessingWorker([a, b, c], temp_output_dir, offline_processor)
+        cancelled, completed, totals = [], [], []
+        worker.file_cancelled.connect(cancelled.append)
+        worker.file_completed.connect(lambda name, *_: completed.append(name))
+        worker.all_completed.connect(lambda *args: totals.append(args))
+        worker.file_started.connect(
+            lambda name: name == "a.png" and worker.cancel_files([b])
+        )
+
+        worker.run()
+
+        assert cancelled == ["b.png"]
+        assert completed == ["a.png", "c.png"]
+        assert totals == [(2, 0)]
+        assert not (temp_output_dir / "b.png").exists()
+
+    def test_cancel_running_file(self, tmp_path, temp_output_dir):
+        """Test that cancelling a file mid-way stops it and the queue moves on."""
+        stuck = _images(tmp_path, ["stuck.png"], width=HANG)[0]
+        ok = _images(tmp_path, ["ok.png"])[0]
+        worker = ProcessingWorker(
+            [stuck, ok],
+            temp_output_dir,
+            ImageProcessor(session_factory=SlowSession),
+            limits=FileLimits(timeout=60),
+        )
+        cancelled, completed = [], []
+        worker.file_cancelled.connect(cancelled.append)
+        worker.file_completed.connect(lambda name, *_: completed.append(name))
+        worker.file_started.connect(
+            lambda name: name == "stuck.png"
+            and threading.Timer(1, worker.cancel_files, [[stuck]]).start()
+        )
+        start = time.monotonic()
+
+        worker.run()
+
+        assert time.monotonic() - start < 30
+        assert cancelled == ["stuck.png"]
+        assert completed == ["ok.png"]
+
+    def test_concurrent_queue_stops_cleanly(
+        self, qtbot, offline_processor, tmp_path, temp_output_dir
+    ):
+        """Test that several threads share a queue fed in bursts."""
+        files = _images(tmp_path, [f"{i}.png" for i in range(12)])
+        worker = ProcessingWorker(
+            files[:4], temp_output_dir, offline_processor, workers=3, persistent=True
+        )
+        completed = []
+        worker.file_completed.connect(lambda name, *_: completed.append(name))
+
+        with qtbot.waitSignal(worker.all_completed, timeout=10000):
+            worker.start()
+            worker.add_files(files[4:8])
+            worker.add_files(files[8:])
+        worker.stop()
+
+        assert worker.wait(10000)
+        assert sorted(completed) == sorted(path.name for path in files)
+
+
+class TestMainWindowQueue:
+    """Tests for the non-modal queue in the main window."""
+
+    def test_dropped_files_join_running_queue(
+        self, qtbot, offline_processor, tmp_path, temp_output_dir
+    ):
+        """Test that files added after starting are processed without a click."""
+        from background_remover.main_window import MainWindow
+
+        first, second = _images(tmp_path, ["first.png", "second.png"])
+        window = MainWindow(offline_processor)
+        qtbot.addWidget(window)
+        window._output_folder = temp_output_dir
+        with qtbot.waitSignal(window._file_list.files_added):
+            window._on_files_dropped([first])
+
+        window._start_processing()
+        worker = window._worker
+        window._on_files_dropped([second])
+        qtbot.waitUntil(lambda: (temp_output_dir / "second.png").exists())
+
+        assert worker.isRunning()
+        assert not window._process_btn.isEnabled()
+        window.close()
+        assert not worker.isRunning()
+
+    def test_prioritizing_done_files_leaves_them_alone(
+        self, qtbot, offline_processor, tmp_path, temp_output_dir
+    ):
+        """Test that prioritizing a finished file doesn't process it again."""
+        from background_remover.main_window import MainWindow
+
+        (first,) = _images(tmp_path, ["first.png"])
+        window = MainWindow(offline_processor)
+        qtbot.addWidget(window)
+        window._output_folder = temp_output_dir
+        with qtbot.waitSignal(window._file_list.files_added):
+            window._on_files_dropped([first])
+
+        window._start_processing()
+        worker = window._worker
+        qtbot.waitUntil(lambda: worker.is_done(first))
+        window._file_list._list_widget.selectAll()
+        window._prioritize_selected()
+
+        assert worker.queued_count() == 0
+        qtbot.wait(200)
+        assert sorted(p.name for p in temp_output_dir.iterdir()) == ["first.png"]
+        window.close()
@@ -0,0 +1,146 @@
+"""Tests for the opt-in batch profiling mode."""
+
+import cProfile
+import pstats
+import threading
+import time
+
+import pytest
+from PIL import Image
+
+from background_remover import profiling
+from background_remover.image_processor import ImageProcessor
+from background_remover.isolation import FileLimits
+from background_remover.worker import ProcessingWorker
+
+
+class SlowSession:
+    """Stand-in session slow enough for the stack sampler to catch."""
+
+    def predict(self, img, *args, **kwargs):
+        time.sleep(0.05)
+        return [img.convert("L")]
+
+
+class SingleProfile(cProfile.Profile):
+    """Profiler that, like Python 3.12+, refuses to run beside another."""
+
+    active = 0
+    lock = threading.Lock()
+
+    def enable(self, *args, **kwargs):
+        with self.lock:
+            if SingleProfile.active:
+                raise ValueError("Another profiling tool is already active")
+            SingleProfile.active += 1
+        super().enable(*args, **kwargs)
+
+    def disable(self):
+        super().disable()
+        with self.lock:
+            SingleProfile.active = max(SingleProfile.active - 1, 0)
+
+
+@pytest.fixture
+def profile_folder(tmp_path, monkeypatch):
+    """Enable profiling into a temporary folder."""
+    folder = tmp_path / "profile"
+    monkeypatch.setenv(profiling.PROFILE_ENV, str(folder))
+    return folder
+
+
+@pytest.fixture
+def images(tmp_path):
+    """Create a few distinct input images."""
+    paths = []
+    for i in range(3):
+        path = tmp_path / f"image_{i}.png"
+        Image.new("RGB", (64, 48), color=(i * 80, 0, 0)).save(path)
+        paths.append(path)
+    return paths
+
+
+class TestProfiling:
+    """Tests for profiling ProcessingWorker runs."""
+
+    def test_disabled_by_default(self, monkeypatch):
+        """Test that profiling is off unless the variable is set."""
+        monkeypatch.delenv(profiling.PROFILE_ENV, raising=False)
+
+        assert profiling.from_environment() is None
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_batch_writes_reports(
+        self, monkeypatch, tmp_path, images, temp_output_dir, workers
+    ):
+        """Test that every report is written and covers the worker threads."""
+        folder = tmp_path / "profile"
+        monkeypatch.setenv(profiling.PROFILE_ENV, str(folder))
+        monkeypatch.setenv(profiling.SAMPLE_ENV, "5")
+        processor = ImageProcessor(session_factory=SlowSession)
+
+        worker = ProcessingWorker(images, temp_output_dir, processor, workers=workers)
+        worker.run()
+
+        reports = {path.name.split(".", 1)[1] for path in folder.iterdir()}
+        assert reports == {"pstats", "tracemalloc", "tracemalloc.txt", "folded"}
+
+        (stats_file,) = folder.glob("*.pstats")
+        functions = {name for _, _, name in pstats.Stats(str(stats_file)).stats}
+        assert "_process_group" in functions
+
+        (allocations,) = folder.glob("*.tracemalloc.txt")
+        assert allocations.read_text().startswith("Peak traced memory")
+
+        (folded,) = folder.glob("*.folded")
+        lines = folded.read_text().splitlines()
+        assert any("predict" in line for line in lines)
+        assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+
+    def test_one_profiler_at_a_time(
+        self, monkeypatch, profile_folder, images, temp_output_dir
+    ):
+        """Test that concurrent files survive a single-profiler Python."""
+        monkeypatch.setattr(profiling.cProfile, "Profile", SingleProfile)
+        processor = ImageProcessor(session_factory=SlowSession)
+        totals = []
+
+        worker = ProcessingWorker(images, temp_output_dir, processor, workers=2)
+        worker.all_completed.connect(lambda *args: totals.append(args))
+        worker.run()
+
+        assert totals == [(3, 0)]
+        (stats_file,) = profile_folder.glob("*.pstats")
+        functions = {name for _, _, name in pstats.Stats(str(stats_file)).stats}
+        assert "_process_group" in functions
+
+    def test_persistent_queue_dumps_each_run(
+        self, qtbot, profile_folder, images, temp_output_dir
+    ):
+        """Test that each drained run is written, from this and the child process."""
+        worker = ProcessingWorker(
+            images[:1],
+            temp_output_dir,
+            ImageProcessor(session_factory=SlowSession),
+            limits=FileLimits(timeout=60),
+            persistent=True,
+        )
+        totals = []
+        worker.all_completed.connect(lambda *args: totals.append(args))
+
+        with qtbot.waitSignal(worker.all_completed, timeout=60000):
+            worker.start()
+        assert worker._runner is not None
+        assert len(list(profile_folder.glob("batch-*.pstats"))) == 1
+        assert len(list(profile_folder.glob("isolated-*.pstats"))) == 1
+        with qtbot.waitSignal(worker.all_completed, timeout=60000):
+            worker.add_files(images[1:])
+        worker.stop()
+        assert worker.wait(10000)
+
+        assert totals == [(1, 0), (2, 0)]
+        assert len(list(profile_folder.glob("batch-*.pstats"))) == 2
+        children = sorted(profile_folder.glob("isolated-*.pstats"))
+        assert len(children) == 2
+        functions = {name for _, _, name in pstats.Stats(str(children[-1])).stats}
+        assert "predict" in functions
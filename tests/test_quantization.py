@@ -0,0 +1,80 @@
+"""Tests for INT8 model quantization."""
+
+import numpy as np
+import pytest
+
+from background_remover import quantization
+from background_remover.image_processor import ImageProcessor
+from background_remover.tuning import synthetic_images
+from tests.helpers import StandInSession, fp32_processor
+
+pytestmark = pytest.mark.usefixtures("model_home")
+
+
+class TestQuantization:
+    """Tests for quantized model creation and selection."""
+
+    def test_quantized_model_stored_next_to_fp32(self, model_home):
+        """Test that quantized files live in the rembg model folder."""
+        path = quantization.quantized_model_path("u2net", quantization.INT8_STATIC)
+
+        assert path == model_home / "u2net.int8-static.onnx"
+
+    def test_missing_quantized_model_is_reported(self):
+        """Test that selecting an INT8 model that wasn't created fails clearly."""
+        processor = ImageProcessor(precision=quantization.INT8_DYNAMIC)
+
+        with pytest.raises(RuntimeError, match="quantize"):
+            _ = processor.session
+
+    def test_unknown_precision_rejected(self):
+        """Test that an unknown precision is rejected up front."""
+        with pytest.raises(ValueError):
+            ImageProcessor(precision="int4")
+
+    def test_mask_iou(self):
+        """Test IoU of overlapping, identical and empty masks."""
+        a = np.zeros((4, 4), dtype=np.uint8)
+        b = np.zeros((4, 4), dtype=np.uint8)
+        a[:, :2] = 255
+        b[:, 1:3] = 255
+
+        assert quantization.mask_iou(a, b) == pytest.approx(1 / 3)
+        assert quantization.mask_iou(a, a) == 1.0
+        assert quantization.mask_iou(b * 0, a * 0) == 1.0
+
+    def test_accuracy_report(self):
+        """Test that identical models agree perfectly."""
+        reference = ImageProcessor(session_factory=StandInSession)
+        candidate = ImageProcessor(session_factory=StandInSession)
+
+        report = quantization.accuracy_report(
+            reference, candidate, synthetic_images(2, (64, 48))
+        )
+
+        assert report.ious == [1.0, 1.0]
+        assert report.min_iou == 1.0
+
+    @pytest.mark.parametrize(
+        "precision", [quantization.INT8_DYNAMIC, quantization.INT8_STATIC]
+    )
+    def test_quantize_and_select(self, tiny_model, precision):
+        """Test that a quantized model is created, loaded and stays close."""
+        images = synthetic_images(3, (160, 120))
+
+        path = quantization.quantize_model("u2net", precision, images)
+
+        assert path.exists()
+        assert not [p for p in path.parent.iterdir() if p.name.startswith(".")]
+
+        report = quantization.accuracy_report(
+            fp32_processor(tiny_model),
+            ImageProcessor(precision=precision),
+            images,
+        )
+        assert report.min_iou > 0.8
+
+    def test_static_needs_calibration_images(self, tiny_model):
+        """Test that static quantization refuses to run uncalibrated."""
+        with pytest.raises(ValueError):
+            quantization.quantize_model("u2net", quantization.INT8_STATIC)
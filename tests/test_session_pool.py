@@ -0,0 +1,111 @@
+"""Tests for the session pool behind ImageProcessor."""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from background_remover import metrics
+from background_remover.image_processor import ImageProcessor
+from background_remover.session_pool import SessionPool
+from background_remover.tuning import synthetic_images
+
+
+class ExclusiveSession:
+    """Stand-in session that fails if two threads use it at once."""
+
+    def __init__(self):
+        self._busy = threading.Lock()
+
+    def predict(self, img, *args, **kwargs):
+        if not self._busy.acquire(blocking=False):
+            raise AssertionError("Session used by two threads at once")
+        try:
+            time.sleep(0.02)
+            return [img.convert("L")]
+        finally:
+            self._busy.release()
+
+
+class TestSessionPool:
+    """Tests for SessionPool."""
+
+    def test_sessions_created_on_demand(self):
+        """Test that an idle session is reused instead of creating another."""
+        created = []
+        pool = SessionPool(lambda: created.append(object()) or created[-1], 3)
+
+        with pool.acquire() as first:
+            pass
+        with pool.acquire() as second:
+            pass
+
+        assert first is second
+        assert pool.size() == 1
+
+    def test_bounded_pool_waits(self):
+        """Test that a full pool makes callers wait for a returned session."""
+        pool = SessionPool(object, 1, label="wait-test")
+        before = metrics.SESSION_WAIT_SECONDS.count(model="wait-test")
+        released = threading.Event()
+
+        def hold():
+            with pool.acquire():
+                released.wait()
+
+        holder = threading.Thread(target=hold)
+        holder.start()
+        time.sleep(0.05)
+        threading.Timer(0.05, released.set).start()
+        with pool.acquire():
+            pass
+        holder.join()
+
+        assert pool.size() == 1
+        assert metrics.SESSION_WAIT_SECONDS.count(model="wait-test") == before + 2
+        assert metrics.SESSION_WAIT_SECONDS.total(model="wait-test") >= 0.04
+
+    def test_failed_creation_frees_slot(self):
+        """Test that a session that fails to load can be retried."""
+        attempts = []
+
+        def factory():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise OSError("download failed")
+            return object()
+
+        pool = SessionPool(factory, 1)
+        with pytest.raises(OSError):
+            with pool.acquire():
+                pass
+        with pool.acquire():
+            pass
+
+        assert pool.size() == 1
+
+    def test_clear_drops_idle_sessions(self):
+        """Test that cleared sessions are replaced by new ones on demand."""
+        pool = SessionPool(object, 2)
+        with pool.acquire() as first:
+            pass
+
+        pool.clear()
+        with pool.acquire() as second:
+            pass
+
+        assert second is not first
+        assert pool.size() == 1
+
+    def test_shared_processor_never_shares_a_session(self):
+        """Test that concurrent callers each get their own session."""
+        processor = ImageProcessor(session_factory=ExclusiveSession, max_sessions=3)
+        images = synthetic_images(6, (32, 24))
+
+        # result() re-raises any overlap detected inside a worker thread
+        with ThreadPoolExecutor(max_workers=6) as executor:
+            for future in [executor.submit(processor.process_array, i) for i in images]:
+                future.result()
+
+        assert 1 <= processor.session_pool_size() <= 3
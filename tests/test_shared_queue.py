@@ -0,0 +1,146 @@
+"""Tests for the shared-folder work queue."""
+
+import multiprocessing
+import os
+import time
+from pathlib import Path
+
+from background_remover.shared_queue import (
+    SharedQueueWorker,
+    SharedWorkQueue,
+    _Heartbeat,
+)
+
+
+class RecordingProcessor:
+    """Stand-in processor that logs every input it handles to a shared file."""
+
+    def __init__(self, log_path: Path, delay: float = 0.0):
+        self._log_path = log_path
+        self._delay = delay
+
+    def process_image(self, input_path: Path, output_path: Path) -> None:
+        time.sleep(self._delay)
+        output_path.write_bytes(input_path.read_bytes())
+        with open(self._log_path, "a") as log:
+            log.write(f"{input_path.name}\n")
+
+
+def _run_worker(input_folder: Path, output_folder: Path, log_path: Path) -> None:
+    queue = SharedWorkQueue(input_folder, output_folder, lease_ttl=30)
+    worker = SharedQueueWorker(queue, RecordingProcessor(log_path, delay=0.01))
+    worker.run(poll_interval=0.05)
+
+
+def _make_inputs(folder: Path, count: int):
+    folder.mkdir()
+    for i in range(count):
+        (folder / f"image_{i:03d}.png").write_bytes(f"image {i}".encode())
+
+
+class TestSharedWorkQueue:
+    """Tests for lease claiming and stealing."""
+
+    def test_lease_is_exclusive(self, tmp_path):
+        """Test that a live lease can't be claimed twice."""
+        _make_inputs(tmp_path / "in", 1)
+        queue = SharedWorkQueue(tmp_path / "in", tmp_path / "out")
+        [(key, path)] = queue.scan().items()
+
+        assert queue.try_claim(key, path, "a") == "claimed"
+        assert queue.try_claim(key, path, "b") is None
+
+    def test_expired_lease_is_stolen(self, tmp_path):
+        """Test that work held by a dead worker is taken over."""
+        _make_inputs(tmp_path / "in", 1)
+        queue = SharedWorkQueue(tmp_path / "in", tmp_path / "out", lease_ttl=10)
+        [(key, path)] = queue.scan().items()
+        queue.try_claim(key, path, "dead-worker")
+        lease = tmp_path / "out" / ".queue" / "leases" / f"{key}.lease"
+        stale = time.time() - 60
+        os.utime(lease, (stale, stale))
+
+        worker = SharedQueueWorker(
+            queue, RecordingProcessor(tmp_path / "log.txt"), worker_id="live"
+        )
+        stats = worker.run(poll_interval=0.01)
+
+        assert stats.processed == 1
+        assert stats.stolen == 1
+        assert (tmp_path / "out" / "image_000.png").exists()
+
+    def test_stolen_lease_removes_partial_output(self, tmp_path):
+        """Test that a dead worker's temporary output is cleaned up."""
+        _make_inputs(tmp_path / "in", 1)
+        queue = SharedWorkQueue(tmp_path / "in", tmp_path / "out", lease_ttl=10)
+        [(key, path)] = queue.scan().items()
+        queue.try_claim(key, path, "dead-worker")
+        partial = queue.temporary_path_for(path, "dead-worker")
+        partial.parent.mkdir(parents=True, exist_ok=True)
+        partial.write_bytes(b"half")
+        lease = tmp_path / "out" / ".queue" / "leases" / f"{key}.lease"
+        stale = time.time() - 60
+        os.utime(lease, (stale, stale))
+
+        assert queue.try_claim(key, path, "live") == "stolen"
+        assert not partial.exists()
+
+    def test_heartbeat_stops_when_lease_lost(self, tmp_path):
+        """Test that a worker never refreshes a lease another worker took."""
+        _make_inputs(tmp_path / "in", 1)
+        queue = SharedWorkQueue(tmp_path / "in", tmp_path / "out", lease_ttl=10)
+        [(key, path)] = queue.scan().items()
+        queue.try_claim(key, path, "slow-worker")
+        heartbeat = _Heartbeat(queue, key, "slow-worker", 0.01)
+        heartbeat.start()
+        queue.release(key)
+        queue.try_claim(key, path, "new-owner")
+        lease = tmp_path / "out" / ".queue" / "leases" / f"{key}.lease"
+        stale = time.time() - 60
+        os.utime(lease, (stale, stale))
+
+        heartbeat.join(timeout=1)
+
+        assert not heartbeat.is_alive()
+        assert lease.stat().st_mtime == stale
+
+    def test_stem_collision_keeps_extension(self, tmp_path):
+        """Test that inputs sharing a stem get distinct outputs."""
+        folder = tmp_path / "in"
+        folder.mkdir()
+        (folder / "photo.jpg").write_bytes(b"a")
+        (folder / "photo.png").write_bytes(b"b")
+        queue = SharedWorkQueue(folder, tmp_path / "out")
+
+        outputs = {queue.output_path_for(p).name for p in queue.scan().values()}
+
+        assert outputs == {"photo_jpg.png", "photo_png.png"}
+
+
+class TestSharedQueueWorkers:
+    """Tests running several worker processes against one folder."""
+
+    def test_each_file_processed_once(self, tmp_path):
+        """Test that concurrent processes split the work without overlap."""
+        input_folder = tmp_path / "in"
+        output_folder = tmp_path / "out"
+        log_path = tmp_path / "log.txt"
+        _make_inputs(input_folder, 30)
+
+        # Spawn keeps children independent of threads started by imported libs
+        context = multiprocessing.get_context("spawn")
+        processes = [
+            context.Process(
+                target=_run_worker, args=(input_folder, output_folder, log_path)
+            )
+            for _ in range(3)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(timeout=60)
+            assert process.exitcode == 0
+
+        handled = log_path.read_text().split()
+        assert sorted(handled) == sorted(f"image_{i:03d}.png" for i in range(30))
+        assert len(list(output_folder.glob("*.png"))) == 30
@@ -0,0 +1,165 @@
+"""Tests for model weights shared between processes."""
+
+import json
+import os
+
+import numpy as np
+import pytest
+
+from background_remover import quantization, shared_weights
+from background_remover.image_processor import ImageProcessor
+from background_remover.tuning import synthetic_images
+from tests.helpers import fp32_processor
+
+
+@pytest.fixture(autouse=True)
+def fresh_mappings(monkeypatch):
+    """Don't reuse mappings loaded by other tests."""
+    monkeypatch.setattr(shared_weights, "_loaded", {})
+
+
+@pytest.fixture
+def conv_bn_model(tmp_path, monkeypatch, model_home):
+    """Replace the cached model with ~20 MB of Conv+BatchNormalization blocks."""
+    onnx = pytest.importorskip("onnx")
+    from onnx import TensorProto, helper, numpy_helper
+
+    rng = np.random.default_rng(0)
+    channels = 384
+    weights = [
+        numpy_helper.from_array(
+            rng.normal(0, 0.1, (channels, 3, 1, 1)).astype("f4"), "w_in"
+        )
+    ]
+    nodes = [helper.make_node("Conv", ["input", "w_in"], ["x0"])]
+    for i in range(4):
+        weights.append(
+            numpy_helper.from_array(
+                rng.normal(0, 0.02, (channels, channels, 3, 3)).astype("f4"), f"w{i}"
+            )
+        )
+        norm = [f"{name}{i}" for name in ("scale", "bias", "mean", "var")]
+        weights.extend(
+            numpy_helper.from_array(rng.random(channels).astype("f4") + 0.5, name)
+            for name in norm
+        )
+        nodes += [
+            helper.make_node("Conv", [f"x{i}", f"w{i}"], [f"c{i}"], pads=[1, 1, 1, 1]),
+            helper.make_node("BatchNormalization", [f"c{i}", *norm], [f"n{i}"]),
+            helper.make_node("Relu", [f"n{i}"], [f"x{i + 1}"]),
+        ]
+    weights.append(
+        numpy_helper.from_array(
+            rng.normal(0, 0.1, (1, channels, 1, 1)).astype("f4"), "w_out"
+        )
+    )
+    nodes.append(helper.make_node("Conv", ["x4", "w_out"], ["mask"]))
+    graph = helper.make_graph(
+        nodes,
+        "conv_bn",
+        [helper.make_tensor_value_info("input", TensorProto.FLOAT, [1, 3, 32, 32])],
+        [helper.make_tensor_value_info("mask", TensorProto.FLOAT, [1, 1, 32, 32])],
+        weights,
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)])
+    model.ir_version = 8
+
+    path = tmp_path / "conv_bn.onnx"
+    onnx.save(model, str(path))
+    monkeypatch.setattr(quantization, "fp32_model_path", lambda name: path)
+    return path
+
+
+def _load_session(processor: ImageProcessor) -> int:
+    """Load a processor's session; return the anonymous memory it added."""
+    before = shared_weights.process_memory(os.getpid()).anonymous
+    processor.session
+    return shared_weights.process_memory(os.getpid()).anonymous - before
+
+
+class TestSharedWeights:
+    """Tests for splitting, mapping and measuring shared weights."""
+
+    def test_prepare_splits_graph_and_weights(self, tiny_model, model_home):
+        """Test that weights move to an aligned file the graph only refers to."""
+        folder = shared_weights.prepare_shared_model("u2net")
+
+        assert folder == model_home / "u2net.fp32.shared"
+        manifest = json.loads((folder / shared_weights.MANIFEST_FILENAME).read_text())
+        assert [entry["name"] for entry in manifest["initializers"]] == ["w1", "w2"]
+        assert all(entry["offset"] % 64 == 0 for entry in manifest["initializers"])
+        graph_size = (folder / shared_weights.GRAPH_FILENAME).stat().st_size
+        assert graph_size < tiny_model.stat().st_size
+
+    def test_prepare_is_idempotent(self, tiny_model):
+        """Test that an existing split model is reused as is."""
+        folder = shared_weights.prepare_shared_model("u2net")
+        mtime = (folder / shared_weights.WEIGHTS_FILENAME).stat().st_mtime_ns
+
+        assert shared_weights.prepare_shared_model("u2net") == folder
+        assert (folder / shared_weights.WEIGHTS_FILENAME).stat().st_mtime_ns == mtime
+
+    def test_older_split_replaced(self, tiny_model):
+        """Test that a split made without pre-optimization is made again."""
+        folder = shared_weights.prepare_shared_model("u2net")
+        manifest = folder / shared_weights.MANIFEST_FILENAME
+        old = json.loads(manifest.read_text())
+        del old["version"]
+        manifest.write_text(json.dumps(old))
+
+        assert shared_weights.prepare_shared_model("u2net") == folder
+        assert "version" in json.loads(manifest.read_text())
+
+    def test_masks_match_private_weights(self, tiny_model):
+        """Test that sessions on mapped weights give identical masks."""
+        images = synthetic_images(2, (64, 48))
+        private = fp32_processor(tiny_model)
+        shared = ImageProcessor(shared_weights=True, max_sessions=2)
+
+        for image in images:
+            np.testing.assert_array_equal(
+                shared.process_array(image)[1], private.process_array(image)[1]
+            )
+
+    def test_one_mapping_per_process(self, tiny_model):
+        """Test that every session in a process uses the same mapping."""
+        first = shared_weights.load_shared_weights("u2net")
+
+        assert shared_weights.load_shared_weights("u2net") is first
+        assert first.nbytes >= (8 * 3 * 3 * 3 + 8 * 3 * 3) * 4
+
+    def test_missing_int8_model_reported(self):
+        """Test that splitting an INT8 model that wasn't created fails clearly."""
+        with pytest.raises(FileNotFoundError, match="quantize"):
+            shared_weights.prepare_shared_model("u2net", quantization.INT8_DYNAMIC)
+
+    def test_sessions_leave_weights_shared(self, conv_bn_model):
+        """Test that optimizations don't copy mapped weights into the session."""
+        if shared_weights.process_memory(os.getpid()).anonymous is None:
+            pytest.skip("Anonymous memory is only reported on Linux")
+        weights_bytes = conv_bn_model.stat().st_size
+        shared_weights.load_shared_weights("u2net")
+
+        # Both stay alive, so freed memory can't be reused by the other
+        private_processor = fp32_processor(conv_bn_model, max_sessions=1)
+        shared_processor = ImageProcessor(shared_weights=True, max_sessions=1)
+
+        private = _load_session(private_processor)
+        shared = _load_session(shared_processor)
+
+        assert private > weights_bytes / 2
+        assert shared < private - weights_bytes / 2
+
+    def test_process_memory(self):
+        """Test that this process's memory can be measured."""
+        usage = shared_weights.process_memory(os.getpid())
+
+        assert usage.rss > 0
+        assert usage.pss is None or 0 < usage.pss <= usage.rss
+
+    def test_measure_workers(self, tiny_model):
+        """Test that workers load the mapped model in their own processes."""
+        usages = shared_weights.measure_workers(2, shared=True)
+
+        assert len({usage.pid for usage in usages}) == 2
+        assert all(usage.rss > 0 for usage in usages)
@@ -0,0 +1,75 @@
+"""Tests for the memory soak harness."""
+
+import pytest
+
+from background_remover import soak
+from background_remover.cli import main
+from background_remover.eta import COSTS_FILENAME
+
+SMALL_SIZES = ((64, 48), (96, 128), (120, 80))
+
+
+class LeakySession(soak.SyntheticSession):
+    """Stand-in session that keeps a reference to every input."""
+
+    retained = []
+
+    def predict(self, img, *args, **kwargs):
+        self.retained.append(bytearray(256 * 1024))
+        return super().predict(img, *args, **kwargs)
+
+
+class TestSoak:
+    """Tests for run_soak."""
+
+    def test_steady_memory_passes(self, tmp_path):
+        """Test that a run without leaks passes and reports memory over time."""
+        report = soak.run_soak(images=120, sizes=SMALL_SIZES, batch_size=20)
+        report.write(tmp_path / "soak.csv")
+
+        assert report.passed, report.summary()
+        assert [s.images for s in report.samples] == list(range(0, 121, 20))
+        lines = (tmp_path / "soak.csv").read_text().splitlines()
+        assert lines[0] == "images,seconds,rss_mb,traced_mb"
+        assert len(lines) == len(report.samples) + 1
+
+    def test_leaves_estimates_alone(self, isolated_config_dir):
+        """Test that stand-in timings aren't saved for real batches' ETAs."""
+        soak.run_soak(images=40, sizes=SMALL_SIZES, batch_size=20)
+
+        assert not (isolated_config_dir / COSTS_FILENAME).exists()
+
+    def test_leak_fails(self):
+        """Test that steady growth beyond the limit fails the run."""
+        try:
+            report = soak.run_soak(
+                images=120,
+                sizes=SMALL_SIZES,
+                batch_size=20,
+                max_growth_mb=5,
+                session_factory=LeakySession,
+            )
+        finally:
+            LeakySession.retained.clear()
+
+        assert not report.passed
+        assert report.traced_growth_mb > 5
+        assert report.summary().startswith("FAILED")
+
+    def test_cli(self, tmp_path):
+        """Test the soak command's exit code and report file."""
+        report = tmp_path / "memory.csv"
+
+        code = main(
+            ["soak", "--images", "40", "--batch-size", "20", "--report", str(report)]
+        )
+
+        assert code == 0
+        assert report.exists()
+
+    @pytest.mark.slow
+    def test_thousands_of_images(self):
+        """Test memory stays flat over a long run of varied sizes."""
+        report = soak.run_soak(images=3000, sizes=soak.DEFAULT_SIZES[:3])
+
+        assert report.passed, report.summary()
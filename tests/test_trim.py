@@ -0,0 +1,174 @@
+"""Tests for trimming outputs to their content."""
+
+import struct
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from background_remover.export import ExportVariant
+from background_remover.trim import Trim, content_bbox, read_placement
+
+
+def _offset(path) -> tuple:
+    """Read the oFFs chunk of a PNG, which Pillow doesn't parse."""
+    data = path.read_bytes()
+    start = data.index(b"oFFs") + 4
+    assert data.index(b"oFFs") < data.index(b"IDAT")
+    return struct.unpack(">ii", data[start : start + 8])
+
+
+@pytest.fixture
+def subject_image(tmp_path):
+    """Create a dark image with a bright subject off-center."""
+    img = Image.new("RGB", (200, 100), color="black")
+    img.paste((255, 255, 255), (120, 30, 150, 80))
+    path = tmp_path / "product.png"
+    img.save(path)
+    return path
+
+
+class TestContentBbox:
+    """Tests for content_bbox."""
+
+    def test_box_threshold_and_padding(self):
+        """Test the box, the alpha threshold and clamped padding."""
+        alpha = np.zeros((10, 20), dtype=np.uint8)
+        alpha[2:5, 3:8] = 255
+        alpha[8, 18] = 10
+
+        assert content_bbox(alpha) == (3, 2, 19, 9)
+        assert content_bbox(alpha, threshold=128) == (3, 2, 8, 5)
+        assert content_bbox(alpha, threshold=128, padding=3) == (0, 0, 11, 8)
+
+    def test_empty_alpha(self):
+        """Test that a fully transparent plane has no box."""
+        assert content_bbox(np.zeros((4, 4), dtype=np.uint8)) is None
+
+    def test_invalid_settings(self):
+        """Test that impossible thresholds and padding are rejected."""
+        with pytest.raises(ValueError):
+            Trim(threshold=0)
+        with pytest.raises(ValueError):
+            Trim(padding=-1)
+
+
+class TestTrimmedOutput:
+    """Tests for trimmed processing outputs."""
+
+    def test_process_image_crops_and_records_offset(
+        self, offline_processor, subject_image, temp_output_dir
+    ):
+        """Test that the PNG is cropped and its placement is recoverable."""
+        offline_processor.trim = Trim(padding=5)
+        output = temp_output_dir / "product.png"
+
+        offline_processor.process_image(subject_image, output)
+
+        with Image.open(output) as result:
+            assert result.size == (40, 60)
+            assert result.getpixel((0, 0))[3] == 0
+            assert result.getpixel((20, 30))[3] == 255
+        assert _offset(output) == (115, 25)
+        assert read_placement(output) == {
+            "left": 115,
+            "top": 25,
+            "right": 155,
+            "bottom": 85,
+            "original_width": 200,
+            "original_height": 100,
+        }
+
+    def test_untrimmed_output_has_no_placement(
+        self, offline_processor, subject_image, temp_output_dir
+    ):
+        """Test that full-canvas outputs carry no crop metadata."""
+        output = temp_output_dir / "product.png"
+
+        offline_processor.process_image(subject_image, output)
+
+        assert read_placement(output) is None
+
+    def test_animated_frames_share_one_crop(self, offline_processor, tmp_path):
+        """Test that frames are cropped to the union of their content."""
+        frames = []
+        for left in (10, 50):
+            frame = Image.new("RGB", (100, 40), color="black")
+            frame.paste((255, 255, 255), (left, 10, left + 20, 30))
+            frames.append(frame)
+        source = tmp_path / "moving.gif"
+        frames[0].save(source, save_all=True, append_images=frames[1:])
+        output = tmp_path / "moving.png"
+        offline_processor.trim = Trim()
+
+        offline_processor.process_image(source, output)
+
+        with Image.open(output) as result:
+            assert result.n_frames == 2
+            assert result.size == (60, 20)
+        assert read_placement(output)["left"] == 10
+        assert _offset(output) == (10, 10)
+
+    def test_animated_crop_matches_full_frames(self, offline_processor, tmp_path):
+        """Test that trimmed frames are the untrimmed frames cut to the box."""
+        frames = []
+        # The faint second background keeps Pillow from merging the frames
+        for left, background in ((10, 0), (10, 3), (50, 0), (30, 0)):
+            frame = Image.new("RGB", (100, 40), color=(background,) * 3)
+            frame.paste((255, 255, 255), (left, 10, left + 20, 30))
+            frames.append(frame)
+        source = tmp_path / "moving.gif"
+        frames[0].save(source, save_all=True, append_images=frames[1:])
+        full = tmp_path / "full.png"
+        trimmed = tmp_path / "trimmed.png"
+
+        offline_processor.process_image(source, full)
+        offline_processor.trim = Trim(padding=2)
+        offline_processor.process_image(source, trimmed)
+
+        box = (8, 8, 72, 32)
+        assert read_placement(trimmed)["right"] == 72
+        with Image.open(full) as expected, Image.open(trimmed) as result:
+            assert result.n_frames == expected.n_frames == 4
+            for index in range(4):
+                expected.seek(index)
+                result.seek(index)
+                np.testing.assert_array_equal(
+                    np.asarray(result.convert("RGBA")),
+                    np.asarray(expected.convert("RGBA").crop(box)),
+                )
+
+    def test_lossy_variant_gets_sidecar(
+        self, offline_processor, subject_image, temp_output_dir
+    ):
+        """Test that formats without PNG metadata record the crop alongside."""
+        outputs = offline_processor.export_variants(
+            subject_image,
+            temp_output_dir,
+            [ExportVariant("web", format="WEBP", trim=True, max_size=20)],
+        )
+
+        placement = read_placement(outputs["web"])
+        assert placement["left"] == 120
+        assert placement["original_width"] == 200
+        # The 30x50 subject is resized to fit 20 pixels
+        assert placement["scale"] == pytest.approx(12 / 30)
+
+    def test_resized_png_records_scale(
+        self, offline_processor, subject_image, temp_output_dir
+    ):
+        """Test that a resized PNG's placement maps its pixels to the source."""
+        outputs = offline_processor.export_variants(
+            subject_image,
+            temp_output_dir,
+            [ExportVariant("small", trim=True, max_size=25)],
+        )
+
+        with Image.open(outputs["small"]) as result:
+            height = result.height
+        placement = read_placement(outputs["small"])
+        assert placement["scale"] == pytest.approx(height / 50)
+        assert _offset(outputs["small"]) == (
+            round(placement["left"] * placement["scale"]),
+            round(placement["top"] * placement["scale"]),
+        )
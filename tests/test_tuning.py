@@ -0,0 +1,142 @@
+"""Tests for hardware auto-tuning."""
+
+import weakref
+
+import pytest
+from PIL import Image
+
+from background_remover import tuning
+from background_remover.image_processor import ImageProcessor
+from background_remover.worker import ProcessingWorker
+from tests.helpers import StandInSession
+
+
+def _offline_processor(threads: int) -> ImageProcessor:
+    return ImageProcessor(intra_op_threads=threads, session_factory=StandInSession)
+
+
+def _save_foreign_profile() -> None:
+    """Save a profile measured on different hardware."""
+    tuning.save_profile(
+        tuning.TuningProfile(
+            workers=4,
+            threads=2,
+            images_per_second=1.0,
+            cpu="Some Other CPU",
+            cores=128,
+            tuned_at=0.0,
+        )
+    )
+
+
+class TestAutotune:
+    """Tests for layout search and profile persistence."""
+
+    def test_candidate_layouts_fit_core_count(self):
+        """Test that no layout oversubscribes the CPU."""
+        layouts = tuning.candidate_layouts(6, max_workers=6)
+
+        assert (1, 1) in layouts
+        assert (6, 1) in layouts
+        assert (2, 2) in layouts
+        assert all(workers * threads <= 6 for workers, threads in layouts)
+
+    def test_candidate_layouts_cap_workers(self):
+        """Test that many cores don't mean one session per core."""
+        layouts = tuning.candidate_layouts(64, max_workers=4)
+
+        assert max(workers for workers, _ in layouts) == 4
+        assert (4, 16) in layouts and (1, 64) in layouts
+
+    def test_default_processor_caps_sessions(self, monkeypatch):
+        """Test that single-threaded layouts don't pool a session per core."""
+        monkeypatch.setattr(
+            tuning, "machine_fingerprint", lambda: {"cpu": "Test CPU", "cores": 64}
+        )
+
+        assert tuning._default_processor(1).max_sessions == tuning.MAX_WORKERS
+
+    def test_autotune_saves_profile(self):
+        """Test that the fastest layout is saved and loaded back."""
+        results = []
+        profile = tuning.autotune(
+            _offline_processor,
+            images=2,
+            size=(64, 48),
+            report=lambda *args: results.append(args),
+        )
+
+        assert len(results) == len(
+            tuning.candidate_layouts(tuning.machine_fingerprint()["cores"])
+        )
+        assert tuning.load_profile() == profile
+        assert not tuning.needs_retune()
+
+    def test_one_thread_count_loaded_at_a_time(self, monkeypatch):
+        """Test that each processor's sessions are freed before the next."""
+        live = weakref.WeakSet()
+        loaded = []
+
+        def factory(threads: int) -> ImageProcessor:
+            loaded.append(len(live))
+
+            def create_session():
+                session = StandInSession()
+                live.add(session)
+                return session
+
+            return ImageProcessor(
+                intra_op_threads=threads,
+                max_sessions=8 // threads,
+                session_factory=create_session,
+            )
+
+        monkeypatch.setattr(
+            tuning, "machine_fingerprint", lambda: {"cpu": "Test CPU", "cores": 8}
+        )
+
+        tuning.autotune(factory, images=2, size=(64, 48))
+
+        assert loaded == [0, 0, 0, 0]
+
+    def test_profile_from_other_hardware_is_ignored(self):
+        """Test that a profile for a different CPU triggers a re-tune."""
+        _save_foreign_profile()
+
+        assert tuning.load_profile() is None
+        assert tuning.needs_retune()
+
+    def test_startup_warns_instead_of_retuning(self, monkeypatch):
+        """Test that a stale profile falls back to defaults without benchmarks."""
+        _save_foreign_profile()
+        monkeypatch.setattr(
+            tuning, "autotune", lambda *args, **kwargs: pytest.fail("autotuned")
+        )
+        hints = []
+
+        assert tuning.startup_profile(hints.append) is None
+        assert hints == [tuning.RETUNE_HINT]
+
+
+class TestConcurrentWorker:
+    """Tests for ProcessingWorker with several workers."""
+
+    def test_same_stems_get_distinct_outputs(self, tmp_path, temp_output_dir):
+        """Test that concurrent files with the same name don't collide."""
+        files = []
+        for i in range(6):
+            folder = tmp_path / f"source_{i}"
+            folder.mkdir()
+            path = folder / "photo.png"
+            Image.new("RGB", (16, 16), color=(i * 40, 0, 0)).save(path)
+            files.append(path)
+
+        worker = ProcessingWorker(
+            files, temp_output_dir, _offline_processor(1), workers=3
+        )
+        totals = []
+        worker.all_completed.connect(lambda *args: totals.append(args))
+        worker.run()
+
+        assert totals == [(6, 0)]
+        assert len(list(temp_output_dir.glob("photo*.png"))) == 6